@@ -0,0 +1,87 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Compare eager and lazy relation facades.
+
+The eager facade builds its eight relation commands in __init__, as
+UserRelation used to. The lazy one is the current UserRelation.
+
+    python benchmarks/bench_facades.py [calls]
+"""
+
+import gc
+import sys
+import time
+
+from xivo_confd_client import Client
+from xivo_confd_client.commands.users import UserRelation
+from xivo_confd_client.relations import (UserCallPermissionRelation,
+                                         UserCtiProfileRelation,
+                                         UserEntityRelation,
+                                         UserForwardRelation,
+                                         UserFuncKeyRelation,
+                                         UserLineRelation,
+                                         UserServiceRelation,
+                                         UserVoicemailRelation)
+
+
+class EagerUserRelation(UserRelation):
+
+    def __init__(self, builder, user_id):
+        self.user_id = user_id
+        self._builder = builder
+        self.user_line = UserLineRelation(builder)
+        self.user_voicemail = UserVoicemailRelation(builder)
+        self.user_funckey = UserFuncKeyRelation(builder)
+        self.user_cti_profile = UserCtiProfileRelation(builder)
+        self.user_service = UserServiceRelation(builder)
+        self.user_forward = UserForwardRelation(builder)
+        self.user_call_permission = UserCallPermissionRelation(builder)
+        self.user_entity = UserEntityRelation(builder)
+
+
+def timed(facade, client, calls):
+    start = time.time()
+    for user_id in xrange(calls):
+        facade(client, user_id).user_line
+    return (time.time() - start) / calls * 1e6
+
+
+def held_objects(facade, client, calls):
+    gc.collect()
+    before = len(gc.get_objects())
+    kept = [facade(client, user_id) for user_id in xrange(calls)]
+    for relation in kept:
+        relation.user_line
+    gc.collect()
+    count = len(gc.get_objects()) - before
+    del kept
+    return float(count) / calls
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    client = Client('127.0.0.1')
+
+    for name, facade in (('eager', EagerUserRelation), ('lazy', UserRelation)):
+        print '{:<8} {:>7.2f} us/call {:>6.1f} objects/facade'.format(
+            name, timed(facade, client, calls), held_objects(facade, client, calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Compare GraphLoader with the naive per-user relation loop.
+
+Every user has its own line and shares a second one with the next user.
+Each line has an extension and a SIP endpoint, and four lines share a device.
+
+    python benchmarks/bench_graph.py [users] [latency]
+"""
+
+import sys
+import time
+
+from requests import HTTPError
+
+from stub_server import StubServer
+from xivo_confd_client import Client
+from xivo_confd_client.graph import GraphLoader
+
+
+class GraphServer(StubServer):
+
+    def route(self, path):
+        parts = [part for part in path.split('?')[0].split('/') if part][1:]
+        if len(parts) < 3:
+            return StubServer.route(self, path)
+
+        resource, resource_id, relation = parts[0], int(parts[1]), parts[2:]
+        if resource == 'users' and relation == ['lines']:
+            line_ids = [resource_id] + ([resource_id + 1] if resource_id < self.size else [])
+            return {'total': len(line_ids),
+                    'items': [{'user_id': resource_id, 'line_id': line_id} for line_id in line_ids]}
+        if resource == 'lines' and relation == ['extensions']:
+            return {'total': 1, 'items': [{'line_id': resource_id, 'extension_id': resource_id}]}
+        if resource == 'lines' and relation == ['endpoints', 'sip']:
+            return {'line_id': resource_id, 'endpoint_id': resource_id, 'endpoint': 'sip'}
+        if resource == 'lines' and relation == ['devices']:
+            return {'line_id': resource_id, 'device_id': 'device{}'.format(resource_id // 4)}
+        return None
+
+
+def naive(client, user_ids):
+    devices = set()
+    for user_id in user_ids:
+        for user_line in client.users(user_id).list_lines()['items']:
+            line = client.lines(user_line['line_id'])
+            line.list_extensions()
+            for get_endpoint in (line.get_endpoint_sip, line.get_endpoint_sccp, line.get_endpoint_custom):
+                try:
+                    get_endpoint()
+                except HTTPError:
+                    pass
+            try:
+                devices.add(line.get_device()['device_id'])
+            except HTTPError:
+                pass
+    return len(devices)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.005
+    server = GraphServer(size=size, latency=latency).start()
+    client = Client('127.0.0.1', port=server.port, pool_maxsize=16)
+    user_ids = range(1, size + 1)
+
+    start = time.time()
+    devices = naive(client, user_ids)
+    baseline = time.time() - start
+    print '{:<16} {:>5} devices {:>6} requests {:>7.2f}s'.format(
+        'naive', devices, server.counts['requests'], baseline)
+
+    for concurrency in (1, 4, 8, 16):
+        server.reset()
+        start = time.time()
+        graph = GraphLoader(client, concurrency).load(user_ids)
+        elapsed = time.time() - start
+        print '{:<16} {:>5} devices {:>6} requests {:>7.2f}s  x{:.1f}'.format(
+            'concurrency={}'.format(concurrency), len(graph.nodes('device')),
+            server.counts['requests'], elapsed, baseline / elapsed)
+
+    client.adapter.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
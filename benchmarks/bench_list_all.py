@@ -0,0 +1,55 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Time a full collection read per concurrency level with injected latency.
+
+    python benchmarks/bench_list_all.py [items] [latency]
+"""
+
+import sys
+import time
+
+from stub_server import StubServer
+from xivo_confd_client import Client
+
+PAGE_SIZE = 500
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    server = StubServer(size=size, latency=latency).start()
+    client = Client('127.0.0.1', port=server.port, pool_maxsize=16)
+
+    start = time.time()
+    count = sum(1 for _ in client.users.iter_list(page_size=PAGE_SIZE))
+    baseline = time.time() - start
+    print '{:<16} {:>6} items {:>7.2f}s'.format('iter_list', count, baseline)
+
+    for concurrency in (1, 2, 4, 8, 16):
+        start = time.time()
+        count = len(client.users.list_all(concurrency=concurrency, page_size=PAGE_SIZE)['items'])
+        elapsed = time.time() - start
+        print '{:<16} {:>6} items {:>7.2f}s  x{:.1f}'.format(
+            'concurrency={}'.format(concurrency), count, elapsed, baseline / elapsed)
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Compare the shared keep-alive pool with a fresh transport per session.
+
+    python benchmarks/bench_pool.py [requests]
+"""
+
+import sys
+import time
+
+from stub_server import StubServer
+from xivo_confd_client import Client
+
+
+def run(server, count, **kwargs):
+    client = Client('127.0.0.1', port=server.port, **kwargs)
+    server.reset()
+    start = time.time()
+    for i in xrange(count):
+        client.users.get(i + 1)
+    elapsed = time.time() - start
+    return elapsed, dict(server.counts), client.pool_stats()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    server = StubServer().start()
+
+    for name, kwargs in (('fresh transport', {'keep_alive': False}),
+                         ('shared pool', {'keep_alive': True})):
+        elapsed, counts, stats = run(server, count, **kwargs)
+        print '{:<24} {:>8.0f} req/s  connections={:<6} pool={}'.format(
+            name, count / elapsed, counts['connections'], stats)
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""Time Reconciler.plan for a site built from scratch.
+
+Each size plans that many users, lines and extensions, with a line and an
+extension per user, against an empty server.
+
+    python benchmarks/bench_reconcile.py [size ...]
+"""
+
+import sys
+import time
+
+from xivo_confd_client.reconcile import Reconciler
+
+
+class EmptyCommand(object):
+
+    def list_all(self, concurrency):
+        return {'total': 0, 'items': []}
+
+
+class EmptyClient(object):
+
+    relation_cache = None
+
+    def __getattr__(self, name):
+        return EmptyCommand()
+
+
+def desired_state(size):
+    users = [('user{}'.format(number), 'doe') for number in xrange(size)]
+    codes = ['{:06d}'.format(number) for number in xrange(size)]
+    extens = [(str(10000 + number), 'default') for number in xrange(size)]
+    return {'users': [{'firstname': firstname, 'lastname': lastname} for firstname, lastname in users],
+            'lines': [{'provisioning_code': code} for code in codes],
+            'extensions': [{'exten': exten, 'context': context} for exten, context in extens],
+            'user_line': zip(users, codes),
+            'line_extension': zip(codes, extens)}
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [500, 1000, 2000, 10000]
+    reconciler = Reconciler(EmptyClient())
+
+    for size in sizes:
+        desired = desired_state(size)
+        start = time.time()
+        plan = reconciler.plan(desired)
+        plan.describe()
+        print '{:>7} users {:>8} operations {:>8.2f} s'.format(size, len(plan), time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Compare the memory held by 100k listed users as dicts and as records.
+
+Each mode runs in its own process so the numbers do not mix:
+
+    python benchmarks/bench_records.py [items]
+"""
+
+import gc
+import json
+import subprocess
+import sys
+
+from xivo_confd_client.records import User
+
+PAGE_SIZE = 500
+MODES = ('dict', 'record', 'record-extra', 'projection')
+
+
+def rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * 4
+
+
+def pages(size):
+    for offset in xrange(0, size, PAGE_SIZE):
+        items = [{'id': i,
+                  'uuid': '00000000-0000-0000-0000-{:012d}'.format(i),
+                  'firstname': 'User',
+                  'lastname': 'Number {}'.format(i),
+                  'email': 'user{}@example.com'.format(i),
+                  'timezone': 'America/Montreal',
+                  'language': 'en_US',
+                  'description': '',
+                  'caller_id': '"User {}"'.format(i),
+                  'outgoing_caller_id': 'default',
+                  'mobile_phone_number': None,
+                  'username': None,
+                  'password': None,
+                  'music_on_hold': None,
+                  'preprocess_subroutine': None,
+                  'userfield': None,
+                  'call_transfer_enabled': False,
+                  'supervision_enabled': True,
+                  'ring_seconds': 30,
+                  'simultaneous_calls': 5,
+                  'call_permission_password': None,
+                  'links': [{'rel': 'users', 'href': 'https://localhost:9486/1.1/users/{}'.format(i)}]}
+                 for i in xrange(offset + 1, min(offset + PAGE_SIZE, size) + 1)]
+        yield json.dumps({'total': size, 'items': items})
+
+
+def measure(mode, size):
+    payloads = list(pages(size))
+    gc.collect()
+    before = rss_kb()
+
+    if mode == 'dict':
+        kept = [item for payload in payloads for item in json.loads(payload)['items']]
+    elif mode == 'projection':
+        kept = [User.build(item, fields=['id', 'uuid', 'firstname', 'lastname'])
+                for payload in payloads for item in json.loads(payload)['items']]
+    else:
+        keep_extra = mode == 'record-extra'
+        kept = [User.build(item, keep_extra=keep_extra)
+                for payload in payloads for item in json.loads(payload)['items']]
+
+    gc.collect()
+    return len(kept), rss_kb() - before
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    if len(sys.argv) > 2:
+        count, used = measure(sys.argv[2], size)
+        print '{:<14} {:>7} items {:>8.1f} MB'.format(sys.argv[2], count, used / 1024.0)
+        return
+
+    for mode in MODES:
+        subprocess.check_call([sys.executable, __file__, str(size), mode])
+
+
+if __name__ == '__main__':
+    main()
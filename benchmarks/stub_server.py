@@ -0,0 +1,138 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Minimal threaded HTTP/1.1 server answering like confd, for benchmarks.
+
+Collections are synthetic: ``/1.1/<resource>`` returns ``size`` items and
+honours ``limit`` and ``offset``, ``/1.1/<resource>/<id>`` returns a single
+item and any other path returns an empty listing. Subclasses may override
+``route`` and return None for a 404. Every response can be
+delayed by ``latency`` seconds to emulate a remote server.
+"""
+
+import BaseHTTPServer
+import SocketServer
+import json
+import threading
+import time
+import urlparse
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.count('connections')
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.server.route(self.path)
+        if body is None:
+            self.reply(['Resource not found'], 404)
+        else:
+            self.reply(body)
+
+    def do_POST(self):
+        self.read_body()
+        self.reply({'id': 1}, 201)
+
+    def do_PUT(self):
+        self.read_body()
+        self.reply(None, 204)
+
+    def do_DELETE(self):
+        self.reply(None, 204)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+
+    def reply(self, body, status=200):
+        self.server.count('requests')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        payload = json.dumps(body) if body is not None else ''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, size=1000, latency=0.0, port=0):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port), StubHandler)
+        self.size = size
+        self.latency = latency
+        self.counts = {'connections': 0, 'requests': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self.counts = {'connections': 0, 'requests': 0}
+
+    def route(self, path):
+        url = urlparse.urlparse(path)
+        parts = [part for part in url.path.split('/') if part][1:]
+        params = dict(urlparse.parse_qsl(url.query))
+
+        if len(parts) == 1:
+            return self.listing(parts[0], params)
+        if len(parts) == 2:
+            return self.item(parts[0], parts[1])
+        return {'total': 0, 'items': []}
+
+    def listing(self, resource, params):
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', self.size))
+        end = min(offset + limit, self.size)
+        items = [self.item(resource, i) for i in xrange(offset + 1, end + 1)]
+        return {'total': self.size, 'items': items}
+
+    def item(self, resource, resource_id):
+        return {'id': int(resource_id),
+                'uuid': '00000000-0000-0000-0000-{:012d}'.format(int(resource_id)),
+                'firstname': 'User',
+                'lastname': str(resource_id),
+                'links': [{'rel': resource,
+                           'href': 'http://localhost/1.1/{}/{}'.format(resource, resource_id)}]}
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
@@ -0,0 +1,211 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import hashlib
+import os
+import re
+import threading
+
+from urlparse import urlparse
+
+from requests.auth import AuthBase
+from requests.cookies import extract_cookies_to_jar
+from requests.hooks import default_hooks
+from requests.utils import parse_dict_header
+
+from xivo_confd_client.util import Counters
+
+
+class DigestChallenge(object):
+
+    def __init__(self, realm, nonce, qop=None, algorithm=None, opaque=None, stale=False):
+        self.realm = realm
+        self.nonce = nonce
+        self.qop = qop
+        self.algorithm = algorithm
+        self.opaque = opaque
+        self.stale = stale
+        self.nonce_count = 0
+
+    @classmethod
+    def from_header(cls, header):
+        if not header.lower().startswith('digest '):
+            return None
+        params = parse_dict_header(re.sub(r'^digest ', '', header, count=1, flags=re.IGNORECASE))
+        if 'realm' not in params or 'nonce' not in params:
+            return None
+        return cls(realm=params['realm'],
+                   nonce=params['nonce'],
+                   qop=params.get('qop'),
+                   algorithm=params.get('algorithm'),
+                   opaque=params.get('opaque'),
+                   stale=params.get('stale', '').lower() == 'true')
+
+
+class ConfdDigestAuth(AuthBase):
+    """Digest auth shared by every session of a client.
+
+    The last challenge received from each host is kept so that following
+    requests are signed right away with an incremented nonce count instead of
+    waiting for a 401. A new challenge is only answered when the request was
+    not signed yet, when the server marks the nonce as stale or when it sends
+    a different nonce.
+    """
+
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+        self.counters = Counters('preemptive', 'challenged')
+        self._challenges = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        host = urlparse(request.url).netloc
+        nonce, header = self._sign(host, request.method, request.url)
+        if header:
+            request.headers['Authorization'] = header
+            self.counters.incr('preemptive')
+
+        try:
+            position = request.body.tell()
+        except AttributeError:
+            position = None
+
+        def handle_401(response, **kwargs):
+            return self.handle_401(response, host, nonce, position, **kwargs)
+
+        request.register_hook('response', handle_401)
+        return request
+
+    def handle_401(self, response, host, nonce, position, **kwargs):
+        if response.status_code != 401:
+            return response
+
+        challenge = DigestChallenge.from_header(response.headers.get('www-authenticate', ''))
+        if challenge is None:
+            return response
+
+        if nonce is not None and nonce == challenge.nonce and not challenge.stale:
+            return response
+
+        with self._lock:
+            self._challenges[host] = challenge
+        self.counters.incr('challenged')
+
+        # None when the challenge asks for an unsupported algorithm or qop
+        _, header = self._sign(host, response.request.method, response.request.url)
+        if header is None:
+            return response
+
+        if not self._rewind(response.request.body, position):
+            return response
+
+        response.content
+        response.raw.release_conn()
+
+        prepared = response.request.copy()
+        prepared.hooks = default_hooks()
+        extract_cookies_to_jar(prepared._cookies, response.request, response.raw)
+        prepared.prepare_cookies(prepared._cookies)
+        prepared.headers['Authorization'] = header
+
+        retry = response.connection.send(prepared, **kwargs)
+        retry.history.append(response)
+        retry.request = prepared
+        return retry
+
+    def stats(self):
+        return self.counters.as_dict()
+
+    def has_challenge(self, url):
+        with self._lock:
+            return urlparse(url).netloc in self._challenges
+
+    def _rewind(self, body, position):
+        if position is not None:
+            body.seek(position)
+            return True
+        return body is None or isinstance(body, basestring)
+
+    def _sign(self, host, method, url):
+        with self._lock:
+            challenge = self._challenges.get(host)
+            if challenge is None:
+                return None, None
+            challenge.nonce_count += 1
+            nonce_count = challenge.nonce_count
+        header = self.build_digest_header(challenge, nonce_count, method, url)
+        if header is None:
+            return None, None
+        return challenge.nonce, header
+
+    def build_digest_header(self, challenge, nonce_count, method, url):
+        algorithm = (challenge.algorithm or 'MD5').upper()
+        if algorithm not in ('MD5', 'MD5-SESS', 'SHA'):
+            return None
+
+        qop = None
+        if challenge.qop:
+            if 'auth' not in [value.strip() for value in challenge.qop.split(',')]:
+                return None
+            qop = 'auth'
+
+        hash_func = hashlib.sha1 if algorithm == 'SHA' else hashlib.md5
+
+        def digest(*parts):
+            value = ':'.join(_encode(part) for part in parts)
+            return hash_func(value).hexdigest()
+
+        parsed = urlparse(url)
+        path = parsed.path
+        if parsed.query:
+            path += '?' + parsed.query
+
+        nc = '{:08x}'.format(nonce_count)
+        cnonce = hashlib.sha1(os.urandom(16)).hexdigest()[:16]
+
+        ha1 = digest(self.username, challenge.realm, self.password)
+        ha2 = digest(method, path)
+        if algorithm == 'MD5-SESS':
+            ha1 = digest(ha1, challenge.nonce, cnonce)
+
+        if qop:
+            response = digest(ha1, challenge.nonce, nc, cnonce, qop, ha2)
+        else:
+            response = digest(ha1, challenge.nonce, ha2)
+
+        header = 'username="{}", realm="{}", nonce="{}", uri="{}", response="{}"'.format(
+            self.username, challenge.realm, challenge.nonce, path, response)
+        if challenge.opaque:
+            header += ', opaque="{}"'.format(challenge.opaque)
+        if challenge.algorithm:
+            header += ', algorithm="{}"'.format(challenge.algorithm)
+        if qop:
+            header += ', qop={}, nc={}, cnonce="{}"'.format(qop, nc, cnonce)
+
+        return 'Digest {}'.format(header)
+
+
+def is_replayable(body):
+    return body is None or isinstance(body, basestring) or hasattr(body, 'seek')
+
+
+def _encode(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
@@ -0,0 +1,167 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import time
+
+from requests.exceptions import ConnectionError, Timeout
+
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY, imap
+
+
+class Outcome(object):
+
+    def __init__(self, key, result=None, error=None, unchanged=False):
+        self.key = key
+        self.result = result
+        self.error = error
+        self.unchanged = unchanged
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def status_code(self):
+        response = getattr(self.error, 'response', None)
+        if response is None:
+            return None
+        return response.status_code
+
+    @property
+    def message(self):
+        if self.error is None:
+            return None
+        response = getattr(self.error, 'response', None)
+        if response is not None and response.reason:
+            return response.reason
+        return unicode(self.error)
+
+    def __repr__(self):
+        if self.unchanged:
+            return '<Outcome {!r}: unchanged>'.format(self.key)
+        if self.ok:
+            return '<Outcome {!r}: ok>'.format(self.key)
+        return '<Outcome {!r}: {} {}>'.format(self.key, self.status_code, self.message)
+
+
+class BulkReport(object):
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.unchanged = []
+        self.succeeded = 0
+        self.stopped = False
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    @property
+    def total(self):
+        return self.succeeded + self.failed
+
+    def add(self, outcome):
+        if outcome.ok:
+            self.succeeded += 1
+            if outcome.unchanged:
+                self.unchanged.append(outcome.key)
+            if outcome.result is not None:
+                self.results[outcome.key] = outcome.result
+        else:
+            self.errors[outcome.key] = outcome
+        return outcome
+
+
+def attempt(key, func, *args, **kwargs):
+    try:
+        return Outcome(key, func(*args, **kwargs))
+    except Exception as e:
+        return Outcome(key, error=e)
+
+
+class RetryPolicy(object):
+    """Decide what to do when a relation write fails.
+
+    Connection errors, timeouts and gateway errors are retried with an
+    exponential backoff. Errors telling that the relation is already in the
+    requested state are not failures: the outcome is ok and marked unchanged.
+    """
+
+    transient_statuses = (502, 503, 504)
+    unchanged_messages = {'associate': ('already associated', 'already exists'),
+                          'dissociate': ('not associated',)}
+
+    def __init__(self, retries=2, delay=0.5, backoff=2, sleep=time.sleep):
+        self.retries = retries
+        self.delay = delay
+        self.backoff = backoff
+        self.sleep = sleep
+
+    def is_transient(self, error):
+        if isinstance(error, (ConnectionError, Timeout)):
+            return True
+        return Outcome(None, error=error).status_code in self.transient_statuses
+
+    def is_unchanged(self, action, error):
+        outcome = Outcome(None, error=error)
+        if outcome.status_code is None:
+            return False
+        message = outcome.message.lower()
+        return any(text in message for text in self.unchanged_messages.get(action, ()))
+
+    def call(self, key, action, func, *args):
+        delay = self.delay
+        for retry in xrange(self.retries + 1):
+            outcome = attempt(key, func, *args)
+            if outcome.ok:
+                return outcome
+            if self.is_unchanged(action, outcome.error):
+                return Outcome(key, unchanged=True)
+            if retry == self.retries or not self.is_transient(outcome.error):
+                return outcome
+            self.sleep(delay)
+            delay *= self.backoff
+
+
+def run(func, items, key, concurrency=DEFAULT_CONCURRENCY, ordered=False):
+    def call(indexed_item):
+        position, item = indexed_item
+        try:
+            item_key = key(item)
+        except Exception as e:
+            # the item cannot be identified, e.g. a body without an id
+            return Outcome(('position', position), error=e)
+        return attempt(item_key, func, item)
+    return imap(call, enumerate(items), concurrency, ordered)
+
+
+def collect(outcomes, stop_on_error=False, progress=None):
+    report = BulkReport()
+    try:
+        for outcome in outcomes:
+            report.add(outcome)
+            if progress:
+                progress(report, outcome)
+            if stop_on_error and not outcome.ok:
+                report.stopped = True
+                break
+    finally:
+        if hasattr(outcomes, 'close'):
+            outcomes.close()
+    return report
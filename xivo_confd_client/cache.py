@@ -0,0 +1,187 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import copy
+import threading
+import time
+
+from collections import OrderedDict
+
+from xivo_confd_client.util import Counters
+
+RESOURCE_FIELDS = {'users': 'user_id',
+                   'lines': 'line_id',
+                   'extensions': 'extension_id',
+                   'voicemails': 'voicemail_id',
+                   'devices': 'device_id',
+                   'callpermissions': 'call_permission_id'}
+
+RELATIONS = frozenset(['user_line',
+                       'user_voicemail',
+                       'line_device',
+                       'line_extension',
+                       'line_endpoint_sip',
+                       'line_endpoint_sccp',
+                       'line_endpoint_custom',
+                       'user_funckey',
+                       'user_cti_profile',
+                       'user_service',
+                       'user_forward',
+                       'user_call_permission',
+                       'user_entity'])
+
+# relations read through a resource: the cache cannot tell which entries a
+# change affects, so all of them are dropped
+DEPENDENT_RELATIONS = {'funckeys/templates': 'user_funckey'}
+
+
+class RelationCache(object):
+    """TTL and LRU bound cache of relation reads.
+
+    Entries are keyed by URL and remember the ids they were read for. Events
+    published by the client invalidate every entry of the relation that was
+    read for, or returns, one of the ids involved, so both sides of a relation
+    are dropped together. Events on other resources are ignored, except the
+    deletion of a resource listed in RESOURCE_FIELDS and changes to a resource
+    listed in DEPENDENT_RELATIONS. A read that was invalidated while it was
+    loading is returned but not cached.
+    """
+
+    def __init__(self, ttl=60, maxsize=1024, clock=time.time):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._loading = 0
+        self._invalidations = []
+        self.counters = Counters('hits', 'misses', 'evictions', 'invalidations')
+
+    def get(self, relation, url, ids, load):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is not None and entry.expires > now:
+                self._entries[url] = entry
+                self.counters.incr('hits')
+                return copy.deepcopy(entry.value)
+            generation = self._generation
+            self._loading += 1
+
+        self.counters.incr('misses')
+        try:
+            value = load()
+            entry = _Entry(relation, ids, copy.deepcopy(value), now + self.ttl)
+        except Exception:
+            with self._lock:
+                self._end_load()
+            raise
+
+        with self._lock:
+            if not self._invalidated_since(generation, entry):
+                self._entries[url] = entry
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.counters.incr('evictions')
+            self._end_load()
+        return value
+
+    def invalidate(self, relation, ids=None):
+        if ids is None:
+            pairs = None
+        else:
+            pairs = [(field, value) for field, value in ids.iteritems() if value is not None]
+        with self._lock:
+            self._record_invalidation(relation, pairs)
+            stale = [url for url, entry in self._entries.iteritems() if entry.matches(relation, pairs)]
+            for url in stale:
+                del self._entries[url]
+        self.counters.incr('invalidations', len(stale))
+
+    def on_event(self, action, resource, data):
+        if resource in RELATIONS:
+            self.invalidate(resource, data)
+        elif resource in DEPENDENT_RELATIONS:
+            if action in ('updated', 'deleted'):
+                self.invalidate(DEPENDENT_RELATIONS[resource])
+        elif resource in RESOURCE_FIELDS:
+            if action == 'deleted':
+                self.invalidate(None, {RESOURCE_FIELDS[resource]: data.get('id')})
+
+    def clear(self):
+        with self._lock:
+            self._record_invalidation(None, None)
+            self._entries.clear()
+
+    def _record_invalidation(self, relation, pairs):
+        # only kept while reads are loading: they must not cache what was invalidated meanwhile
+        self._generation += 1
+        if self._loading:
+            self._invalidations.append((self._generation, relation, pairs))
+
+    def _invalidated_since(self, generation, entry):
+        for invalidated, relation, pairs in self._invalidations:
+            if invalidated > generation and entry.matches(relation, pairs):
+                return True
+        return False
+
+    def _end_load(self):
+        self._loading -= 1
+        if not self._loading:
+            del self._invalidations[:]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return self.counters.as_dict()
+
+
+class _Entry(object):
+
+    __slots__ = ('relation', 'ids', 'value', 'expires')
+
+    def __init__(self, relation, ids, value, expires):
+        self.relation = relation
+        self.ids = ids
+        self.value = value
+        self.expires = expires
+
+    def matches(self, relation, pairs):
+        # None matches any relation, or any ids
+        if relation is not None and self.relation != relation:
+            return False
+        return pairs is None or self.refers_to(pairs)
+
+    def refers_to(self, pairs):
+        for field, value in pairs:
+            if self.ids.get(field) == value:
+                return True
+        for item in self._items():
+            for field, value in pairs:
+                if item.get(field) == value:
+                    return True
+        return False
+
+    def _items(self):
+        if not isinstance(self.value, dict):
+            return []
+        if isinstance(self.value.get('items'), list):
+            return [item for item in self.value['items'] if isinstance(item, dict)]
+        return [self.value]
@@ -14,10 +14,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-import requests
-
 from xivo_lib_rest_client.client import BaseClient
+from xivo_confd_client.auth import ConfdDigestAuth
+from xivo_confd_client.cache import RelationCache
+from xivo_confd_client.pool import ConfdHTTPAdapter
 from xivo_confd_client.session import ConfdSession
+from xivo_confd_client.util import Counters
 
 
 class ConfdClient(BaseClient):
@@ -30,6 +32,12 @@ class ConfdClient(BaseClient):
                  version='1.1',
                  username=None,
                  password=None,
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 pool_block=False,
+                 keep_alive=True,
+                 skip_unchanged_updates=False,
+                 relation_cache=None,
                  **kwargs):
         super(ConfdClient, self).__init__(
             host=host,
@@ -38,9 +46,54 @@ class ConfdClient(BaseClient):
             **kwargs)
         self.username = username
         self.password = password
+        self.keep_alive = keep_alive
+        self.skip_unchanged_updates = skip_unchanged_updates
+        self.update_counters = Counters('sent', 'skipped')
+        self._listeners = []
+        self.auth = None
+        if username and password:
+            self.auth = ConfdDigestAuth(username, password)
+        self.adapter = ConfdHTTPAdapter(pool_connections=pool_connections,
+                                        pool_maxsize=pool_maxsize,
+                                        pool_block=pool_block)
+        if relation_cache is True:
+            relation_cache = RelationCache()
+        self.relation_cache = relation_cache
+        if self.relation_cache is not None:
+            self.subscribe(self.relation_cache.on_event)
 
     def session(self):
         session = super(ConfdClient, self).session()
-        if self.username and self.password:
-            session.auth = requests.auth.HTTPDigestAuth(self.username, self.password)
+        if self.keep_alive:
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            session.headers.pop('Connection', None)
+        if self.auth:
+            session.auth = self.auth
         return ConfdSession(session, self.url())
+
+    def pool_stats(self):
+        return self.adapter.stats()
+
+    def auth_stats(self):
+        if self.auth:
+            return self.auth.stats()
+        return {'preemptive': 0, 'challenged': 0}
+
+    def update_stats(self):
+        return self.update_counters.as_dict()
+
+    def cache_stats(self):
+        if self.relation_cache is not None:
+            return self.relation_cache.stats()
+        return {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def publish(self, action, resource, data):
+        for listener in list(self._listeners):
+            listener(action, resource, data)
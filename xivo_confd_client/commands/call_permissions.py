@@ -15,16 +15,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+from xivo_confd_client import bulk
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.util import extract_id
-from xivo_confd_client.relations import UserCallPermissionRelation
+from xivo_confd_client.records import CallPermission
+from xivo_confd_client.util import extract_id, resource_id
+from xivo_confd_client.relations import SharedRelation, UserCallPermissionRelation
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY
 
 
 class CallPermissionRelation(object):
 
+    user_call_permission = SharedRelation(UserCallPermissionRelation)
+
     def __init__(self, builder, call_permission_id):
         self.call_permission_id = call_permission_id
-        self.user_call_permission = UserCallPermissionRelation(builder)
+        self._builder = builder
 
     @extract_id
     def add_user(self, user_id):
@@ -37,8 +42,13 @@ class CallPermissionRelation(object):
     def list_users(self):
         return self.user_call_permission.list_by_call_permission(self.call_permission_id)
 
+    def remove_users(self, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        user_ids = [association['user_id'] for association in self.list_users()['items']]
+        return bulk.collect(bulk.run(self.remove_user, user_ids, resource_id, concurrency), stop_on_error, progress)
+
 
 class CallPermissionsCommand(CRUDCommand):
 
     resource = 'callpermissions'
+    record_type = CallPermission
     relation_cmd = CallPermissionRelation
@@ -19,15 +19,17 @@
 
 from xivo_lib_rest_client import HTTPCommand
 from xivo_confd_client.util import url_join
-from xivo_confd_client.relations import UserCtiProfileRelation
+from xivo_confd_client.relations import SharedRelation, UserCtiProfileRelation
 from xivo_confd_client.util import extract_id
 
 
 class CtiProfileRelation(object):
 
+    user_cti_profile = SharedRelation(UserCtiProfileRelation)
+
     def __init__(self, builder, cti_profile_id):
         self.cti_profile_id = cti_profile_id
-        self.user_cti_profile = UserCtiProfileRelation(builder)
+        self._builder = builder
 
     @extract_id
     def add_user(self, user_id):
@@ -16,16 +16,19 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 from xivo_confd_client.crud import CRUDCommand
+from xivo_confd_client.records import Device
 from xivo_confd_client.util import extract_id
 from xivo_confd_client.util import url_join
-from xivo_confd_client.relations import LineDeviceRelation
+from xivo_confd_client.relations import SharedRelation, LineDeviceRelation
 
 
 class DeviceRelation(object):
 
+    line_device = SharedRelation(LineDeviceRelation)
+
     def __init__(self, builder, device_id):
         self.device_id = device_id
-        self.line_device = LineDeviceRelation(builder)
+        self._builder = builder
 
     @extract_id
     def add_line(self, line_id):
@@ -42,14 +45,21 @@ class DeviceRelation(object):
 class DevicesCommand(CRUDCommand):
 
     resource = 'devices'
+    record_type = Device
     relation_cmd = DeviceRelation
 
     @extract_id
-    def autoprov(self, device_id):
+    def autoprov(self, device_id, timeout=None):
         url = url_join(self.resource, device_id, 'autoprov')
-        self.session.get(url)
+        self.session.get(url, **_timeout(timeout))
 
     @extract_id
-    def synchronize(self, device_id):
+    def synchronize(self, device_id, timeout=None):
         url = url_join(self.resource, device_id, 'synchronize')
-        self.session.get(url)
+        self.session.get(url, **_timeout(timeout))
+
+
+def _timeout(timeout):
+    if timeout is None:
+        return {}
+    return {'timeout': timeout}
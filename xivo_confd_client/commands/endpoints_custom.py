@@ -18,14 +18,17 @@
 
 
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.relations import LineEndpointCustomRelation
+from xivo_confd_client.records import EndpointCustom
+from xivo_confd_client.relations import SharedRelation, LineEndpointCustomRelation
 
 
 class EndpointCustomRelation(object):
 
+    line_endpoint_custom = SharedRelation(LineEndpointCustomRelation)
+
     def __init__(self, builder, custom_id):
         self.custom_id = custom_id
-        self.line_endpoint_custom = LineEndpointCustomRelation(builder)
+        self._builder = builder
 
     def associate_line(self, line_id):
         self.line_endpoint_custom.associate(line_id, self.custom_id)
@@ -40,4 +43,5 @@ class EndpointCustomRelation(object):
 class EndpointsCustomCommand(CRUDCommand):
 
     resource = 'endpoints/custom'
+    record_type = EndpointCustom
     relation_cmd = EndpointCustomRelation
@@ -18,14 +18,17 @@
 
 
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.relations import LineEndpointSccpRelation
+from xivo_confd_client.records import EndpointSccp
+from xivo_confd_client.relations import SharedRelation, LineEndpointSccpRelation
 
 
 class EndpointSccpRelation(object):
 
+    line_endpoint_sccp = SharedRelation(LineEndpointSccpRelation)
+
     def __init__(self, builder, sccp_id):
         self.sccp_id = sccp_id
-        self.line_endpoint_sccp = LineEndpointSccpRelation(builder)
+        self._builder = builder
 
     def associate_line(self, line_id):
         self.line_endpoint_sccp.associate(line_id, self.sccp_id)
@@ -40,4 +43,5 @@ class EndpointSccpRelation(object):
 class EndpointsSccpCommand(CRUDCommand):
 
     resource = 'endpoints/sccp'
+    record_type = EndpointSccp
     relation_cmd = EndpointSccpRelation
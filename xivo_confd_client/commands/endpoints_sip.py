@@ -18,14 +18,17 @@
 
 
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.relations import LineEndpointSipRelation
+from xivo_confd_client.records import EndpointSip
+from xivo_confd_client.relations import SharedRelation, LineEndpointSipRelation
 
 
 class EndpointSipRelation(object):
 
+    line_endpoint_sip = SharedRelation(LineEndpointSipRelation)
+
     def __init__(self, builder, sip_id):
         self.sip_id = sip_id
-        self.line_endpoint_sip = LineEndpointSipRelation(builder)
+        self._builder = builder
 
     def associate_line(self, line_id):
         self.line_endpoint_sip.associate(line_id, self.sip_id)
@@ -40,4 +43,5 @@ class EndpointSipRelation(object):
 class EndpointsSipCommand(CRUDCommand):
 
     resource = 'endpoints/sip'
+    record_type = EndpointSip
     relation_cmd = EndpointSipRelation
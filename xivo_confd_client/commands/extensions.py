@@ -17,14 +17,17 @@
 
 from xivo_confd_client.util import extract_id
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.relations import LineExtensionRelation
+from xivo_confd_client.records import Extension
+from xivo_confd_client.relations import SharedRelation, LineExtensionRelation
 
 
 class ExtensionRelation(object):
 
+    line_extension_relation = SharedRelation(LineExtensionRelation)
+
     def __init__(self, builder, extension_id):
         self.extension_id = extension_id
-        self.line_extension_relation = LineExtensionRelation(builder)
+        self._builder = builder
 
     @extract_id
     def add_line(self, line_id):
@@ -41,5 +44,7 @@ class ExtensionRelation(object):
 class ExtensionsCommand(CRUDCommand):
 
     resource = 'extensions'
+    record_type = Extension
+    server_filters = ('type',)
 
     relation_cmd = ExtensionRelation
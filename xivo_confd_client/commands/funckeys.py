@@ -16,26 +16,32 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.relations import UserFuncKeyRelation
-from xivo_confd_client.util import url_join
+from xivo_confd_client.records import FuncKeyTemplate
+from xivo_confd_client.relations import SharedRelation, UserFuncKeyRelation
+from xivo_confd_client.util import extract_id, url_join
 
 
 class TemplateRelation(object):
 
+    user_funckey = SharedRelation(UserFuncKeyRelation)
+
     def __init__(self, builder, template_id):
         self.template_id = template_id
-        self.user_funckey = UserFuncKeyRelation(builder)
+        self._builder = builder
 
+    @extract_id
     def add_user(self, user_id):
-        self.user_funckey.associate_template(user_id, self.template_id)
+        self.user_funckey.associate_funckey_template(user_id, self.template_id)
 
+    @extract_id
     def remove_user(self, user_id):
-        self.user_funckey.dissociate_template(user_id, self.template_id)
+        self.user_funckey.dissociate_funckey_template(user_id, self.template_id)
 
 
 class FuncKeysCommand(CRUDCommand):
 
     resource = 'funckeys/templates'
+    record_type = FuncKeyTemplate
     relation_cmd = TemplateRelation
 
     def get_template_funckey(self, template_id, position):
@@ -46,7 +52,9 @@ class FuncKeysCommand(CRUDCommand):
     def delete_template_funckey(self, template_id, position):
         url = url_join(self.resource, template_id, position)
         self.session.delete(url)
+        self._client.publish('updated', self.resource, {'id': template_id})
 
     def update_template_funckey(self, template_id, position, funckey):
         url = url_join(self.resource, template_id, position)
         self.session.put(url, funckey)
+        self._client.publish('updated', self.resource, {'id': template_id})
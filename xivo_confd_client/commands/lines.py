@@ -15,26 +15,34 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-from xivo_confd_client.util import extract_id
+from requests import HTTPError
+
+from xivo_confd_client import bulk
+from xivo_confd_client.util import extract_id, resource_id
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.relations import (UserLineRelation,
+from xivo_confd_client.records import Line
+from xivo_confd_client.relations import (SharedRelation,
+                                         UserLineRelation,
                                          LineExtensionRelation,
                                          LineEndpointSipRelation,
                                          LineEndpointSccpRelation,
                                          LineEndpointCustomRelation,
                                          LineDeviceRelation)
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY
 
 
 class LineRelation(object):
 
+    user_line = SharedRelation(UserLineRelation)
+    line_extension = SharedRelation(LineExtensionRelation)
+    line_endpoint_sip = SharedRelation(LineEndpointSipRelation)
+    line_endpoint_sccp = SharedRelation(LineEndpointSccpRelation)
+    line_endpoint_custom = SharedRelation(LineEndpointCustomRelation)
+    line_device = SharedRelation(LineDeviceRelation)
+
     def __init__(self, builder, line_id):
         self.line_id = line_id
-        self.user_line = UserLineRelation(builder)
-        self.line_extension = LineExtensionRelation(builder)
-        self.line_endpoint_sip = LineEndpointSipRelation(builder)
-        self.line_endpoint_sccp = LineEndpointSccpRelation(builder)
-        self.line_endpoint_custom = LineEndpointCustomRelation(builder)
-        self.line_device = LineDeviceRelation(builder)
+        self._builder = builder
 
     @extract_id
     def add_extension(self, extension_id):
@@ -102,8 +110,63 @@ class LineRelation(object):
     def get_device(self):
         return self.line_device.get_by_line(self.line_id)
 
+    def remove_users(self, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        secondary, main = self._users_by_role()
+        phases = [(self.remove_user, secondary), (self.remove_user, main)]
+        return bulk.collect(_run_phases(phases, resource_id, concurrency), stop_on_error, progress)
+
+    def remove_extensions(self, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        extension_ids = [association['extension_id'] for association in self.list_extensions()['items']]
+        return bulk.collect(bulk.run(self.remove_extension, extension_ids, resource_id, concurrency),
+                            stop_on_error, progress)
+
+    def detach_all(self, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        # the main user goes after the secondary users and the device after every user
+        secondary, main = self._users_by_role()
+        first = [('user', user_id) for user_id in secondary]
+        first.extend(('extension', association['extension_id'])
+                     for association in self.list_extensions()['items'])
+        device = self._find_device()
+        last = [('device', device['device_id'])] if device else []
+
+        remove = {'user': self.remove_user,
+                  'extension': self.remove_extension,
+                  'device': self.remove_device}
+
+        def detach(removal):
+            kind, related_id = removal
+            return remove[kind](related_id)
+
+        phases = [(detach, first), (detach, [('user', user_id) for user_id in main]), (detach, last)]
+        return bulk.collect(_run_phases(phases, tuple, concurrency), stop_on_error, progress)
+
+    def _users_by_role(self):
+        associations = self.list_users()['items']
+        secondary = [association['user_id'] for association in associations if not association.get('main_user')]
+        main = [association['user_id'] for association in associations if association.get('main_user')]
+        return secondary, main
+
+    def _find_device(self):
+        try:
+            return self.get_device()
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+
+def _run_phases(phases, key, concurrency):
+    for func, items in phases:
+        outcomes = bulk.run(func, items, key, concurrency)
+        try:
+            for outcome in outcomes:
+                yield outcome
+        finally:
+            outcomes.close()
+
 
 class LinesCommand(CRUDCommand):
 
     resource = 'lines'
+    record_type = Line
     relation_cmd = LineRelation
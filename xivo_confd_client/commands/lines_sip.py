@@ -16,16 +16,19 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 from xivo_confd_client.crud import CRUDCommand
+from xivo_confd_client.records import LineSip
 from xivo_confd_client.util import extract_id
-from xivo_confd_client.relations import UserLineRelation, LineExtensionRelation
+from xivo_confd_client.relations import SharedRelation, UserLineRelation, LineExtensionRelation
 
 
 class LineSIPRelation(object):
 
+    line_extension_relation = SharedRelation(LineExtensionRelation)
+    user_line_relation = SharedRelation(UserLineRelation)
+
     def __init__(self, builder, line_id):
         self.line_id = line_id
-        self.line_extension_relation = LineExtensionRelation(builder)
-        self.user_line_relation = UserLineRelation(builder)
+        self._builder = builder
 
     @extract_id
     def add_extension(self, extension_id):
@@ -54,5 +57,6 @@ class LineSIPRelation(object):
 class LinesSIPCommand(CRUDCommand):
 
     resource = 'lines_sip'
+    record_type = LineSip
 
     relation_cmd = LineSIPRelation
@@ -17,8 +17,37 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 
+import time
+
+from collections import OrderedDict
+
+from requests.exceptions import HTTPError
+
 from xivo_lib_rest_client import HTTPCommand
+from xivo_confd_client import bulk
 from xivo_confd_client.util import url_join
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY, imap
+
+
+class MembershipSync(object):
+
+    def __init__(self, queue_id):
+        self.queue_id = queue_id
+        self.added = []
+        self.edited = []
+        self.removed = []
+        self.unchanged = []
+        self.skipped = []
+        self.errors = {}
+        self.timings = OrderedDict()
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __repr__(self):
+        return '<MembershipSync queue {}: {} added, {} edited, {} removed, {} errors>'.format(
+            self.queue_id, len(self.added), len(self.edited), len(self.removed), len(self.errors))
 
 
 class QueuesCommand(HTTPCommand):
@@ -43,3 +72,86 @@ class QueuesCommand(HTTPCommand):
         url = url_join('queues', queue_id, 'members', 'agents', agent_id)
         body = {'penalty': penalty}
         self.session.put(url, body)
+
+    def sync_members(self, queue_id, members, known_agents=(), concurrency=DEFAULT_CONCURRENCY):
+        """Make the agent members of a queue match members, a dict of agent_id: penalty.
+
+        The API cannot list the members of a queue: the current membership of
+        the agents in members and known_agents is probed, and known agents
+        that are not in members are removed. Adds and penalty edits are
+        applied before any removal, and removals are skipped if one of them
+        failed, so the queue is never emptied mid-sync.
+        """
+        result = MembershipSync(queue_id)
+        start = time.time()
+
+        agent_ids = list(OrderedDict.fromkeys(list(members) + list(known_agents)))
+        current = {}
+        for outcome in imap(lambda agent_id: bulk.attempt(('get', agent_id), self._find_penalty, queue_id, agent_id),
+                            agent_ids, concurrency):
+            if not outcome.ok:
+                result.errors[outcome.key] = outcome
+            elif outcome.result is not None:
+                current[outcome.key[1]] = outcome.result
+        probed = set(agent_ids) - set(key[1] for key in result.errors)
+        result.timings['probe'] = time.time() - start
+
+        changes = []
+        for agent_id, penalty in members.iteritems():
+            if agent_id not in probed:
+                continue
+            if agent_id not in current:
+                changes.append(('add', agent_id, penalty))
+            elif current[agent_id] != penalty:
+                changes.append(('edit', agent_id, penalty))
+            else:
+                result.unchanged.append(agent_id)
+        removals = [('remove', agent_id, None) for agent_id in current if agent_id not in members]
+
+        self._apply(queue_id, changes, concurrency, result, 'apply')
+        if result.errors:
+            result.skipped.extend(agent_id for _, agent_id, _ in removals)
+        else:
+            self._apply(queue_id, removals, concurrency, result, 'remove')
+
+        result.timings['total'] = time.time() - start
+        return result
+
+    def sync_queues(self, queues, known_agents=(), concurrency=DEFAULT_CONCURRENCY):
+        """Sync many queues at once, queues being a dict of queue_id: members.
+
+        Queues are synced concurrently; the changes of each queue are applied
+        one at a time, in the order described in sync_members.
+        """
+        def sync(item):
+            queue_id, members = item
+            return self.sync_members(queue_id, members, known_agents, concurrency=1)
+
+        return OrderedDict((result.queue_id, result) for result in imap(sync, queues.items(), concurrency))
+
+    def _find_penalty(self, queue_id, agent_id):
+        try:
+            return self.get_membership(queue_id, agent_id)['penalty']
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    def _apply(self, queue_id, changes, concurrency, result, timing):
+        start = time.time()
+        actions = {'add': (self.add_agent, result.added),
+                   'edit': (self.edit_membership, result.edited),
+                   'remove': (self.remove_agent, result.removed)}
+
+        def apply_change(change):
+            action, agent_id, penalty = change
+            args = (queue_id, agent_id) if penalty is None else (queue_id, agent_id, penalty)
+            return bulk.attempt((action, agent_id), actions[action][0], *args)
+
+        for outcome in imap(apply_change, changes, concurrency):
+            action, agent_id = outcome.key
+            if outcome.ok:
+                actions[action][1].append(agent_id)
+            else:
+                result.errors[outcome.key] = outcome
+        result.timings[timing] = time.time() - start
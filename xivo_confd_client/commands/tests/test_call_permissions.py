@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from hamcrest import assert_that, contains_inanyorder, equal_to
+
+from ..call_permissions import CallPermissionRelation, CallPermissionsCommand
+
+from xivo_confd_client.tests import TestCommand
+
+
+class TestCallPermissionRelation(TestCommand):
+
+    Command = CallPermissionsCommand
+
+    def test_remove_users(self):
+        self.set_response('get', 200, {'items': [{'user_id': 10, 'call_permission_id': 1},
+                                                 {'user_id': 11, 'call_permission_id': 1}]})
+
+        report = CallPermissionRelation(self.client, 1).remove_users(concurrency=2)
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that([call[0][0] for call in self.session.delete.call_args_list],
+                    contains_inanyorder('/users/10/callpermissions/1', '/users/11/callpermissions/1'))
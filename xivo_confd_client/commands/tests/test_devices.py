@@ -44,3 +44,13 @@ class TestFuncKeys(TestCommand):
         self.command.synchronize(device_id)
 
         self.session.get.assert_called_once_with(expected_url)
+
+    def test_synchronize_with_timeout(self):
+        device_id = "a1b2c3d4e5f6g7h8i9j0k1l2"
+        expected_url = "/devices/{}/synchronize".format(device_id)
+
+        self.set_response('get', 204)
+
+        self.command.synchronize({'id': device_id}, timeout=5)
+
+        self.session.get.assert_called_once_with(expected_url, timeout=5)
@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-from ..funckeys import FuncKeysCommand
+from ..funckeys import FuncKeysCommand, TemplateRelation
 from hamcrest import assert_that
 from hamcrest import equal_to
 from hamcrest import none
@@ -55,6 +55,7 @@ class TestFuncKeys(TestCommand):
         result = self.command.delete_template_funckey(template_id, position)
 
         self.session.delete.assert_called_once_with(expected_url)
+        self.client.publish.assert_called_once_with('updated', 'funckeys/templates', {'id': template_id})
         assert_that(result, none())
 
     def test_update_template_funckey(self):
@@ -68,4 +69,20 @@ class TestFuncKeys(TestCommand):
         result = self.command.update_template_funckey(template_id, position, funckey)
 
         self.session.put.assert_called_once_with(expected_url, funckey)
+        self.client.publish.assert_called_once_with('updated', 'funckeys/templates', {'id': template_id})
         assert_that(result, none())
+
+
+class TestTemplateRelation(TestCommand):
+
+    Command = FuncKeysCommand
+
+    def test_add_user(self):
+        TemplateRelation(self.client, 2).add_user({'id': 1})
+
+        self.session.put.assert_called_once_with("/users/1/funckeys/templates/2")
+
+    def test_remove_user(self):
+        TemplateRelation(self.client, 2).remove_user(1)
+
+        self.session.delete.assert_called_once_with("/users/1/funckeys/templates/2")
@@ -0,0 +1,91 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from hamcrest import assert_that, contains, contains_inanyorder, equal_to, has_item, is_not
+from mock import Mock
+from requests import HTTPError
+
+from ..lines import LineRelation, LinesCommand
+
+from xivo_confd_client.tests import TestCommand
+
+
+class TestLineRelation(TestCommand):
+
+    Command = LinesCommand
+
+    def setUp(self):
+        super(TestLineRelation, self).setUp()
+        self.relation = LineRelation(self.client, 1)
+        self.responses = {'/lines/1/users': {'items': [{'user_id': 9, 'main_user': True},
+                                                       {'user_id': 10, 'main_user': False},
+                                                       {'user_id': 11, 'main_user': False}]},
+                          '/lines/1/extensions': {'items': [{'extension_id': 100}]},
+                          '/lines/1/devices': {'line_id': 1, 'device_id': 'abc'}}
+        self.session.get.side_effect = self.get
+
+    def get(self, url):
+        if url not in self.responses:
+            raise HTTPError(response=Mock(status_code=404))
+        return Mock(json=Mock(return_value=self.responses[url]))
+
+    def deleted(self):
+        return [call[0][0] for call in self.session.delete.call_args_list]
+
+    def test_remove_users(self):
+        report = self.relation.remove_users(concurrency=2)
+
+        assert_that(report.succeeded, equal_to(3))
+        assert_that(self.deleted()[:2], contains_inanyorder('/users/10/lines/1', '/users/11/lines/1'))
+        assert_that(self.deleted()[2], equal_to('/users/9/lines/1'))
+
+    def test_remove_extensions(self):
+        report = self.relation.remove_extensions()
+
+        assert_that(report.succeeded, equal_to(1))
+        self.session.delete.assert_called_once_with('/lines/1/extensions/100')
+
+    def test_detach_all(self):
+        self.session.delete.side_effect = self.refuse_user_11
+
+        report = self.relation.detach_all(concurrency=2)
+
+        assert_that(self.deleted()[:3], contains_inanyorder('/users/10/lines/1', '/users/11/lines/1',
+                                                            '/lines/1/extensions/100'))
+        assert_that(self.deleted()[3:], contains('/users/9/lines/1', '/lines/1/devices/abc'))
+        assert_that(report.succeeded, equal_to(4))
+        assert_that(report.errors.keys(), equal_to([('user', 11)]))
+
+    def test_detach_all_stop_on_error_skips_later_phases(self):
+        self.session.delete.side_effect = self.refuse_user_11
+
+        report = self.relation.detach_all(concurrency=1, stop_on_error=True)
+
+        assert_that(report.stopped, equal_to(True))
+        assert_that(self.deleted(), is_not(has_item('/users/9/lines/1')))
+
+    def test_detach_all_without_device(self):
+        del self.responses['/lines/1/devices']
+
+        report = self.relation.detach_all()
+
+        assert_that(report.total, equal_to(4))
+
+    def refuse_user_11(self, url):
+        if url == '/users/11/lines/1':
+            raise HTTPError(response=Mock(status_code=400, reason='Resource Error'))
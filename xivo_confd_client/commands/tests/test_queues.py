@@ -18,7 +18,13 @@
 
 
 from hamcrest import assert_that
+from hamcrest import contains
+from hamcrest import contains_inanyorder
+from hamcrest import equal_to
 from hamcrest import has_entries
+from hamcrest import has_key
+from mock import Mock
+from requests.exceptions import HTTPError
 from xivo_confd_client.tests import TestCommand
 
 from ..queues import QueuesCommand
@@ -82,3 +88,83 @@ class TestInfos(TestCommand):
         self.command.edit_membership(queue_id, agent_id, 1)
 
         self.session.put.assert_called_once_with(expected_url, expected_response)
+
+
+class TestSyncMembers(TestCommand):
+
+    Command = QueuesCommand
+
+    def setUp(self):
+        super(TestSyncMembers, self).setUp()
+        self.members = {(1, 10): 0, (1, 11): 2, (1, 12): 0, (2, 10): 1}
+        self.calls = []
+        self.session.get.side_effect = self.get
+        self.session.post.side_effect = self.write('post')
+        self.session.put.side_effect = self.write('put')
+        self.session.delete.side_effect = self.write('delete')
+
+    def get(self, url):
+        _, queue_id, _, _, agent_id = url.strip('/').split('/')
+        key = (int(queue_id), int(agent_id))
+        if key not in self.members:
+            response = Mock(status_code=404)
+            raise HTTPError(response=response)
+        return Mock(**{'json.return_value': {'queue_id': key[0], 'agent_id': key[1], 'penalty': self.members[key]}})
+
+    def write(self, action):
+        def call(url, *args):
+            self.calls.append((action, url))
+            return Mock(**{'json.return_value': {}})
+        return call
+
+    def test_sync_members_computes_changes(self):
+        result = self.command.sync_members(1, {10: 0, 11: 1, 13: 0}, known_agents=[12, 14])
+
+        assert_that(result.ok, equal_to(True))
+        assert_that(result.added, contains(13))
+        assert_that(result.edited, contains(11))
+        assert_that(result.removed, contains(12))
+        assert_that(result.unchanged, contains(10))
+        self.session.post.assert_called_once_with('/queues/1/members/agents', {'agent_id': 13, 'penalty': 0})
+        self.session.put.assert_called_once_with('/queues/1/members/agents/11', {'penalty': 1})
+        self.session.delete.assert_called_once_with('/queues/1/members/agents/12')
+
+    def test_removals_come_after_adds_and_edits(self):
+        self.command.sync_members(1, {13: 0, 14: 0}, known_agents=[10, 11, 12])
+
+        actions = [action for action, _ in self.calls]
+        assert_that(actions[:2], contains('post', 'post'))
+        assert_that(actions[2:], contains('delete', 'delete', 'delete'))
+
+    def test_removals_are_skipped_when_a_change_failed(self):
+        self.session.post.side_effect = Exception('boom')
+
+        result = self.command.sync_members(1, {13: 0}, known_agents=[10])
+
+        assert_that(result.errors, has_key(('add', 13)))
+        assert_that(result.skipped, contains(10))
+        assert_that(self.session.delete.called, equal_to(False))
+
+    def test_probe_errors_are_reported(self):
+        self.session.get.side_effect = Exception('boom')
+
+        result = self.command.sync_members(1, {10: 0})
+
+        assert_that(result.errors, has_key(('get', 10)))
+        assert_that(self.session.post.called, equal_to(False))
+
+    def test_timings(self):
+        result = self.command.sync_members(1, {10: 0})
+
+        assert_that(result.timings.keys(), contains('probe', 'apply', 'remove', 'total'))
+
+    def test_sync_queues(self):
+        results = self.command.sync_queues({1: {10: 0}, 2: {10: 2, 11: 0}}, known_agents=[11], concurrency=2)
+
+        assert_that(results[1].removed, contains(11))
+        assert_that(results[2].edited, contains(10))
+        assert_that(results[2].added, contains(11))
+        assert_that([url for _, url in self.calls],
+                    contains_inanyorder('/queues/1/members/agents/11',
+                                        '/queues/2/members/agents/10',
+                                        '/queues/2/members/agents'))
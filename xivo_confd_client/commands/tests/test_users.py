@@ -16,8 +16,11 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
-from hamcrest import assert_that, equal_to
+from StringIO import StringIO
 
+from hamcrest import assert_that, contains, equal_to, instance_of, is_not
+
+from .. import users
 from ..users import UsersCommand
 
 from xivo_confd_client.tests import TestCommand
@@ -61,6 +64,32 @@ class TestUsers(TestCommand):
                                                  timeout=300,
                                                  headers=expected_headers)
 
+    def test_import_csv_from_file_is_streamed(self):
+        csvdata = StringIO("firstname\nToto\n")
+        self.set_response('post', 204, {'created': [{'user_id': 1}]})
+
+        self.command.import_csv(csvdata, timeout=600)
+
+        kwargs = self.session.post.call_args[1]
+        assert_that(kwargs['raw'], is_not(instance_of(basestring)))
+        assert_that(''.join(kwargs['raw']), equal_to("firstname\nToto\n"))
+        assert_that(kwargs['timeout'], equal_to(600))
+
+    def test_update_csv_from_generator_encodes_unicode(self):
+        lines = (line for line in [u"firstname\n", u"Zo\xe9\n"])
+        self.set_response('put', 204, {'updated': [{'user_id': 1}]})
+
+        self.command.update_csv(lines, encoding='latin-1')
+
+        kwargs = self.session.put.call_args[1]
+        assert_that(list(kwargs['raw']), contains("firstname\nZo\xe9\n"))
+        assert_that(kwargs['headers'], equal_to({'Content-Type': 'text/csv; charset=latin-1'}))
+
+    def test_csv_lines_are_grouped_in_chunks(self):
+        chunks = list(users._csv_chunks(['a' * 40000, 'b' * 40000, 'c'], 'utf-8'))
+
+        assert_that([len(chunk) for chunk in chunks], contains(80000, 1))
+
     def test_export_csv(self):
         expected_url = "/users/export"
         expected_content = "firstname\nToto\n"
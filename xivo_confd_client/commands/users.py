@@ -15,8 +15,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+from functools import partial
+
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.relations import (UserLineRelation,
+from xivo_confd_client.records import User
+from xivo_confd_client.relations import (SharedRelation,
+                                         UserLineRelation,
                                          UserVoicemailRelation,
                                          UserFuncKeyRelation,
                                          UserCtiProfileRelation,
@@ -26,19 +30,23 @@ from xivo_confd_client.relations import (UserLineRelation,
                                          UserEntityRelation)
 from xivo_confd_client.util import extract_id, url_join
 
+CSV_CHUNK_SIZE = 64 * 1024
+
 
 class UserRelation(object):
 
+    user_line = SharedRelation(UserLineRelation)
+    user_voicemail = SharedRelation(UserVoicemailRelation)
+    user_funckey = SharedRelation(UserFuncKeyRelation)
+    user_cti_profile = SharedRelation(UserCtiProfileRelation)
+    user_service = SharedRelation(UserServiceRelation)
+    user_forward = SharedRelation(UserForwardRelation)
+    user_call_permission = SharedRelation(UserCallPermissionRelation)
+    user_entity = SharedRelation(UserEntityRelation)
+
     def __init__(self, builder, user_id):
         self.user_id = user_id
-        self.user_line = UserLineRelation(builder)
-        self.user_voicemail = UserVoicemailRelation(builder)
-        self.user_funckey = UserFuncKeyRelation(builder)
-        self.user_cti_profile = UserCtiProfileRelation(builder)
-        self.user_service = UserServiceRelation(builder)
-        self.user_forward = UserForwardRelation(builder)
-        self.user_call_permission = UserCallPermissionRelation(builder)
-        self.user_entity = UserEntityRelation(builder)
+        self._builder = builder
 
     @extract_id
     def add_line(self, line_id):
@@ -138,13 +146,14 @@ class UserRelation(object):
 class UsersCommand(CRUDCommand):
 
     resource = 'users'
+    record_type = User
     relation_cmd = UserRelation
 
     def import_csv(self, csvdata, encoding='utf-8', timeout=300):
         url = url_join(self.resource, "import")
         headers = {'Content-Type': 'text/csv; charset={}'.format(encoding)}
         response = self.session.post(url,
-                                     raw=csvdata,
+                                     raw=_csv_body(csvdata, encoding),
                                      check_response=False,
                                      timeout=timeout,
                                      headers=headers)
@@ -154,7 +163,7 @@ class UsersCommand(CRUDCommand):
         url = url_join(self.resource, "import")
         headers = {'Content-Type': 'text/csv; charset={}'.format(encoding)}
         response = self.session.put(url,
-                                    raw=csvdata,
+                                    raw=_csv_body(csvdata, encoding),
                                     check_response=False,
                                     timeout=timeout,
                                     headers=headers)
@@ -170,3 +179,29 @@ class UsersCommand(CRUDCommand):
         url = url_join(self.resource, user_uuid, "lines/main/associated/endpoints/sip")
         response = self.session.get(url)
         return response.content
+
+
+def _csv_body(csvdata, encoding):
+    if isinstance(csvdata, basestring):
+        return csvdata
+    return _csv_chunks(csvdata, encoding)
+
+
+def _csv_chunks(csvdata, encoding):
+    # file objects and iterables are sent with chunked transfer encoding;
+    # small pieces such as lines are grouped into chunks of CSV_CHUNK_SIZE
+    if hasattr(csvdata, 'read'):
+        csvdata = iter(partial(csvdata.read, CSV_CHUNK_SIZE), '')
+    buffered = []
+    size = 0
+    for piece in csvdata:
+        if isinstance(piece, unicode):
+            piece = piece.encode(encoding)
+        buffered.append(piece)
+        size += len(piece)
+        if size >= CSV_CHUNK_SIZE:
+            yield ''.join(buffered)
+            buffered = []
+            size = 0
+    if size:
+        yield ''.join(buffered)
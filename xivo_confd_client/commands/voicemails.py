@@ -15,16 +15,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-from xivo_confd_client.util import extract_id
+from xivo_confd_client import bulk
+from xivo_confd_client.util import extract_id, resource_id
 from xivo_confd_client.crud import CRUDCommand
-from xivo_confd_client.relations import UserVoicemailRelation
+from xivo_confd_client.records import Voicemail
+from xivo_confd_client.relations import SharedRelation, UserVoicemailRelation
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY
 
 
 class VoicemailRelation(object):
 
+    user_voicemail_relation = SharedRelation(UserVoicemailRelation)
+
     def __init__(self, builder, voicemail_id):
         self.voicemail_id = voicemail_id
-        self.user_voicemail_relation = UserVoicemailRelation(builder)
+        self._builder = builder
 
     @extract_id
     def add_user(self, user_id):
@@ -34,10 +39,9 @@ class VoicemailRelation(object):
     def remove_user(self, user_id):
         self.user_voicemail_relation.dissociate(user_id)
 
-    def remove_users(self):
-        response = self.list_users()
-        for association in response['items']:
-            self.remove_user(association['user_id'])
+    def remove_users(self, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        user_ids = [association['user_id'] for association in self.list_users()['items']]
+        return bulk.collect(bulk.run(self.remove_user, user_ids, resource_id, concurrency), stop_on_error, progress)
 
     def list_users(self):
         return self.user_voicemail_relation.list_by_voicemail(self.voicemail_id)
@@ -46,5 +50,6 @@ class VoicemailRelation(object):
 class VoicemailsCommand(CRUDCommand):
 
     resource = 'voicemails'
+    record_type = Voicemail
 
     relation_cmd = VoicemailRelation
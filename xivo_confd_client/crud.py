@@ -18,14 +18,24 @@
 
 import abc
 
+from operator import itemgetter
+
 from xivo_lib_rest_client import HTTPCommand
-from xivo_confd_client.util import extract_id, url_join
+from xivo_confd_client import bulk
+from xivo_confd_client.query import Query
+from xivo_confd_client.records import Record
+from xivo_confd_client.util import changed_fields, extract_id, resource_id, url_join
+from xivo_confd_client.workers import BackgroundCall, DEFAULT_CONCURRENCY, imap
 
 
 class CRUDCommand(HTTPCommand):
 
     __metaclass__ = abc.ABCMeta
 
+    page_size = 500
+    record_type = Record
+    server_filters = ()
+
     @abc.abstractproperty
     def resource(self):
         return
@@ -39,26 +49,148 @@ class CRUDCommand(HTTPCommand):
         response = self.session.get(url, params=kwargs)
         return response.json()
 
+    def iter_list(self, page_size=None, **kwargs):
+        _reject_limit('iter_list', kwargs)
+        page_size = page_size or self.page_size
+        offset = kwargs.pop('offset', 0)
+        page = self.list(limit=page_size, offset=offset, **kwargs)
+
+        next_page = None
+        try:
+            while True:
+                items = page['items']
+                offset += len(items)
+
+                if self._has_next_page(page, offset, page_size):
+                    next_page = BackgroundCall(self.list, limit=page_size, offset=offset, **kwargs)
+
+                for item in items:
+                    yield item
+
+                if next_page is None:
+                    return
+                page, next_page = next_page.result(), None
+        finally:
+            # closed before the prefetched page was reached: let the request
+            # finish and drop its result, errors included
+            if next_page is not None:
+                next_page.wait()
+
+    def iter_all(self, concurrency=DEFAULT_CONCURRENCY, ordered=True, page_size=None, **kwargs):
+        _reject_limit('iter_all', kwargs)
+        page_size = page_size or self.page_size
+        offset = kwargs.pop('offset', 0)
+        first_page = self.list(limit=page_size, offset=offset, **kwargs)
+        step = len(first_page['items'])
+
+        for item in first_page['items']:
+            yield item
+
+        if not step:
+            return
+
+        def fetch_page(offset):
+            return self.list(limit=step, offset=offset, **kwargs)['items']
+
+        offsets = xrange(offset + step, first_page['total'], step)
+        for items in imap(fetch_page, offsets, concurrency, ordered):
+            for item in items:
+                yield item
+
+    def list_all(self, concurrency=DEFAULT_CONCURRENCY, page_size=None, **kwargs):
+        items = list(self.iter_all(concurrency, True, page_size, **kwargs))
+        return {'total': len(items), 'items': items}
+
+    def query(self):
+        return Query(self)
+
+    def _has_next_page(self, page, offset, page_size):
+        if not page['items']:
+            return False
+        if 'total' in page:
+            return offset < page['total']
+        return len(page['items']) == page_size
+
     @extract_id
     def get(self, resource_id):
         url = url_join(self.resource, resource_id)
         response = self.session.get(url)
         return response.json()
 
+    def list_records(self, fields=None, keep_extra=False, **kwargs):
+        record_type = self.record_type.projection(fields)
+        response = self.list(**kwargs)
+        return {'total': response['total'],
+                'items': [record_type(item, keep_extra) for item in response['items']]}
+
+    def iter_records(self, fields=None, keep_extra=False, page_size=None, **kwargs):
+        record_type = self.record_type.projection(fields)
+        for item in self.iter_list(page_size, **kwargs):
+            yield record_type(item, keep_extra)
+
+    def get_record(self, resource, fields=None, keep_extra=False):
+        return self.record_type.build(self.get(resource), fields, keep_extra)
+
+    def iter_bulk_get(self, resources, concurrency=DEFAULT_CONCURRENCY):
+        return bulk.run(self.get, resources, resource_id, concurrency)
+
+    def bulk_get(self, resources, concurrency=DEFAULT_CONCURRENCY):
+        return bulk.collect(self.iter_bulk_get(resources, concurrency))
+
     def create(self, body):
         url = url_join(self.resource)
         response = self.session.post(url, body)
-        return response.json()
+        resource = response.json()
+        self._client.publish('created', self.resource, resource)
+        return resource
+
+    def iter_bulk_create(self, bodies, concurrency=DEFAULT_CONCURRENCY):
+        def create(indexed_body):
+            return self.create(indexed_body[1])
+        return bulk.run(create, enumerate(bodies), itemgetter(0), concurrency)
+
+    def bulk_create(self, bodies, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        return bulk.collect(self.iter_bulk_create(bodies, concurrency), stop_on_error, progress)
 
     def update(self, body):
+        if self._client.skip_unchanged_updates:
+            self.update_if_changed(body)
+        else:
+            self._send_update(body)
+
+    def update_if_changed(self, body, current=None):
+        if current is None:
+            current = self.get(body['id'])
+        if not changed_fields(body, current):
+            self._client.update_counters.incr('skipped')
+            return False
+        self._send_update(body)
+        return True
+
+    def _send_update(self, body):
         url = url_join(self.resource, body['id'])
         body = {key: value for key, value in body.iteritems() if key != "links"}
         self.session.put(url, body)
+        self._client.update_counters.incr('sent')
+        self._client.publish('updated', self.resource, body)
+
+    def iter_bulk_update(self, bodies, concurrency=DEFAULT_CONCURRENCY):
+        return bulk.run(self.update, bodies, resource_id, concurrency)
+
+    def bulk_update(self, bodies, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        return bulk.collect(self.iter_bulk_update(bodies, concurrency), stop_on_error, progress)
 
     @extract_id
     def delete(self, resource_id):
         url = url_join(self.resource, resource_id)
         self.session.delete(url)
+        self._client.publish('deleted', self.resource, {'id': resource_id})
+
+    def iter_bulk_delete(self, resources, concurrency=DEFAULT_CONCURRENCY):
+        return bulk.run(self.delete, resources, resource_id, concurrency)
+
+    def bulk_delete(self, resources, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        return bulk.collect(self.iter_bulk_delete(resources, concurrency), stop_on_error, progress)
 
     @extract_id
     def relations(self, resource_id):
@@ -66,3 +198,8 @@ class CRUDCommand(HTTPCommand):
 
     def __call__(self, resource):
         return self.relations(resource)
+
+
+def _reject_limit(method, kwargs):
+    if 'limit' in kwargs:
+        raise TypeError('{}() does not take limit, use page_size to set the size of each page'.format(method))
@@ -0,0 +1,103 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from collections import OrderedDict
+
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+
+IGNORED_FIELDS = frozenset(['links'])
+
+
+class Change(object):
+
+    __slots__ = ('action', 'resource', 'key', 'old', 'new')
+
+    def __init__(self, action, resource, key, old=None, new=None):
+        self.action = action
+        self.resource = resource
+        self.key = key
+        self.old = old
+        self.new = new
+
+    @property
+    def fields(self):
+        if self.action != MODIFIED:
+            return []
+        return differing_fields(self.old, self.new)
+
+    def __eq__(self, other):
+        return (isinstance(other, Change) and
+                all(getattr(self, name) == getattr(other, name) for name in self.__slots__))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<Change {} {} {!r}>'.format(self.action, self.resource, self.key)
+
+
+def default_key(item):
+    if 'id' in item:
+        return item['id']
+    return relation_key(item)
+
+
+def relation_key(item):
+    return tuple((field, item[field]) for field in sorted(item) if field.endswith('_id'))
+
+
+def differing_fields(old, new):
+    fields = set(old) | set(new)
+    return sorted(field for field in fields - IGNORED_FIELDS
+                  if old.get(field) != new.get(field))
+
+
+def diff_items(resource, old_items, new_items, key=default_key):
+    remaining = OrderedDict((key(item), item) for item in old_items)
+
+    for item in new_items:
+        item_key = key(item)
+        old = remaining.pop(item_key, None)
+        if old is None:
+            yield Change(ADDED, resource, item_key, new=item)
+        elif differing_fields(old, item):
+            yield Change(MODIFIED, resource, item_key, old=old, new=item)
+
+    for item_key, old in remaining.iteritems():
+        yield Change(REMOVED, resource, item_key, old=old)
+
+
+def diff(old, new, keys=None):
+    keys = keys or {}
+    for resource in sorted(set(old) | set(new)):
+        changes = diff_items(resource,
+                             _items(old.get(resource)),
+                             _items(new.get(resource)),
+                             keys.get(resource, default_key))
+        for change in changes:
+            yield change
+
+
+def _items(collection):
+    if collection is None:
+        return ()
+    if isinstance(collection, dict):
+        return collection['items']
+    return collection
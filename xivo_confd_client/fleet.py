@@ -0,0 +1,160 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import threading
+import time
+
+from functools import partial
+
+from xivo_confd_client.bulk import BulkReport, Outcome, attempt
+from xivo_confd_client.util import resource_id
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY, imap
+
+ACTIONS = ('synchronize', 'autoprov')
+
+
+class RateLimiter(object):
+    """Space calls so that no more than rate calls start per second."""
+
+    def __init__(self, rate, clock=time.time, sleep=time.sleep):
+        self.interval = 1.0 / rate
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._next = None
+
+    def wait(self):
+        with self._lock:
+            now = self.clock()
+            start = now if self._next is None else max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            self.sleep(start - now)
+
+    def limited(self, func):
+        def call(*args, **kwargs):
+            self.wait()
+            return func(*args, **kwargs)
+        return call
+
+
+class FleetReport(BulkReport):
+
+    def __init__(self, expected, clock=time.time):
+        super(FleetReport, self).__init__()
+        self.expected = expected
+        self.waves = 0
+        self.clock = clock
+        self.started = clock()
+
+    @property
+    def remaining(self):
+        return self.expected - self.total
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.started
+
+    @property
+    def eta(self):
+        if not self.total:
+            return None
+        return self.elapsed / self.total * self.remaining
+
+    @property
+    def failed_devices(self):
+        # devices without an id are reported by position and cannot be run again
+        return sorted(key for key in self.errors if not isinstance(key, tuple))
+
+
+class DeviceFleet(object):
+    """Run synchronize or autoprov on many devices.
+
+    Devices are handled in waves of wave_size devices, waiting wave_delay
+    seconds between waves. Within a wave at most concurrency calls are in
+    flight and at most rate calls start per second. Each call gets the
+    given HTTP timeout and, when retry is a bulk.RetryPolicy, transient
+    errors are retried. progress(report, outcome) is called after every
+    device; report.eta estimates the seconds left.
+    """
+
+    def __init__(self, client, concurrency=DEFAULT_CONCURRENCY, rate=None, timeout=None,
+                 retry=None, wave_size=None, wave_delay=0, clock=time.time, sleep=time.sleep):
+        self.client = client
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, clock, sleep) if rate else None
+        self.timeout = timeout
+        self.retry = retry
+        self.wave_size = wave_size
+        self.wave_delay = wave_delay
+        self.clock = clock
+        self.sleep = sleep
+
+    def select(self, devices):
+        if callable(devices):
+            return [device for device in self.client.devices.list_all()['items'] if devices(device)]
+        return list(devices)
+
+    def synchronize(self, devices, stop_on_error=False, progress=None):
+        return self.run('synchronize', devices, stop_on_error, progress)
+
+    def autoprov(self, devices, stop_on_error=False, progress=None):
+        return self.run('autoprov', devices, stop_on_error, progress)
+
+    def run(self, action, devices, stop_on_error=False, progress=None):
+        if action not in ACTIONS:
+            raise ValueError('unknown device action: {}'.format(action))
+        devices = list(enumerate(self.select(devices)))
+        report = FleetReport(len(devices), self.clock)
+        func = partial(getattr(self.client.devices, action), timeout=self.timeout)
+        if self.limiter:
+            func = self.limiter.limited(func)
+
+        def call(indexed_device):
+            position, device = indexed_device
+            try:
+                device_id = resource_id(device)
+            except Exception as e:
+                # the device cannot be identified, e.g. a dict without an id
+                return Outcome(('position', position), error=e)
+            if self.retry:
+                return self.retry.call(device_id, action, func, device_id)
+            return attempt(device_id, func, device_id)
+
+        for wave in self._waves(devices):
+            if report.waves and self.wave_delay:
+                self.sleep(self.wave_delay)
+            report.waves += 1
+            outcomes = imap(call, wave, self.concurrency, ordered=False)
+            try:
+                for outcome in outcomes:
+                    report.add(outcome)
+                    if progress:
+                        progress(report, outcome)
+                    if stop_on_error and not outcome.ok:
+                        report.stopped = True
+                        return report
+            finally:
+                outcomes.close()
+        return report
+
+    def _waves(self, devices):
+        size = self.wave_size or len(devices) or 1
+        for start in xrange(0, len(devices), size):
+            yield devices[start:start + size]
@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+from xivo_confd_client import bulk
+from xivo_confd_client.bulk import Outcome
+from xivo_confd_client.relations import UserForwardRelation, UserServiceRelation, shared_command
+from xivo_confd_client.util import resource_id
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY
+
+IGNORED_FIELDS = frozenset(['links', 'href'])
+
+
+class ForwardsEditor(object):
+    """Apply the same forwards and services patch to many users.
+
+    Users are given as ids, resources, or a predicate on the user list. Each
+    user's forwards and services are read, the patch is merged into them and
+    only what differs is written: forwards with one update_forwards call,
+    services one by one. Users already in the target state are reported as
+    unchanged.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.user_forward = shared_command(client, UserForwardRelation)
+        self.user_service = shared_command(client, UserServiceRelation)
+
+    def select(self, users):
+        if callable(users):
+            return [user for user in self.client.users.list_all()['items'] if users(user)]
+        return users
+
+    def plan(self, patch, current):
+        current = _clean(current)
+        merged = dict(current)
+        changed = []
+        for name, values in (patch or {}).iteritems():
+            merged[name] = dict(current.get(name) or {}, **values)
+            if merged[name] != current.get(name):
+                changed.append(name)
+        return merged, sorted(changed)
+
+    def edit_user(self, user, forwards=None, services=None, dry_run=False):
+        user_id = resource_id(user)
+        forwards_body, forwards_changed = self._plan_forwards(user_id, forwards)
+        services_body, services_changed = self._plan_services(user_id, services)
+        if not dry_run:
+            if forwards_changed:
+                self.user_forward.update_forwards(user_id, forwards_body)
+            for name in services_changed:
+                self.user_service.update_service(user_id, name, services_body[name])
+        return {'forwards': forwards_changed,
+                'services': services_changed,
+                'changed': len(forwards_changed) + len(services_changed)}
+
+    def edit(self, users, forwards=None, services=None, dry_run=False,
+             concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        def edit_user(user):
+            return self.edit_user(user, forwards, services, dry_run)
+
+        outcomes = bulk.run(edit_user, self.select(users), resource_id, concurrency)
+        return bulk.collect(_mark_unchanged(outcomes), stop_on_error, progress)
+
+    def _plan_forwards(self, user_id, forwards):
+        if not forwards:
+            return {}, []
+        return self.plan(forwards, self.user_forward.list_forwards(user_id))
+
+    def _plan_services(self, user_id, services):
+        if not services:
+            return {}, []
+        return self.plan(services, self.user_service.list_services(user_id))
+
+
+def _mark_unchanged(outcomes):
+    try:
+        for outcome in outcomes:
+            if outcome.ok and not outcome.result['changed']:
+                outcome = Outcome(outcome.key, unchanged=True)
+            yield outcome
+    finally:
+        outcomes.close()
+
+
+def _clean(values):
+    return dict((name, dict((key, value) for key, value in settings.iteritems() if key not in IGNORED_FIELDS))
+                for name, settings in values.iteritems()
+                if isinstance(settings, dict))
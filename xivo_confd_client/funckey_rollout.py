@@ -0,0 +1,101 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from xivo_confd_client import bulk
+from xivo_confd_client.relations import UserFuncKeyRelation
+from xivo_confd_client.util import resource_id
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY
+
+IGNORED_FIELDS = frozenset(['id', 'inherited', 'links', 'href'])
+
+
+class FuncKeyRollout(object):
+    """Apply a funckey layout to many users, position by position.
+
+    The layout maps positions to funckeys, or is read from a template. Each
+    user's keys are read and only the positions that differ are updated.
+    With exact=True, positions missing from the layout are removed too.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.user_funckey = UserFuncKeyRelation(client)
+
+    def template_layout(self, template_id):
+        return self.client.funckeys.get(template_id).get('keys', {})
+
+    def plan(self, layout, current, exact=True):
+        layout = _by_position(layout)
+        current = _by_position(current)
+        updates = dict((position, _clean(funckey)) for position, funckey in layout.iteritems()
+                       if position not in current or not _matches(funckey, current[position]))
+        removals = sorted(set(current) - set(layout)) if exact else []
+        return updates, removals
+
+    def rollout_user(self, user, layout, exact=True, dry_run=False):
+        user_id = resource_id(user)
+        current = self.user_funckey.list_funckeys(user_id).get('keys', {})
+        updates, removals = self.plan(layout, current, exact)
+        if not dry_run:
+            for position in sorted(updates):
+                self.user_funckey.update_funckey(user_id, position, updates[position])
+            for position in removals:
+                self.user_funckey.remove_funckey(user_id, position)
+        return {'updated': sorted(updates),
+                'removed': removals,
+                'changed': len(updates) + len(removals)}
+
+    def rollout(self, users, layout=None, template_id=None, exact=True, dry_run=False,
+                concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        if template_id is not None:
+            layout = self.template_layout(template_id)
+        elif layout is None:
+            raise ValueError('rollout needs a layout or a template_id')
+        layout = _by_position(layout)
+
+        def rollout_user(user):
+            return self.rollout_user(user, layout, exact, dry_run)
+
+        outcomes = bulk.run(rollout_user, users, resource_id, concurrency)
+        return bulk.collect(outcomes, stop_on_error, progress)
+
+    def associate_template(self, users, template_id, concurrency=DEFAULT_CONCURRENCY,
+                           stop_on_error=False, progress=None):
+        def associate(user):
+            self.user_funckey.associate_funckey_template(resource_id(user), template_id)
+
+        outcomes = bulk.run(associate, users, resource_id, concurrency)
+        return bulk.collect(outcomes, stop_on_error, progress)
+
+
+def _by_position(keys):
+    return dict((int(position), funckey) for position, funckey in keys.iteritems())
+
+
+def _clean(value):
+    if isinstance(value, dict):
+        return dict((key, _clean(item)) for key, item in value.iteritems() if key not in IGNORED_FIELDS)
+    return value
+
+
+def _matches(desired, current):
+    if isinstance(desired, dict):
+        return isinstance(current, dict) and all(key in current and _matches(value, current[key])
+                                                 for key, value in desired.iteritems()
+                                                 if key not in IGNORED_FIELDS)
+    return desired == current
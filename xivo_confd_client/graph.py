@@ -0,0 +1,193 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from collections import OrderedDict
+
+from requests import HTTPError
+
+from xivo_confd_client.relations import (LineDeviceRelation,
+                                         LineEndpointCustomRelation,
+                                         LineEndpointSccpRelation,
+                                         LineEndpointSipRelation,
+                                         LineExtensionRelation,
+                                         UserLineRelation)
+from xivo_confd_client.util import resource_id
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY, imap
+
+USER = 'user'
+LINE = 'line'
+EXTENSION = 'extension'
+ENDPOINT_SIP = 'endpoint_sip'
+ENDPOINT_SCCP = 'endpoint_sccp'
+ENDPOINT_CUSTOM = 'endpoint_custom'
+DEVICE = 'device'
+
+COMMANDS = {USER: 'users',
+            LINE: 'lines',
+            EXTENSION: 'extensions',
+            ENDPOINT_SIP: 'endpoints_sip',
+            ENDPOINT_SCCP: 'endpoints_sccp',
+            ENDPOINT_CUSTOM: 'endpoints_custom',
+            DEVICE: 'devices'}
+
+
+class Node(object):
+
+    __slots__ = ('kind', 'id', 'data', '_edges')
+
+    def __init__(self, kind, node_id, data=None):
+        self.kind = kind
+        self.id = node_id
+        self.data = data
+        self._edges = OrderedDict()
+
+    def related(self, kind):
+        return list(self._edges.get(kind, {}).itervalues())
+
+    def walk(self, *kinds):
+        nodes = [self]
+        for kind in kinds:
+            found = OrderedDict()
+            for node in nodes:
+                for neighbour in node.related(kind):
+                    found[(neighbour.kind, neighbour.id)] = neighbour
+            nodes = found.values()
+        return nodes
+
+    def _link(self, other):
+        self._edges.setdefault(other.kind, OrderedDict())[other.id] = other
+
+    def __repr__(self):
+        return '<Node {} {!r}>'.format(self.kind, self.id)
+
+
+class Graph(object):
+
+    def __init__(self):
+        self._nodes = OrderedDict()
+
+    def node(self, kind, node_id, data=None):
+        key = (kind, node_id)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = Node(kind, node_id, data)
+        elif data is not None and node.data is None:
+            node.data = data
+        return node
+
+    def link(self, left, right):
+        left._link(right)
+        right._link(left)
+
+    def get(self, kind, node_id):
+        return self._nodes.get((kind, node_id))
+
+    def nodes(self, kind=None):
+        return [node for node in self._nodes.itervalues() if kind is None or node.kind == kind]
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+
+class GraphLoader(object):
+    """Load users with their lines, extensions, endpoints and devices.
+
+    Each level is fetched concurrently and every node is fetched once, no
+    matter how many nodes point to it. With bodies=True the resources
+    themselves are fetched as well and stored in node.data.
+    """
+
+    def __init__(self, client, concurrency=DEFAULT_CONCURRENCY):
+        self.client = client
+        self.concurrency = concurrency
+        self.user_line = UserLineRelation(client)
+        self.line_extension = LineExtensionRelation(client)
+        self.line_device = LineDeviceRelation(client)
+        self.line_endpoints = [(ENDPOINT_SIP, LineEndpointSipRelation(client)),
+                               (ENDPOINT_SCCP, LineEndpointSccpRelation(client)),
+                               (ENDPOINT_CUSTOM, LineEndpointCustomRelation(client))]
+
+    def load(self, users, bodies=False):
+        graph = Graph()
+        user_nodes = []
+        for user in users:
+            data = user if isinstance(user, dict) else None
+            user_nodes.append(graph.node(USER, resource_id(user), data))
+
+        for user_node, lines in imap(self._user_lines, user_nodes, self.concurrency):
+            for line_id in lines:
+                graph.link(user_node, graph.node(LINE, line_id))
+
+        tasks = [(line, fetch) for line in graph.nodes(LINE) for fetch in self._line_fetchers()]
+        for line, related in imap(_run_task, tasks, self.concurrency):
+            for kind, node_id in related:
+                graph.link(line, graph.node(kind, node_id))
+
+        if bodies:
+            self._load_bodies(graph)
+        return graph
+
+    def _user_lines(self, user_node):
+        items = self.user_line.list_by_user(user_node.id)['items']
+        return user_node, [item['line_id'] for item in items]
+
+    def _line_fetchers(self):
+        yield self._extensions
+        for kind, relation in self.line_endpoints:
+            yield self._endpoint_fetcher(kind, relation)
+        yield self._device
+
+    def _extensions(self, line_id):
+        items = self.line_extension.list_by_line(line_id)['items']
+        return [(EXTENSION, item['extension_id']) for item in items]
+
+    def _endpoint_fetcher(self, kind, relation):
+        def fetch(line_id):
+            endpoint = _get_or_none(relation.get_by_line, line_id)
+            return [(kind, endpoint['endpoint_id'])] if endpoint else []
+        return fetch
+
+    def _device(self, line_id):
+        device = _get_or_none(self.line_device.get_by_line, line_id)
+        return [(DEVICE, device['device_id'])] if device else []
+
+    def _load_bodies(self, graph):
+        missing = [node for node in graph.nodes() if node.data is None]
+
+        def fetch(node):
+            return node, getattr(self.client, COMMANDS[node.kind]).get(node.id)
+
+        for node, data in imap(fetch, missing, self.concurrency):
+            node.data = data
+
+
+def _run_task(task):
+    line, fetch = task
+    return line, fetch(line.id)
+
+
+def _get_or_none(func, *args):
+    try:
+        return func(*args)
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return None
+        raise
@@ -0,0 +1,307 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import threading
+
+from collections import defaultdict
+
+from xivo_confd_client.relations import LineExtensionRelation, UserLineRelation, shared_command
+from xivo_confd_client.util import resource_id
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY, imap
+
+
+class MirrorIndex(object):
+
+    def __init__(self):
+        self.users = {}
+        self.lines = {}
+        self.extensions = {}
+        self.users_by_uuid = {}
+        self.lines_by_name = {}
+        self.lines_by_device = defaultdict(list)
+        self.extensions_by_exten = {}
+        self.user_lines = defaultdict(list)
+        self.line_users = defaultdict(list)
+        self.line_extensions = defaultdict(list)
+        self.extension_lines = defaultdict(list)
+
+    def add_user(self, user):
+        self._unindex_user(user['id'])
+        self.users[user['id']] = user
+        if user.get('uuid'):
+            self.users_by_uuid[user['uuid']] = user
+
+    def _unindex_user(self, user_id):
+        user = self.users.pop(user_id, None)
+        if user and user.get('uuid'):
+            self.users_by_uuid.pop(user['uuid'], None)
+
+    def remove_user(self, user_id):
+        self._unindex_user(user_id)
+        for line_id in self.user_lines.pop(user_id, []):
+            _discard(self.line_users, line_id, user_id)
+
+    def add_line(self, line):
+        self._unindex_line(line['id'])
+        self.lines[line['id']] = line
+        if line.get('name'):
+            self.lines_by_name[line['name']] = line
+        if line.get('device_id'):
+            _append(self.lines_by_device, line['device_id'], line['id'])
+
+    def _unindex_line(self, line_id):
+        line = self.lines.pop(line_id, None)
+        if line:
+            if line.get('name'):
+                self.lines_by_name.pop(line['name'], None)
+            if line.get('device_id'):
+                _discard(self.lines_by_device, line['device_id'], line_id)
+
+    def remove_line(self, line_id):
+        self._unindex_line(line_id)
+        for user_id in self.line_users.pop(line_id, []):
+            _discard(self.user_lines, user_id, line_id)
+        for extension_id in self.line_extensions.pop(line_id, []):
+            _discard(self.extension_lines, extension_id, line_id)
+
+    def add_extension(self, extension):
+        self._unindex_extension(extension['id'])
+        self.extensions[extension['id']] = extension
+        self.extensions_by_exten[_exten_key(extension['exten'], extension['context'])] = extension
+
+    def _unindex_extension(self, extension_id):
+        extension = self.extensions.pop(extension_id, None)
+        if extension:
+            self.extensions_by_exten.pop(_exten_key(extension['exten'], extension['context']), None)
+
+    def remove_extension(self, extension_id):
+        self._unindex_extension(extension_id)
+        for line_id in self.extension_lines.pop(extension_id, []):
+            _discard(self.line_extensions, line_id, extension_id)
+
+    def associate_user_line(self, user_id, line_id, main_user=False):
+        _append(self.user_lines, user_id, line_id)
+        _append(self.line_users, line_id, user_id, first=main_user)
+
+    def dissociate_user_line(self, user_id, line_id):
+        _discard(self.user_lines, user_id, line_id)
+        _discard(self.line_users, line_id, user_id)
+
+    def associate_line_extension(self, line_id, extension_id):
+        _append(self.line_extensions, line_id, extension_id)
+        _append(self.extension_lines, extension_id, line_id)
+
+    def dissociate_line_extension(self, line_id, extension_id):
+        _discard(self.line_extensions, line_id, extension_id)
+        _discard(self.extension_lines, extension_id, line_id)
+
+    def associate_line_device(self, line_id, device_id):
+        line = self.lines.get(line_id)
+        if line is not None:
+            self.dissociate_line_device(line_id, line.get('device_id'))
+            line['device_id'] = device_id
+        _append(self.lines_by_device, device_id, line_id)
+
+    def dissociate_line_device(self, line_id, device_id):
+        line = self.lines.get(line_id)
+        if line is not None and line.get('device_id') == device_id:
+            line['device_id'] = None
+        _discard(self.lines_by_device, device_id, line_id)
+
+
+class ConfdMirror(object):
+    """Local copy of users, lines, extensions and their relations.
+
+    Lookups are served from hash indexes without any HTTP request. The mirror
+    follows the changes made through the same client; changes made by other
+    clients are only seen after refresh().
+    """
+
+    resources = {'users': 'user',
+                 'lines': 'line',
+                 'extensions': 'extension'}
+
+    relations = {'user_line': ('user_id', 'line_id'),
+                 'line_extension': ('line_id', 'extension_id'),
+                 'line_device': ('line_id', 'device_id')}
+
+    def __init__(self, client, concurrency=DEFAULT_CONCURRENCY):
+        self._client = client
+        self._concurrency = concurrency
+        self._lock = threading.RLock()
+        self._index = MirrorIndex()
+        self._refreshing = []
+        client.subscribe(self.on_event)
+
+    def close(self):
+        self._client.unsubscribe(self.on_event)
+
+    def refresh(self):
+        # events received while the new index is loaded are replayed on it
+        events = []
+        with self._lock:
+            self._refreshing.append(events)
+        try:
+            index = self._load()
+            with self._lock:
+                for event in events:
+                    self._apply(index, *event)
+                self._index = index
+        finally:
+            with self._lock:
+                self._refreshing.remove(events)
+
+    def _load(self):
+        cache = self._client.relation_cache
+        if cache is not None:
+            # a full refresh reads relations from confd, and caches them again
+            cache.invalidate(UserLineRelation.relation)
+            cache.invalidate(LineExtensionRelation.relation)
+
+        index = MirrorIndex()
+        for user in self._client.users.list_all(self._concurrency)['items']:
+            index.add_user(user)
+        for line in self._client.lines.list_all(self._concurrency)['items']:
+            index.add_line(line)
+        for extension in self._client.extensions.list_all(self._concurrency)['items']:
+            index.add_extension(extension)
+
+        for user_lines, line_extensions in imap(self._line_relations, list(index.lines), self._concurrency):
+            for item in user_lines:
+                index.associate_user_line(item['user_id'], item['line_id'], item.get('main_user', False))
+            for item in line_extensions:
+                index.associate_line_extension(item['line_id'], item['extension_id'])
+        return index
+
+    def _line_relations(self, line_id):
+        user_lines = shared_command(self._client, UserLineRelation).list_by_line(line_id)['items']
+        line_extensions = shared_command(self._client, LineExtensionRelation).list_by_line(line_id)['items']
+        return user_lines, line_extensions
+
+    def on_event(self, action, resource, data):
+        with self._lock:
+            self._apply(self._index, action, resource, data)
+            for events in self._refreshing:
+                events.append((action, resource, data))
+
+    def _apply(self, index, action, resource, data):
+        if resource in self.resources:
+            self._apply_resource(index, action, resource, data)
+        elif resource in self.relations:
+            self._apply_relation(index, action, resource, data)
+
+    def _apply_resource(self, index, action, resource, data):
+        name = self.resources[resource]
+        if action in ('created', 'updated'):
+            merged = dict(getattr(index, resource).get(data['id']) or {})
+            merged.update(data)
+            getattr(index, 'add_' + name)(merged)
+        elif action == 'deleted':
+            getattr(index, 'remove_' + name)(data['id'])
+
+    def _apply_relation(self, index, action, relation, data):
+        left, right = self.relations[relation]
+        if action == 'associated':
+            getattr(index, 'associate_' + relation)(data[left], data[right])
+        elif action == 'dissociated':
+            getattr(index, 'dissociate_' + relation)(data[left], data[right])
+
+    def user(self, user):
+        with self._lock:
+            if isinstance(user, basestring) and user not in self._index.users:
+                return self._index.users_by_uuid.get(user)
+            return self._index.users.get(resource_id(user))
+
+    def line(self, line):
+        with self._lock:
+            return self._index.lines.get(resource_id(line))
+
+    def line_by_name(self, name):
+        with self._lock:
+            return self._index.lines_by_name.get(name)
+
+    def extension(self, extension):
+        with self._lock:
+            return self._index.extensions.get(resource_id(extension))
+
+    def extension_by_exten(self, exten, context='default'):
+        with self._lock:
+            return self._index.extensions_by_exten.get(_exten_key(exten, context))
+
+    def lines_for_user(self, user):
+        user = self.user(user)
+        if user is None:
+            return []
+        with self._lock:
+            return self._lookup(self._index.lines, self._index.user_lines.get(user['id'], []))
+
+    def users_for_line(self, line):
+        with self._lock:
+            return self._lookup(self._index.users, self._index.line_users.get(resource_id(line), []))
+
+    def extensions_for_line(self, line):
+        with self._lock:
+            return self._lookup(self._index.extensions, self._index.line_extensions.get(resource_id(line), []))
+
+    def lines_for_extension(self, extension):
+        with self._lock:
+            return self._lookup(self._index.lines, self._index.extension_lines.get(resource_id(extension), []))
+
+    def lines_for_device(self, device_id):
+        with self._lock:
+            return self._lookup(self._index.lines, self._index.lines_by_device.get(device_id, []))
+
+    def users_for_extension(self, exten, context='default'):
+        extension = self.extension_by_exten(exten, context)
+        if extension is None:
+            return []
+        users = []
+        for line in self.lines_for_extension(extension):
+            for user in self.users_for_line(line):
+                if user not in users:
+                    users.append(user)
+        return users
+
+    def user_for_extension(self, exten, context='default'):
+        users = self.users_for_extension(exten, context)
+        return users[0] if users else None
+
+    def _lookup(self, resources, ids):
+        return [resources[resource_id] for resource_id in ids if resource_id in resources]
+
+
+def _exten_key(exten, context):
+    return u'{}@{}'.format(exten, context)
+
+
+def _append(index, key, value, first=False):
+    values = index[key]
+    if first:
+        if value in values:
+            values.remove(value)
+        values.insert(0, value)
+    elif value not in values:
+        values.append(value)
+
+
+def _discard(index, key, value):
+    values = index.get(key)
+    if values and value in values:
+        values.remove(value)
+        if not values:
+            del index[key]
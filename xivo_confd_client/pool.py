@@ -0,0 +1,91 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connectionpool import (HTTPConnectionPool,
+                                                      HTTPSConnectionPool)
+from requests.packages.urllib3.poolmanager import PoolManager, SSL_KEYWORDS
+
+from xivo_confd_client.util import Counters
+
+
+class CountingPoolMixin(object):
+
+    counters = None
+
+    def _new_conn(self):
+        self.counters.incr('opened')
+        return super(CountingPoolMixin, self)._new_conn()
+
+    def _get_conn(self, timeout=None):
+        if self.block and self.pool is not None and self.pool.empty():
+            self.counters.incr('waited')
+        self.counters.incr('requested')
+        return super(CountingPoolMixin, self)._get_conn(timeout)
+
+
+class CountingHTTPConnectionPool(CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class CountingHTTPSConnectionPool(CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class CountingPoolManager(PoolManager):
+
+    pool_classes = {'http': CountingHTTPConnectionPool,
+                    'https': CountingHTTPSConnectionPool}
+
+    def __init__(self, counters, *args, **kwargs):
+        super(CountingPoolManager, self).__init__(*args, **kwargs)
+        self.counters = counters
+
+    def _new_pool(self, scheme, host, port):
+        pool_kw = dict(self.connection_pool_kw)
+        if scheme == 'http':
+            for kw in SSL_KEYWORDS:
+                pool_kw.pop(kw, None)
+
+        pool = self.pool_classes[scheme](host, port, **pool_kw)
+        pool.counters = self.counters
+        return pool
+
+
+class ConfdHTTPAdapter(HTTPAdapter):
+
+    def __init__(self, *args, **kwargs):
+        self.counters = Counters('requested', 'opened', 'waited')
+        super(ConfdHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+
+        self.poolmanager = CountingPoolManager(self.counters,
+                                               num_pools=connections,
+                                               maxsize=maxsize,
+                                               block=block,
+                                               **pool_kwargs)
+
+    def stats(self):
+        counts = self.counters.as_dict()
+        return {'opened': counts['opened'],
+                'reused': max(counts['requested'] - counts['opened'], 0),
+                'waited': counts['waited']}
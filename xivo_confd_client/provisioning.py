@@ -0,0 +1,157 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import time
+
+from collections import OrderedDict
+
+from xivo_confd_client import bulk
+from xivo_confd_client.relations import (LineEndpointCustomRelation,
+                                         LineEndpointSccpRelation,
+                                         LineEndpointSipRelation,
+                                         LineExtensionRelation,
+                                         UserLineRelation)
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY, imap
+
+RESOURCES = OrderedDict([('user', 'users'),
+                         ('line', 'lines'),
+                         ('endpoint_sip', 'endpoints_sip'),
+                         ('endpoint_sccp', 'endpoints_sccp'),
+                         ('endpoint_custom', 'endpoints_custom'),
+                         ('extension', 'extensions')])
+
+ASSOCIATIONS = [('line_endpoint_sip', LineEndpointSipRelation, 'line', 'endpoint_sip'),
+                ('line_endpoint_sccp', LineEndpointSccpRelation, 'line', 'endpoint_sccp'),
+                ('line_endpoint_custom', LineEndpointCustomRelation, 'line', 'endpoint_custom'),
+                ('user_line', UserLineRelation, 'user', 'line'),
+                ('line_extension', LineExtensionRelation, 'line', 'extension')]
+
+
+class ProvisioningError(Exception):
+
+    def __init__(self, step, error, result):
+        super(ProvisioningError, self).__init__('{} failed: {}'.format(step, error))
+        self.step = step
+        self.error = error
+        self.result = result
+
+
+class ProvisioningResult(object):
+
+    def __init__(self):
+        self.created = OrderedDict()
+        self.associated = []
+        self.timings = OrderedDict()
+        self.rolled_back = []
+        self.rollback_errors = {}
+
+    def __getitem__(self, name):
+        return self.created[name]
+
+    def __contains__(self, name):
+        return name in self.created
+
+    def __repr__(self):
+        return '<ProvisioningResult {}>'.format(', '.join(self.created))
+
+
+class UserProvisioner(object):
+    """Create a user with its line, endpoint and extension, then associate them.
+
+    A spec maps 'user', 'line', one of 'endpoint_sip', 'endpoint_sccp' or
+    'endpoint_custom', and optionally 'extension' to resource bodies. The
+    resources are created concurrently, then associated one after the other.
+    When a step fails, the associations made so far are removed and the
+    created resources deleted before ProvisioningError is raised.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def provision_user(self, spec):
+        result = ProvisioningResult()
+        start = time.time()
+        try:
+            self._create(spec, result)
+            self._associate(result)
+        except ProvisioningError:
+            self._rollback(result)
+            raise
+        finally:
+            result.timings['total'] = time.time() - start
+        return result
+
+    def provision_users(self, specs, concurrency=DEFAULT_CONCURRENCY, stop_on_error=False, progress=None):
+        def provision(indexed_spec):
+            return self.provision_user(indexed_spec[1])
+        outcomes = bulk.run(provision, enumerate(specs), lambda indexed_spec: indexed_spec[0], concurrency)
+        return bulk.collect(outcomes, stop_on_error, progress)
+
+    def _create(self, spec, result):
+        names = [name for name in RESOURCES if name in spec]
+
+        def create(name):
+            return name, _timed(getattr(self.client, RESOURCES[name]).create, spec[name])
+
+        failures = []
+        for name, (elapsed, created, error) in imap(create, names, len(names) or 1):
+            result.timings['create_{}'.format(name)] = elapsed
+            if error is None:
+                result.created[name] = created
+            else:
+                failures.append((name, error))
+
+        if failures:
+            name, error = failures[0]
+            raise ProvisioningError('create_{}'.format(name), error, result)
+
+    def _associate(self, result):
+        for step, relation, left, right in ASSOCIATIONS:
+            if left not in result or right not in result:
+                continue
+            command = relation(self.client)
+            left_id, right_id = result[left]['id'], result[right]['id']
+            elapsed, _, error = _timed(command.associate, left_id, right_id)
+            result.timings['associate_{}'.format(step)] = elapsed
+            if error is not None:
+                raise ProvisioningError('associate_{}'.format(step), error, result)
+            result.associated.append((step, command, left_id, right_id))
+
+    def _rollback(self, result):
+        for step, command, left_id, right_id in reversed(result.associated):
+            self._undo('dissociate_{}'.format(step), result, command.dissociate, left_id, right_id)
+        for name in reversed(result.created.keys()):
+            command = getattr(self.client, RESOURCES[name])
+            self._undo('delete_{}'.format(name), result, command.delete, result.created[name]['id'])
+
+    def _undo(self, step, result, func, *args):
+        elapsed, _, error = _timed(func, *args)
+        result.timings[step] = elapsed
+        if error is None:
+            result.rolled_back.append(step)
+        else:
+            result.rollback_errors[step] = error
+
+
+def _timed(func, *args):
+    start = time.time()
+    try:
+        value = func(*args)
+    except Exception as e:
+        return time.time() - start, None, e
+    return time.time() - start, value, None
@@ -0,0 +1,129 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from itertools import islice
+
+
+class Query(object):
+    """Chainable listing of a CRUD resource.
+
+    search, order, direction, limit and offset are sent to confd. Field filters
+    are sent too when the command lists them in server_filters; other filters
+    and predicates are applied to items as they stream in, in which case limit
+    and offset are applied on the client as well. explain() tells which parts
+    run where.
+    """
+
+    def __init__(self, command):
+        self._command = command
+        self._params = {}
+        self._filters = []
+        self._limit = None
+        self._offset = 0
+
+    def search(self, term):
+        self._params['search'] = term
+        return self
+
+    def order(self, field, direction=None):
+        self._params['order'] = field
+        if direction:
+            self._params['direction'] = direction
+        return self
+
+    def direction(self, direction):
+        self._params['direction'] = direction
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def offset(self, offset):
+        self._offset = offset
+        return self
+
+    def filter(self, predicate=None, **fields):
+        if predicate is not None:
+            self._filters.append((getattr(predicate, '__name__', repr(predicate)), predicate))
+        for field, value in sorted(fields.iteritems()):
+            if field in self._command.server_filters:
+                self._params[field] = value
+            else:
+                self._filters.append(('{}={!r}'.format(field, value), _field_equals(field, value)))
+        return self
+
+    @property
+    def server_side(self):
+        return not self._filters
+
+    def explain(self):
+        server = dict(self._params)
+        client = [description for description, _ in self._filters]
+        paging = {}
+        if self._limit is not None:
+            paging['limit'] = self._limit
+        if self._offset:
+            paging['offset'] = self._offset
+        if self.server_side:
+            server.update(paging)
+        else:
+            client.extend('{}={}'.format(key, value) for key, value in sorted(paging.iteritems()))
+        return {'server': server, 'client': client}
+
+    def __iter__(self):
+        if self.server_side:
+            if self._limit is not None:
+                return iter(self._fetch_page()['items'])
+            return self._command.iter_list(offset=self._offset, **self._params)
+        return self._iter_filtered()
+
+    def all(self):
+        if self.server_side and self._limit is not None:
+            return self._fetch_page()
+        items = list(self)
+        return {'total': len(items), 'items': items}
+
+    def first(self):
+        limit = 1 if self._limit is None else min(self._limit, 1)
+        for item in self.copy().limit(limit):
+            return item
+        return None
+
+    def copy(self):
+        query = Query(self._command)
+        query._params = dict(self._params)
+        query._filters = list(self._filters)
+        query._limit = self._limit
+        query._offset = self._offset
+        return query
+
+    def _fetch_page(self):
+        return self._command.list(limit=self._limit, offset=self._offset, **self._params)
+
+    def _iter_filtered(self):
+        items = (item for item in self._command.iter_list(**self._params)
+                 if all(predicate(item) for _, predicate in self._filters))
+        stop = None if self._limit is None else self._offset + self._limit
+        return islice(items, self._offset, stop)
+
+
+def _field_equals(field, value):
+    def predicate(item):
+        return item.get(field) == value
+    return predicate
@@ -0,0 +1,403 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import sys
+
+from collections import Counter, OrderedDict, defaultdict
+
+from requests import HTTPError
+
+from xivo_confd_client import bulk
+from xivo_confd_client.relations import (LineExtensionRelation,
+                                         UserCallPermissionRelation,
+                                         UserLineRelation,
+                                         UserVoicemailRelation)
+from xivo_confd_client.util import changed_fields
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY, imap
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+ASSOCIATE = 'associate'
+DISSOCIATE = 'dissociate'
+
+ACTIONS = (CREATE, UPDATE, DISSOCIATE, ASSOCIATE, DELETE)
+
+RESOURCES = ('users', 'lines', 'extensions', 'voicemails', 'call_permissions')
+
+NATURAL_KEYS = {'users': ('firstname', 'lastname'),
+                'lines': ('provisioning_code',),
+                'extensions': ('exten', 'context'),
+                'voicemails': ('number', 'context'),
+                'call_permissions': ('name',)}
+
+
+class RelationSpec(object):
+
+    def __init__(self, name, command, left, right, left_field, right_field):
+        self.name = name
+        self.command = command
+        self.left = left
+        self.right = right
+        self.left_field = left_field
+        self.right_field = right_field
+
+    def list(self, command, left_id):
+        raise NotImplementedError()
+
+    def list_lefts(self, command, right_id):
+        raise NotImplementedError()
+
+    def associate(self, command, left_id, right_id):
+        command.associate(left_id, right_id)
+
+    def dissociate(self, command, left_id, right_id):
+        command.dissociate(left_id, right_id)
+
+
+class ListByLeft(RelationSpec):
+
+    def __init__(self, name, command, left, right, left_field, right_field, method, right_method):
+        super(ListByLeft, self).__init__(name, command, left, right, left_field, right_field)
+        self.method = method
+        self.right_method = right_method
+
+    def list(self, command, left_id):
+        return [item[self.right_field] for item in getattr(command, self.method)(left_id)['items']]
+
+    def list_lefts(self, command, right_id):
+        return [item[self.left_field] for item in getattr(command, self.right_method)(right_id)['items']]
+
+
+class LineExtensionSpec(ListByLeft):
+
+    def list_lefts(self, command, extension_id):
+        return _unless_not_found(lambda: [command.get_by_extension(extension_id)['line_id']])
+
+
+class UserVoicemailSpec(RelationSpec):
+
+    def list(self, command, user_id):
+        return _unless_not_found(lambda: [command.get_by_user(user_id)['voicemail_id']])
+
+    def list_lefts(self, command, voicemail_id):
+        return [item['user_id'] for item in command.list_by_voicemail(voicemail_id)['items']]
+
+    def dissociate(self, command, user_id, voicemail_id):
+        command.dissociate(user_id)
+
+
+RELATIONS = OrderedDict((spec.name, spec) for spec in [
+    ListByLeft('user_line', UserLineRelation, 'users', 'lines', 'user_id', 'line_id',
+               'list_by_user', 'list_by_line'),
+    LineExtensionSpec('line_extension', LineExtensionRelation, 'lines', 'extensions', 'line_id', 'extension_id',
+                      'list_by_line', 'get_by_extension'),
+    UserVoicemailSpec('user_voicemail', UserVoicemailRelation, 'users', 'voicemails', 'user_id', 'voicemail_id'),
+    ListByLeft('user_call_permission', UserCallPermissionRelation, 'users', 'call_permissions',
+               'user_id', 'call_permission_id', 'list_by_user', 'list_by_call_permission'),
+])
+
+
+class SkippedOperation(Exception):
+
+    def __init__(self, operation, failed):
+        super(SkippedOperation, self).__init__('{} skipped: {} failed'.format(operation, failed))
+        self.operation = operation
+        self.failed = failed
+
+
+class Operation(object):
+
+    def __init__(self, action, resource, key, body=None, requires=()):
+        self.action = action
+        self.resource = resource
+        self.key = key
+        self.body = body
+        self.requires = list(requires)
+        self.level = 0
+
+    def __repr__(self):
+        return '<Operation {} {} {!r}>'.format(self.action, self.resource, self.key)
+
+
+class Plan(object):
+
+    def __init__(self, operations, ids=None, reads=0):
+        self.operations = operations
+        self.ids = ids or {}
+        self.reads = reads
+
+    def __len__(self):
+        return len(self.operations)
+
+    def waves(self):
+        levels = {}
+        for operation in self.operations:
+            levels.setdefault(operation.level, []).append(operation)
+        return [levels[level] for level in sorted(levels)]
+
+    def counts(self):
+        return Counter((operation.action, operation.resource) for operation in self.operations)
+
+    def summary(self):
+        return {'operations': dict(self.counts()),
+                'waves': len(self.waves()),
+                'requests': {'read': self.reads,
+                             'write': len(self.operations)}}
+
+    def describe(self):
+        lines = []
+        for number, wave in enumerate(self.waves(), 1):
+            lines.append('wave {}:'.format(number))
+            for operation in wave:
+                lines.append('  {} {} {}'.format(operation.action, operation.resource, _format_key(operation.key)))
+        counts = self.counts()
+        lines.append('summary:')
+        for action, resource in sorted(counts, key=lambda item: (ACTIONS.index(item[0]), item[1])):
+            lines.append('  {} {}: {}'.format(action, resource, counts[(action, resource)]))
+        lines.append('estimated requests: {} read, {} write'.format(self.reads, len(self.operations)))
+        return '\n'.join(lines)
+
+
+class Reconciler(object):
+    """Bring confd to the state described by a mapping of resources and relations.
+
+    Resources are lists of bodies matched against confd by their natural key
+    (see NATURAL_KEYS). Relations are lists of [left key, right key] pairs.
+    Only relations of resources listed in the desired state are managed.
+    Resources missing from the desired state are deleted only with prune=True,
+    after dissociating them from anything they are still associated with.
+    """
+
+    def __init__(self, client, keys=None, concurrency=DEFAULT_CONCURRENCY, prune=False):
+        self.client = client
+        self.keys = dict(NATURAL_KEYS, **(keys or {}))
+        self.concurrency = concurrency
+        self.prune = prune
+
+    def reconcile(self, desired, dry_run=False, out=None):
+        plan = self.plan(desired)
+        if dry_run:
+            (out or sys.stdout).write(plan.describe() + '\n')
+            return plan
+        return self.apply(plan)
+
+    def plan(self, desired):
+        relations = [spec for spec in RELATIONS.itervalues() if spec.name in desired]
+        needed = set(desired)
+        needed.update(spec.left for spec in relations)
+        needed.update(spec.right for spec in relations)
+        resources = [name for name in RESOURCES if name in needed]
+
+        current = {}
+        plan = Plan([])
+        self._load_all(resources, current, plan)
+
+        operations = {}
+        for resource in resources:
+            if resource in desired:
+                self._plan_resource(resource, desired[resource], current[resource], operations)
+
+        # pruned resources must first be dissociated, even through relations
+        # that are not managed
+        pruned = defaultdict(set)
+        for operation in operations.itervalues():
+            if operation.action == DELETE:
+                pruned[operation.resource].add(operation.key)
+        if pruned:
+            relations.extend(spec for spec in RELATIONS.itervalues()
+                             if spec not in relations and (spec.left in pruned or spec.right in pruned))
+            sides = set(side for spec in relations for side in (spec.left, spec.right))
+            self._load_all([name for name in RESOURCES if name in sides and name not in current], current, plan)
+
+        dissociations = defaultdict(list)
+        for spec in relations:
+            self._plan_relation(spec, desired, current, operations, plan, dissociations, pruned)
+
+        for operation in operations.itervalues():
+            if operation.action == DELETE:
+                operation.requires.extend(dissociations[(operation.resource, operation.key)])
+
+        _assign_levels(operations.itervalues())
+        plan.operations = sorted(operations.itervalues(), key=lambda op: (op.level, ACTIONS.index(op.action)))
+        return plan
+
+    def apply(self, plan):
+        ids = dict(plan.ids)
+        report = bulk.BulkReport()
+
+        def execute(operation):
+            failed = [required for required in operation.requires if required in report.errors]
+            if failed:
+                raise SkippedOperation(operation, failed[0])
+            return self._execute(operation, ids)
+
+        for wave in plan.waves():
+            for outcome in bulk.run(execute, wave, lambda op: op, self.concurrency):
+                report.add(outcome)
+        return report
+
+    def _load_all(self, resources, current, plan):
+        for resource, items in zip(resources, imap(self._load, resources, self.concurrency)):
+            plan.reads += 1
+            current[resource] = items
+            for item_key, item in items.iteritems():
+                plan.ids[(resource, item_key)] = item['id']
+
+    def _load(self, resource):
+        key = self._key_func(resource)
+        items = getattr(self.client, resource).list_all(self.concurrency)['items']
+        return dict((key(item), item) for item in items)
+
+    def _plan_resource(self, resource, bodies, current, operations):
+        key = self._key_func(resource)
+        wanted = set()
+        for body in bodies:
+            item_key = key(body)
+            wanted.add(item_key)
+            existing = current.get(item_key)
+            if existing is None:
+                operations[(CREATE, resource, item_key)] = Operation(CREATE, resource, item_key, body)
+            elif changed_fields(body, existing):
+                update = dict(existing, **body)
+                operations[(UPDATE, resource, item_key)] = Operation(UPDATE, resource, item_key, update)
+
+        if self.prune:
+            for item_key in current:
+                if item_key not in wanted:
+                    operations[(DELETE, resource, item_key)] = Operation(DELETE, resource, item_key,
+                                                                         current[item_key])
+
+    def _plan_relation(self, spec, desired, current, operations, plan, dissociations, pruned):
+        wanted = set((_as_key(left), _as_key(right)) for left, right in desired.get(spec.name, ()))
+        if spec.name not in desired:
+            managed = set()
+        elif spec.left in desired:
+            left_key = self._key_func(spec.left)
+            managed = set(left_key(body) for body in desired[spec.left])
+        else:
+            managed = set(left for left, right in wanted)
+        existing = self._current_relations(spec, managed | pruned[spec.left], pruned[spec.right], current, plan)
+
+        by_left = defaultdict(list)
+        by_right = defaultdict(list)
+        for pair in existing - wanted:
+            operation = operations[(DISSOCIATE, spec.name, pair)] = Operation(DISSOCIATE, spec.name, pair)
+            by_left[pair[0]].append(operation)
+            by_right[pair[1]].append(operation)
+            dissociations[(spec.left, pair[0])].append(operation)
+            dissociations[(spec.right, pair[1])].append(operation)
+
+        for pair in wanted - existing:
+            requires = [operations[(CREATE, resource, item_key)]
+                        for resource, item_key in zip((spec.left, spec.right), pair)
+                        if (CREATE, resource, item_key) in operations]
+            requires.extend(by_left.get(pair[0], ()))
+            requires.extend(by_right.get(pair[1], ()))
+            operations[(ASSOCIATE, spec.name, pair)] = Operation(ASSOCIATE, spec.name, pair, requires=requires)
+
+    def _current_relations(self, spec, lefts, rights, current, plan):
+        # relations are read from the left side, and from the right side for
+        # rights being deleted
+        command = spec.command(self.client)
+        left_by_id = dict((item['id'], item_key) for item_key, item in current[spec.left].iteritems())
+        right_by_id = dict((item['id'], item_key) for item_key, item in current[spec.right].iteritems())
+        reads = [(spec.left, left) for left in lefts if (spec.left, left) in plan.ids]
+        reads.extend((spec.right, right) for right in rights if (spec.right, right) in plan.ids)
+
+        def list_pairs(read):
+            resource, item_key = read
+            item_id = plan.ids[read]
+            if resource == spec.left:
+                return [(item_key, right_by_id[right_id]) for right_id in spec.list(command, item_id)
+                        if right_id in right_by_id]
+            return [(left_by_id[left_id], item_key) for left_id in spec.list_lefts(command, item_id)
+                    if left_id in left_by_id]
+
+        pairs = set()
+        for found in imap(list_pairs, reads, self.concurrency):
+            plan.reads += 1
+            pairs.update(found)
+        return pairs
+
+    def _execute(self, operation, ids):
+        if operation.action in (ASSOCIATE, DISSOCIATE):
+            spec = RELATIONS[operation.resource]
+            left_id = ids[(spec.left, operation.key[0])]
+            right_id = ids[(spec.right, operation.key[1])]
+            method = spec.associate if operation.action == ASSOCIATE else spec.dissociate
+            return method(spec.command(self.client), left_id, right_id)
+
+        command = getattr(self.client, operation.resource)
+        if operation.action == CREATE:
+            created = command.create(operation.body)
+            ids[(operation.resource, operation.key)] = created['id']
+            return created
+        if operation.action == UPDATE:
+            return command.update(operation.body)
+        return command.delete(operation.body)
+
+    def _key_func(self, resource):
+        fields = self.keys[resource]
+
+        def key(item):
+            return tuple(item.get(field) for field in fields)
+        return key
+
+
+def _assign_levels(operations):
+    # an operation runs one wave after the last operation it requires
+    levels = {}
+    for operation in operations:
+        stack = [operation]
+        while stack:
+            current = stack[-1]
+            if current in levels:
+                stack.pop()
+                continue
+            pending = [required for required in current.requires if required not in levels]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if current.requires:
+                levels[current] = 1 + max(levels[required] for required in current.requires)
+            else:
+                levels[current] = 0
+            current.level = levels[current]
+
+
+def _unless_not_found(list_ids):
+    try:
+        return list_ids()
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return []
+        raise
+
+
+def _as_key(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return (value,)
+
+
+def _format_key(key):
+    if key and isinstance(key[0], tuple):
+        return ' -> '.join(_format_key(part) for part in key)
+    return '/'.join(unicode(part) for part in key)
@@ -0,0 +1,183 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import threading
+
+_projections = {}
+_projections_lock = threading.Lock()
+
+
+class Record(object):
+
+    __slots__ = ()
+
+    fields = ('id',)
+    _field_set = frozenset()
+    _declaration = None
+
+    @classmethod
+    def projection(cls, fields=None):
+        cls = cls._declaration or cls
+        fields = cls.fields if fields is None else tuple(fields)
+        key = (cls, fields)
+        record_type = _projections.get(key)
+        if record_type is None:
+            with _projections_lock:
+                record_type = _projections.get(key)
+                if record_type is None:
+                    attrs = {'__slots__': tuple(str(field) for field in fields) + ('_extra',),
+                             'fields': fields,
+                             '_field_set': frozenset(fields),
+                             '_declaration': cls}
+                    record_type = type(cls.__name__, (cls,), attrs)
+                    _projections[key] = record_type
+        return record_type
+
+    @classmethod
+    def build(cls, data, fields=None, keep_extra=False):
+        return cls.projection(fields)(data, keep_extra)
+
+    def __init__(self, data, keep_extra=False):
+        for field in self.fields:
+            setattr(self, field, data.get(field))
+        if keep_extra:
+            self._extra = {key: value for key, value in data.iteritems() if key not in self._field_set}
+        else:
+            self._extra = None
+
+    @property
+    def extra(self):
+        return self._extra or {}
+
+    def get(self, field, default=None):
+        if field in self._field_set:
+            return getattr(self, field)
+        return self.extra.get(field, default)
+
+    def __getitem__(self, field):
+        if field in self._field_set:
+            return getattr(self, field)
+        return self.extra[field]
+
+    def __contains__(self, field):
+        return field in self._field_set or field in self.extra
+
+    def to_dict(self):
+        result = dict(self.extra)
+        for field in self.fields:
+            result[field] = getattr(self, field)
+        return result
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        values = ', '.join('{}={!r}'.format(field, getattr(self, field)) for field in self.fields)
+        return '<{} {}>'.format(type(self).__name__, values)
+
+
+class User(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'uuid', 'firstname', 'lastname', 'email', 'timezone', 'language',
+              'description', 'caller_id', 'outgoing_caller_id', 'mobile_phone_number',
+              'username', 'password', 'music_on_hold', 'preprocess_subroutine',
+              'userfield', 'call_transfer_enabled', 'supervision_enabled',
+              'ring_seconds', 'simultaneous_calls', 'call_permission_password')
+
+
+class Line(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'context', 'name', 'protocol', 'provisioning_extension',
+              'provisioning_code', 'device_slot', 'position', 'caller_id_name',
+              'caller_id_num', 'registrar', 'device_id')
+
+
+class LineSip(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'username', 'secret', 'context', 'callerid', 'device_slot',
+              'provisioning_extension')
+
+
+class Extension(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'exten', 'context', 'commented')
+
+
+class Device(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'ip', 'mac', 'sn', 'plugin', 'vendor', 'model', 'version',
+              'description', 'status', 'template_id', 'options')
+
+
+class Voicemail(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'name', 'number', 'context', 'password', 'email', 'pager',
+              'language', 'timezone', 'max_messages', 'attach_audio',
+              'delete_messages', 'ask_password', 'enabled', 'options')
+
+
+class EndpointSip(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'username', 'secret', 'type', 'host', 'options')
+
+
+class EndpointSccp(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'options')
+
+
+class EndpointCustom(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'interface', 'enabled')
+
+
+class CallPermission(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'name', 'password', 'description', 'mode', 'enabled', 'extensions')
+
+
+class FuncKeyTemplate(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'name', 'description', 'keys')
@@ -16,277 +16,381 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
+import threading
+
+from collections import OrderedDict
+
 from xivo_lib_rest_client import HTTPCommand
-from xivo_confd_client.util import url_join
+from xivo_confd_client import bulk
+from xivo_confd_client.util import resource_id, url_join
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY, imap
+
+
+_shared_lock = threading.Lock()
+
+
+def shared_command(client, command_class):
+    commands = client.__dict__.get('_relation_commands')
+    if commands is not None and command_class in commands:
+        return commands[command_class]
+    with _shared_lock:
+        commands = client.__dict__.setdefault('_relation_commands', {})
+        if command_class not in commands:
+            commands[command_class] = command_class(client)
+        return commands[command_class]
+
+
+class SharedRelation(object):
+    """Relation command of a facade, built on first use and shared per client.
+
+    Relation commands only hold their client, so one instance per client and
+    class is enough; it is kept on the client and goes away with it. Assigning
+    the attribute on a facade overrides it.
+    """
+
+    def __init__(self, command_class):
+        self.command_class = command_class
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return shared_command(instance._builder, self.command_class)
+
+
+class RelationCommand(HTTPCommand):
+
+    relation = None
+
+    def _get(self, url, **ids):
+        cache = self._client.relation_cache
+        if cache is None:
+            return self.session.get(url).json()
+        return cache.get(self.relation, url, ids, lambda: self.session.get(url).json())
 
+    def _publish(self, action, **ids):
+        self._client.publish(action, self.relation, ids)
 
-class UserLineRelation(HTTPCommand):
+    def associate_many(self, pairs, concurrency=DEFAULT_CONCURRENCY, retry=None, stop_on_error=False, progress=None):
+        return self._run_many('associate', pairs, concurrency, retry, stop_on_error, progress)
+
+    def dissociate_many(self, pairs, concurrency=DEFAULT_CONCURRENCY, retry=None, stop_on_error=False, progress=None):
+        return self._run_many('dissociate', pairs, concurrency, retry, stop_on_error, progress)
+
+    def _run_many(self, action, pairs, concurrency, retry, stop_on_error, progress):
+        func = getattr(self, action)
+        policy = retry or bulk.RetryPolicy(retries=0)
+
+        groups = OrderedDict()
+        for pair in pairs:
+            if not isinstance(pair, (tuple, list)):
+                pair = (pair,)
+            key = tuple(resource_id(part) for part in pair)
+            groups.setdefault(key[0], []).append(key)
+
+        def run_group(keys):
+            return [policy.call(key, action, func, *key) for key in keys]
+
+        outcomes = (outcome
+                    for group in imap(run_group, groups.itervalues(), concurrency, ordered=False)
+                    for outcome in group)
+        return bulk.collect(outcomes, stop_on_error, progress)
+
+
+class UserLineRelation(RelationCommand):
+
+    relation = 'user_line'
 
     def associate(self, user_id, line_id):
         url = url_join('users', user_id, 'lines')
         body = {'line_id': line_id}
         response = self.session.post(url, body)
+        self._publish('associated', user_id=user_id, line_id=line_id)
         return response.json()
 
     def dissociate(self, user_id, line_id):
         url = url_join('users', user_id, 'lines', line_id)
         self.session.delete(url)
+        self._publish('dissociated', user_id=user_id, line_id=line_id)
 
     def list_by_user(self, user_id):
         url = url_join('users', user_id, 'lines')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id)
 
     def list_by_line(self, line_id):
         url = url_join('lines', line_id, 'users')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, line_id=line_id)
 
 
-class UserVoicemailRelation(HTTPCommand):
+class UserVoicemailRelation(RelationCommand):
+
+    relation = 'user_voicemail'
 
     def associate(self, user_id, voicemail_id):
         url = url_join('users', user_id, 'voicemail')
         body = {'voicemail_id': voicemail_id}
         response = self.session.post(url, body)
+        self._publish('associated', user_id=user_id, voicemail_id=voicemail_id)
         return response.json()
 
     def dissociate(self, user_id):
         url = url_join('users', user_id, 'voicemail')
         self.session.delete(url)
+        self._publish('dissociated', user_id=user_id)
 
     def get_by_user(self, user_id):
         url = url_join('users', user_id, 'voicemail')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id)
 
     def list_by_voicemail(self, voicemail_id):
         url = url_join('voicemails', voicemail_id, 'users')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, voicemail_id=voicemail_id)
+
 
+class LineDeviceRelation(RelationCommand):
 
-class LineDeviceRelation(HTTPCommand):
+    relation = 'line_device'
 
     def associate(self, line_id, device_id):
         url = url_join('lines', line_id, 'devices', device_id)
         self.session.put(url)
+        self._publish('associated', line_id=line_id, device_id=device_id)
 
     def dissociate(self, line_id, device_id):
         url = url_join('lines', line_id, 'devices', device_id)
         self.session.delete(url)
+        self._publish('dissociated', line_id=line_id, device_id=device_id)
 
     def get_by_line(self, line_id):
         url = url_join('lines', line_id, 'devices')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, line_id=line_id)
 
     def list_by_device(self, device_id):
         url = url_join('devices', device_id, 'lines')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, device_id=device_id)
+
 
+class LineExtensionRelation(RelationCommand):
 
-class LineExtensionRelation(HTTPCommand):
+    relation = 'line_extension'
 
     def associate(self, line_id, extension_id):
         url = url_join('lines', line_id, 'extensions')
         body = {'extension_id': extension_id}
         response = self.session.post(url, body)
+        self._publish('associated', line_id=line_id, extension_id=extension_id)
         return response.json()
 
     def dissociate(self, line_id, extension_id):
         url = url_join('lines', line_id, 'extensions', extension_id)
         self.session.delete(url)
+        self._publish('dissociated', line_id=line_id, extension_id=extension_id)
 
     def list_by_line(self, line_id):
         url = url_join('lines', line_id, 'extensions')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, line_id=line_id)
 
     def get_by_extension(self, extension_id):
         url = url_join('extensions', extension_id, 'line')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, extension_id=extension_id)
 
 
-class LineEndpointSipRelation(HTTPCommand):
+class LineEndpointSipRelation(RelationCommand):
+
+    relation = 'line_endpoint_sip'
 
     def associate(self, line_id, sip_id):
         url = url_join('lines', line_id, 'endpoints', 'sip', sip_id)
         self.session.put(url)
+        self._publish('associated', line_id=line_id, endpoint_id=sip_id)
 
     def dissociate(self, line_id, sip_id):
         url = url_join('lines', line_id, 'endpoints', 'sip', sip_id)
         self.session.delete(url)
+        self._publish('dissociated', line_id=line_id, endpoint_id=sip_id)
 
     def get_by_line(self, line_id):
         url = url_join('lines', line_id, 'endpoints', 'sip')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, line_id=line_id)
 
     def get_by_endpoint_sip(self, sip_id):
         url = url_join('endpoints', 'sip', sip_id, 'lines')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, endpoint_id=sip_id)
+
 
+class LineEndpointSccpRelation(RelationCommand):
 
-class LineEndpointSccpRelation(HTTPCommand):
+    relation = 'line_endpoint_sccp'
 
     def associate(self, line_id, sccp_id):
         url = url_join('lines', line_id, 'endpoints', 'sccp', sccp_id)
         self.session.put(url)
+        self._publish('associated', line_id=line_id, endpoint_id=sccp_id)
 
     def dissociate(self, line_id, sccp_id):
         url = url_join('lines', line_id, 'endpoints', 'sccp', sccp_id)
         self.session.delete(url)
+        self._publish('dissociated', line_id=line_id, endpoint_id=sccp_id)
 
     def get_by_line(self, line_id):
         url = url_join('lines', line_id, 'endpoints', 'sccp')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, line_id=line_id)
 
     def get_by_endpoint_sccp(self, sccp_id):
         url = url_join('endpoints', 'sccp', sccp_id, 'lines')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, endpoint_id=sccp_id)
 
 
-class LineEndpointCustomRelation(HTTPCommand):
+class LineEndpointCustomRelation(RelationCommand):
+
+    relation = 'line_endpoint_custom'
 
     def associate(self, line_id, custom_id):
         url = url_join('lines', line_id, 'endpoints', 'custom', custom_id)
         self.session.put(url)
+        self._publish('associated', line_id=line_id, endpoint_id=custom_id)
 
     def dissociate(self, line_id, custom_id):
         url = url_join('lines', line_id, 'endpoints', 'custom', custom_id)
         self.session.delete(url)
+        self._publish('dissociated', line_id=line_id, endpoint_id=custom_id)
 
     def get_by_line(self, line_id):
         url = url_join('lines', line_id, 'endpoints', 'custom')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, line_id=line_id)
 
     def get_by_endpoint_custom(self, custom_id):
         url = url_join('endpoints', 'custom', custom_id, 'lines')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, endpoint_id=custom_id)
+
 
+class UserFuncKeyRelation(RelationCommand):
 
-class UserFuncKeyRelation(HTTPCommand):
+    relation = 'user_funckey'
 
     def update_funckey(self, user_id, position, funckey):
         url = url_join('users', user_id, 'funckeys', position)
         self.session.put(url, funckey)
+        self._publish('updated', user_id=user_id, position=position)
 
     def remove_funckey(self, user_id, position):
         url = url_join('users', user_id, 'funckeys', position)
         self.session.delete(url)
+        self._publish('deleted', user_id=user_id, position=position)
 
     def get_funckey(self, user_id, position):
         url = url_join('users', user_id, 'funckeys', position)
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id, position=position)
 
     def list_funckeys(self, user_id):
         url = url_join('users', user_id, 'funckeys')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id)
 
     def associate_funckey_template(self, user_id, template_id):
         url = url_join('users', user_id, 'funckeys', 'templates', template_id)
         self.session.put(url)
+        self._publish('associated', user_id=user_id, template_id=template_id)
 
     def dissociate_funckey_template(self, user_id, template_id):
         url = url_join('users', user_id, 'funckeys', 'templates', template_id)
         self.session.delete(url)
+        self._publish('dissociated', user_id=user_id, template_id=template_id)
+
 
+class UserCtiProfileRelation(RelationCommand):
 
-class UserCtiProfileRelation(HTTPCommand):
+    relation = 'user_cti_profile'
 
     def get_by_user(self, user_id):
         url = url_join('users', user_id, 'cti')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id)
 
     def associate(self, user_id, cti_profile_id, enabled=True):
         url = url_join('users', user_id, 'cti')
         body = {'cti_profile_id': cti_profile_id,
                 'enabled': enabled}
         self.session.put(url, body)
+        self._publish('associated', user_id=user_id, cti_profile_id=cti_profile_id)
 
     def disable(self, user_id):
         url = url_join('users', user_id, 'cti')
         body = {'enabled': False}
         self.session.put(url, body)
+        self._publish('updated', user_id=user_id)
+
 
+class UserServiceRelation(RelationCommand):
 
-class UserServiceRelation(HTTPCommand):
+    relation = 'user_service'
 
     def update_service(self, user_id, service_name, service):
         url = url_join('users', user_id, 'services', service_name)
         self.session.put(url, service)
+        self._publish('updated', user_id=user_id, service_name=service_name)
 
     def get_service(self, user_id, service_name):
         url = url_join('users', user_id, 'services', service_name)
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id, service_name=service_name)
 
     def list_services(self, user_id):
         url = url_join('users', user_id, 'services')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id)
+
 
+class UserForwardRelation(RelationCommand):
 
-class UserForwardRelation(HTTPCommand):
+    relation = 'user_forward'
 
     def update_forward(self, user_id, forward_name, forward):
         url = url_join('users', user_id, 'forwards', forward_name)
         self.session.put(url, forward)
+        self._publish('updated', user_id=user_id, forward_name=forward_name)
 
     def get_forward(self, user_id, forward_name):
         url = url_join('users', user_id, 'forwards', forward_name)
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id, forward_name=forward_name)
 
     def list_forwards(self, user_id):
         url = url_join('users', user_id, 'forwards')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id)
 
     def update_forwards(self, user_id, forwards):
         url = url_join('users', user_id, 'forwards')
         self.session.put(url, forwards)
+        self._publish('updated', user_id=user_id)
 
 
-class UserCallPermissionRelation(HTTPCommand):
+class UserCallPermissionRelation(RelationCommand):
+
+    relation = 'user_call_permission'
 
     def associate(self, user_id, call_permission_id):
         url = url_join('users', user_id, 'callpermissions', call_permission_id)
         self.session.put(url)
+        self._publish('associated', user_id=user_id, call_permission_id=call_permission_id)
 
     def dissociate(self, user_id, call_permission_id):
         url = url_join('users', user_id, 'callpermissions', call_permission_id)
         self.session.delete(url)
+        self._publish('dissociated', user_id=user_id, call_permission_id=call_permission_id)
 
     def list_by_user(self, user_id):
         url = url_join('users', user_id, 'callpermissions')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id)
 
     def list_by_call_permission(self, call_permission_id):
         url = url_join('callpermissions', call_permission_id, 'users')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, call_permission_id=call_permission_id)
+
 
+class UserEntityRelation(RelationCommand):
 
-class UserEntityRelation(HTTPCommand):
+    relation = 'user_entity'
 
     def associate(self, user_id, entity_id):
         url = url_join('users', user_id, 'entities', entity_id)
         self.session.put(url)
+        self._publish('associated', user_id=user_id, entity_id=entity_id)
 
     def get_by_user(self, user_id):
         url = url_join('users', user_id, 'entities')
-        response = self.session.get(url)
-        return response.json()
+        return self._get(url, user_id=user_id)
@@ -19,6 +19,8 @@
 import requests
 import json
 
+from xivo_confd_client.auth import ConfdDigestAuth, is_replayable
+
 
 class ConfdSession(object):
 
@@ -65,8 +67,10 @@ class ConfdSession(object):
 
         url = self.clean_url(url)
         encoded_body = self.encode_body(body, kwargs)
+        self._prepare_stream(encoded_body)
         response = self.session.post(url, data=encoded_body, **kwargs)
 
+        self._check_stream(encoded_body, response)
         self.check_response(response, check_response)
         return response
 
@@ -76,8 +80,10 @@ class ConfdSession(object):
 
         url = self.clean_url(url)
         encoded_body = self.encode_body(body, kwargs)
+        self._prepare_stream(encoded_body)
         response = self.session.put(url, data=encoded_body, **kwargs)
 
+        self._check_stream(encoded_body, response)
         self.check_response(response, check_response)
         return response
 
@@ -89,6 +95,20 @@ class ConfdSession(object):
             return json.dumps(body)
         return None
 
+    def _prepare_stream(self, body):
+        # a streamed body cannot be sent again after a digest challenge:
+        # get the challenge first with a cheap request
+        auth = getattr(self.session, 'auth', None)
+        if is_replayable(body) or not isinstance(auth, ConfdDigestAuth):
+            return
+        if not auth.has_challenge(self.base_url):
+            self.get('/infos', check_response=False)
+
+    def _check_stream(self, body, response):
+        if response.status_code == requests.codes.unauthorized and not is_replayable(body):
+            raise requests.HTTPError('401 Unauthorized: the streamed body could not be sent again '
+                                     'after the digest challenge', response=response)
+
     def delete(self, url, **kwargs):
         kwargs.setdefault('headers', self.READ_HEADERS)
         check_response = kwargs.pop('check_response', True)
@@ -0,0 +1,186 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from xivo_confd_client.workers import DEFAULT_CONCURRENCY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    collection TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    item_id TEXT,
+    body TEXT NOT NULL,
+    PRIMARY KEY (collection, position)
+);
+CREATE INDEX IF NOT EXISTS items_by_id ON items (collection, item_id);
+CREATE TABLE IF NOT EXISTS relations (
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    left_id TEXT NOT NULL,
+    right_id TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (name, position)
+);
+CREATE INDEX IF NOT EXISTS relations_by_left ON relations (name, left_id);
+CREATE INDEX IF NOT EXISTS relations_by_right ON relations (name, right_id);
+"""
+
+
+class ReadOnlySnapshotError(Exception):
+    pass
+
+
+class SnapshotStore(object):
+    """Collections and relations fetched from confd, persisted in SQLite.
+
+    Collections are returned in the same shape as CRUDCommand.list(). A
+    collection older than max_age seconds is considered stale and is fetched
+    again by the loaders; a max_age of None never expires. A read-only store
+    never writes to the file: stale collections are still fetched from confd
+    but are not saved.
+    """
+
+    def __init__(self, path, max_age=None, read_only=False):
+        self.path = path
+        self.max_age = max_age
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        if read_only and not os.path.exists(path):
+            path = ':memory:'
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if not read_only:
+            with self._db:
+                self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def list(self, command, concurrency=DEFAULT_CONCURRENCY, max_age=None):
+        name = command.resource
+        if not self.is_stale(name, max_age):
+            return self.load(name)
+        collection = command.list_all(concurrency)
+        if not self.read_only:
+            self.save(name, collection['items'])
+        return collection
+
+    def list_relation(self, name, fetch, left_key, right_key, max_age=None):
+        if not self.is_stale(_relation_name(name), max_age):
+            return self.load_relation(name)
+        items = list(fetch())
+        if not self.read_only:
+            self.save_relation(name, items, left_key, right_key)
+        return {'total': len(items), 'items': items}
+
+    def age(self, name):
+        row = self._fetchone('SELECT fetched_at FROM collections WHERE name = ?', (name,))
+        if row is None:
+            return None
+        return time.time() - row[0]
+
+    def is_stale(self, name, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        age = self.age(name)
+        if age is None:
+            return True
+        return max_age is not None and age > max_age
+
+    def save(self, name, items):
+        rows = ((name, position, _key(item.get('id')), json.dumps(item))
+                for position, item in enumerate(items))
+        self._replace(name, 'DELETE FROM items WHERE collection = ?',
+                      'INSERT INTO items (collection, position, item_id, body) VALUES (?, ?, ?, ?)',
+                      rows)
+
+    def load(self, name):
+        total = self._fetchone('SELECT total FROM collections WHERE name = ?', (name,))
+        if total is None:
+            return None
+        rows = self._fetchall('SELECT body FROM items WHERE collection = ? ORDER BY position', (name,))
+        return {'total': total[0], 'items': [json.loads(row[0]) for row in rows]}
+
+    def get(self, name, resource_id):
+        row = self._fetchone('SELECT body FROM items WHERE collection = ? AND item_id = ?',
+                             (name, _key(resource_id)))
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def save_relation(self, name, items, left_key, right_key):
+        rows = ((name, position, _key(item[left_key]), _key(item[right_key]), json.dumps(item))
+                for position, item in enumerate(items))
+        self._replace(_relation_name(name), 'DELETE FROM relations WHERE name = ?',
+                      'INSERT INTO relations (name, position, left_id, right_id, body) VALUES (?, ?, ?, ?, ?)',
+                      rows, name)
+
+    def load_relation(self, name, left_id=None, right_id=None):
+        query = 'SELECT body FROM relations WHERE name = ?'
+        params = [name]
+        if left_id is not None:
+            query += ' AND left_id = ?'
+            params.append(_key(left_id))
+        if right_id is not None:
+            query += ' AND right_id = ?'
+            params.append(_key(right_id))
+        rows = self._fetchall(query + ' ORDER BY position', params)
+        items = [json.loads(row[0]) for row in rows]
+        return {'total': len(items), 'items': items}
+
+    def _replace(self, collection, delete, insert, rows, key=None):
+        if self.read_only:
+            raise ReadOnlySnapshotError('snapshot {} is read-only'.format(self.path))
+        key = collection if key is None else key
+        with self._lock, self._db:
+            self._db.execute(delete, (key,))
+            cursor = self._db.executemany(insert, rows)
+            self._db.execute('INSERT OR REPLACE INTO collections (name, fetched_at, total) VALUES (?, ?, ?)',
+                             (collection, time.time(), max(cursor.rowcount, 0)))
+
+    def _fetchone(self, query, params):
+        rows = self._fetchall(query, params)
+        return rows[0] if rows else None
+
+    def _fetchall(self, query, params):
+        with self._lock:
+            try:
+                return self._db.execute(query, params).fetchall()
+            except sqlite3.OperationalError:
+                if self.read_only:
+                    return []
+                raise
+
+
+def _relation_name(name):
+    return 'relation:{}'.format(name)
+
+
+def _key(value):
+    if value is None:
+        return None
+    return unicode(value)
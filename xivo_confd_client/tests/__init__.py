@@ -21,13 +21,30 @@ from mock import Mock
 
 from ..session import ConfdSession
 
+HTTP_ACTIONS = ('get', 'post', 'put', 'delete')
+
+
+def threadsafe_mock(mock, *attributes):
+    # Mock creates its attributes lazily, which is not safe from worker
+    # threads: create the ones the code under test calls concurrently
+    for attribute in attributes:
+        getattr(mock, attribute)
+    return mock
+
+
+def mock_client():
+    session = threadsafe_mock(Mock(ConfdSession), *HTTP_ACTIONS)
+    client = Mock()
+    client.skip_unchanged_updates = False
+    client.relation_cache = None
+    client.session.return_value = session
+    return client, session
+
 
 class TestCommand(unittest.TestCase):
 
     def setUp(self):
-        self.session = Mock(ConfdSession)
-        self.client = Mock()
-        self.client.session.return_value = self.session
+        self.client, self.session = mock_client()
         self.command = self.Command(self.client)
 
     def set_response(self, action, status_code, json=None, content=None):
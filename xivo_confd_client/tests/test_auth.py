@@ -0,0 +1,149 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, contains_string, equal_to, has_entries, is_not, has_key, same_instance
+from mock import Mock
+from requests import Request
+
+from xivo_confd_client.auth import ConfdDigestAuth, DigestChallenge
+
+CHALLENGE = 'Digest realm="confd", nonce="abc", qop="auth", opaque="xyz"'
+URL = 'http://localhost:9486/1.1/users'
+
+
+class TestDigestChallenge(unittest.TestCase):
+
+    def test_from_header(self):
+        challenge = DigestChallenge.from_header(CHALLENGE + ', stale=TRUE')
+
+        assert_that(challenge.realm, equal_to('confd'))
+        assert_that(challenge.nonce, equal_to('abc'))
+        assert_that(challenge.qop, equal_to('auth'))
+        assert_that(challenge.opaque, equal_to('xyz'))
+        assert_that(challenge.stale, equal_to(True))
+
+    def test_given_basic_challenge_then_none(self):
+        assert_that(DigestChallenge.from_header('Basic realm="confd"'), equal_to(None))
+
+
+class TestConfdDigestAuth(unittest.TestCase):
+
+    def setUp(self):
+        self.auth = ConfdDigestAuth('alice', 's3cre7')
+
+    def prepare(self, method='GET', url=URL, **kwargs):
+        return self.auth(Request(method, url, **kwargs).prepare())
+
+    def unauthorized(self, request, header=CHALLENGE):
+        response = Mock()
+        response.status_code = 401
+        response.headers = {'www-authenticate': header}
+        response.raw._original_response = None
+        response.request = request
+        response.history = []
+        response.connection.send.side_effect = self.send
+        return response
+
+    def send(self, request, **kwargs):
+        response = Mock()
+        response.status_code = 200
+        response.request = request
+        response.history = []
+        return response
+
+    def challenge(self):
+        request = self.prepare()
+        return request.hooks['response'][0](self.unauthorized(request))
+
+    def test_given_no_challenge_then_request_is_not_signed(self):
+        request = self.prepare()
+
+        assert_that(request.headers, is_not(has_key('Authorization')))
+
+    def test_given_challenge_then_request_is_retried_with_signature(self):
+        retry = self.challenge()
+
+        assert_that(retry.status_code, equal_to(200))
+        assert_that(retry.request.headers['Authorization'], contains_string('nonce="abc"'))
+        assert_that(retry.request.headers['Authorization'], contains_string('nc=00000001'))
+        assert_that(self.auth.stats(), has_entries(challenged=1, preemptive=0))
+
+    def test_given_challenge_then_next_requests_are_signed_preemptively(self):
+        self.challenge()
+
+        first = self.prepare()
+        second = self.prepare()
+
+        assert_that(first.headers['Authorization'], contains_string('nc=00000002'))
+        assert_that(second.headers['Authorization'], contains_string('nc=00000003'))
+        assert_that(self.auth.stats(), has_entries(challenged=1, preemptive=2))
+
+    def test_given_challenge_then_other_hosts_are_not_signed(self):
+        self.challenge()
+
+        request = self.prepare(url='http://otherhost:9486/1.1/users')
+
+        assert_that(request.headers, is_not(has_key('Authorization')))
+
+    def test_given_stale_nonce_then_request_is_retried_with_new_nonce(self):
+        self.challenge()
+        request = self.prepare()
+
+        stale = self.unauthorized(request, 'Digest realm="confd", nonce="def", qop="auth", stale=true')
+        retry = request.hooks['response'][0](stale)
+
+        assert_that(retry.request.headers['Authorization'], contains_string('nonce="def"'))
+        assert_that(retry.request.headers['Authorization'], contains_string('nc=00000001'))
+
+    def test_given_signed_request_rejected_with_same_nonce_then_not_retried(self):
+        self.challenge()
+        request = self.prepare()
+
+        rejected = self.unauthorized(request)
+        result = request.hooks['response'][0](rejected)
+
+        assert_that(result, same_instance(rejected))
+
+    def test_given_streamed_body_then_request_is_not_replayed(self):
+        request = self.prepare('POST', data=iter(['a', 'b']))
+
+        rejected = self.unauthorized(request)
+        result = request.hooks['response'][0](rejected)
+
+        assert_that(result, same_instance(rejected))
+        assert_that(self.prepare().headers, has_key('Authorization'))
+
+    def test_given_unsupported_algorithm_then_request_is_never_signed(self):
+        request = self.prepare()
+
+        rejected = self.unauthorized(request, 'Digest realm="confd", nonce="abc", algorithm="SHA-512-256"')
+        result = request.hooks['response'][0](rejected)
+
+        assert_that(result, same_instance(rejected))
+        assert_that(rejected.connection.send.called, equal_to(False))
+        assert_that(self.prepare().headers, is_not(has_key('Authorization')))
+
+    def test_build_digest_header_without_qop(self):
+        challenge = DigestChallenge(realm='confd', nonce='abc')
+
+        header = self.auth.build_digest_header(challenge, 1, 'GET', URL)
+
+        assert_that(header, equal_to('Digest username="alice", realm="confd", nonce="abc", '
+                                     'uri="/1.1/users", response="928bb96d4dd94218b20a60007a485d13"'))
@@ -0,0 +1,153 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, equal_to, has_entries, has_key, is_not
+from mock import Mock
+from requests import HTTPError
+
+from requests.exceptions import ConnectionError
+
+from xivo_confd_client.bulk import BulkReport, Outcome, RetryPolicy, attempt, collect, run
+
+
+def http_error(status_code, reason):
+    response = Mock()
+    response.status_code = status_code
+    response.reason = reason
+    return HTTPError('{} error'.format(status_code), response=response)
+
+
+class TestOutcome(unittest.TestCase):
+
+    def test_given_http_error_then_status_and_confd_message(self):
+        outcome = Outcome(1, error=http_error(404, 'User was not found'))
+
+        assert_that(outcome.ok, equal_to(False))
+        assert_that(outcome.status_code, equal_to(404))
+        assert_that(outcome.message, equal_to('User was not found'))
+
+    def test_given_other_error_then_message_is_error_text(self):
+        outcome = Outcome(1, error=ValueError('boom'))
+
+        assert_that(outcome.status_code, equal_to(None))
+        assert_that(outcome.message, equal_to('boom'))
+
+    def test_given_success_then_no_message(self):
+        outcome = Outcome(1, {'id': 1})
+
+        assert_that(outcome.ok, equal_to(True))
+        assert_that(outcome.message, equal_to(None))
+
+
+class TestBulkReport(unittest.TestCase):
+
+    def test_add(self):
+        report = BulkReport()
+
+        report.add(Outcome(1, {'id': 1}))
+        report.add(Outcome(2))
+        report.add(Outcome(3, error=ValueError()))
+
+        assert_that(report.results, equal_to({1: {'id': 1}}))
+        assert_that(report.errors, has_key(3))
+        assert_that((report.succeeded, report.failed, report.total), equal_to((2, 1, 3)))
+
+    def test_add_unchanged(self):
+        report = BulkReport()
+
+        report.add(Outcome(1, unchanged=True))
+
+        assert_that(report.unchanged, equal_to([1]))
+        assert_that(report.succeeded, equal_to(1))
+
+
+class TestRun(unittest.TestCase):
+
+    def test_attempt_captures_errors(self):
+        outcome = attempt('abc', int, 'abc')
+
+        assert_that(outcome.key, equal_to('abc'))
+        assert_that(outcome.error, is_not(None))
+
+    def test_run_collects_every_item(self):
+        report = collect(run(int, ['1', 'x', '3'], key=lambda item: item, concurrency=2))
+
+        assert_that(report.results, equal_to({'1': 1, '3': 3}))
+        assert_that(report.errors, has_key('x'))
+
+    def test_failed_item_does_not_abort_the_batch(self):
+        func = Mock(side_effect=[ValueError(), 2, 3])
+
+        report = collect(run(func, [1, 2, 3], key=lambda item: item, concurrency=1))
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that(report.results, has_entries({2: 2, 3: 3}))
+
+    def test_item_without_key_is_reported_by_position(self):
+        report = collect(run(lambda item: item['id'], [{'id': 10}, {}, {'id': 30}], key=lambda item: item['id']))
+
+        assert_that(report.results, equal_to({10: 10, 30: 30}))
+        assert_that(report.errors, has_key(('position', 1)))
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.sleep = Mock()
+        self.policy = RetryPolicy(retries=2, delay=1, backoff=3, sleep=self.sleep)
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        func = Mock(side_effect=[ConnectionError(), http_error(503, 'Unavailable'), 'done'])
+
+        outcome = self.policy.call('key', 'associate', func, 1, 2)
+
+        assert_that(outcome.result, equal_to('done'))
+        assert_that(self.sleep.call_args_list, equal_to([((1,),), ((3,),)]))
+        func.assert_called_with(1, 2)
+
+    def test_gives_up_after_retries(self):
+        func = Mock(side_effect=ConnectionError())
+
+        outcome = self.policy.call('key', 'associate', func)
+
+        assert_that(outcome.ok, equal_to(False))
+        assert_that(func.call_count, equal_to(3))
+
+    def test_other_errors_are_not_retried(self):
+        func = Mock(side_effect=http_error(400, 'Input Error - field missing'))
+
+        outcome = self.policy.call('key', 'associate', func)
+
+        assert_that(outcome.status_code, equal_to(400))
+        assert_that(func.call_count, equal_to(1))
+
+    def test_already_associated_is_unchanged(self):
+        func = Mock(side_effect=http_error(400, 'Resource Error - User is already associated to this line'))
+
+        outcome = self.policy.call('key', 'associate', func)
+
+        assert_that(outcome.ok, equal_to(True))
+        assert_that(outcome.unchanged, equal_to(True))
+
+    def test_not_associated_is_unchanged_only_when_dissociating(self):
+        func = Mock(side_effect=http_error(400, 'Resource Error - User and Line are not associated'))
+
+        assert_that(self.policy.call('key', 'dissociate', func).unchanged, equal_to(True))
+        assert_that(self.policy.call('key', 'associate', func).ok, equal_to(False))
@@ -0,0 +1,203 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import threading
+import unittest
+
+from hamcrest import assert_that, equal_to, is_not, same_instance
+from mock import Mock
+
+from xivo_confd_client.cache import RelationCache
+from xivo_confd_client.relations import (LineExtensionRelation,
+                                         UserLineRelation,
+                                         UserVoicemailRelation)
+from xivo_confd_client.tests import TestCommand
+
+
+class TestRelationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000
+        self.cache = RelationCache(ttl=10, maxsize=2, clock=lambda: self.now)
+        self.load = Mock(return_value={'items': [{'user_id': 1, 'line_id': 10}]})
+
+    def get(self, url='/users/1/lines', relation='user_line', **ids):
+        return self.cache.get(relation, url, ids or {'user_id': 1}, self.load)
+
+    def test_second_read_is_a_hit(self):
+        first = self.get()
+        second = self.get()
+
+        assert_that(second, equal_to(first))
+        assert_that(second, is_not(same_instance(first)))
+        assert_that(self.load.call_count, equal_to(1))
+        assert_that(self.cache.stats(), equal_to({'hits': 1, 'misses': 1, 'evictions': 0, 'invalidations': 0}))
+
+    def test_cached_value_is_not_shared_with_callers(self):
+        self.get()['items'].append({'user_id': 1, 'line_id': 11})
+
+        assert_that(self.get(), equal_to({'items': [{'user_id': 1, 'line_id': 10}]}))
+
+    def test_entries_expire(self):
+        self.get()
+        self.now += 11
+        self.get()
+
+        assert_that(self.load.call_count, equal_to(2))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.get('/users/1/lines', user_id=1)
+        self.get('/users/2/lines', user_id=2)
+        self.get('/users/1/lines', user_id=1)
+        self.get('/users/3/lines', user_id=3)
+
+        self.get('/users/1/lines', user_id=1)
+        assert_that(self.load.call_count, equal_to(3))
+        self.get('/users/2/lines', user_id=2)
+        assert_that(self.load.call_count, equal_to(4))
+        assert_that(self.cache.stats()['evictions'], equal_to(2))
+
+    def test_event_invalidates_both_sides(self):
+        self.get('/users/1/lines', user_id=1)
+        self.get('/lines/10/users', line_id=10)
+
+        self.cache.on_event('dissociated', 'user_line', {'user_id': 1, 'line_id': 10})
+
+        assert_that(len(self.cache), equal_to(0))
+        assert_that(self.cache.stats()['invalidations'], equal_to(2))
+
+    def test_event_invalidates_entries_returning_the_id(self):
+        self.load.return_value = {'items': [{'user_id': 1, 'voicemail_id': 5}]}
+        self.get('/voicemails/5/users', relation='user_voicemail', voicemail_id=5)
+
+        self.cache.on_event('dissociated', 'user_voicemail', {'user_id': 1})
+
+        assert_that(len(self.cache), equal_to(0))
+
+    def test_event_on_other_relation_is_ignored(self):
+        self.get('/users/1/lines', user_id=1)
+
+        self.cache.on_event('associated', 'user_voicemail', {'user_id': 1, 'voicemail_id': 5})
+
+        assert_that(len(self.cache), equal_to(1))
+
+    def test_deleted_resource_invalidates_its_relations(self):
+        self.get('/users/1/lines', user_id=1)
+
+        self.cache.on_event('deleted', 'lines', {'id': 10})
+
+        assert_that(len(self.cache), equal_to(0))
+
+    def test_event_on_unknown_resource_is_ignored(self):
+        self.get('/users/1/lines', user_id=1)
+
+        self.cache.on_event('updated', 'queues', {'id': 3, 'user_id': 1})
+
+        assert_that(len(self.cache), equal_to(1))
+
+    def test_template_change_invalidates_user_funckeys(self):
+        self.get('/users/1/funckeys', relation='user_funckey', user_id=1)
+        self.get('/users/2/funckeys', relation='user_funckey', user_id=2)
+        self.get('/users/1/lines', user_id=1)
+
+        self.cache.on_event('updated', 'funckeys/templates', {'id': 7})
+
+        assert_that(len(self.cache), equal_to(1))
+
+    def test_template_creation_is_ignored(self):
+        self.get('/users/1/funckeys', relation='user_funckey', user_id=1)
+
+        self.cache.on_event('created', 'funckeys/templates', {'id': 7})
+
+        assert_that(len(self.cache), equal_to(1))
+
+    def read_during(self, event):
+        loading = threading.Event()
+        release = threading.Event()
+        stale = {'items': []}
+
+        def load():
+            loading.set()
+            release.wait(5)
+            return stale
+
+        reader = threading.Thread(target=self.cache.get, args=('user_line', '/users/1/lines', {'user_id': 1}, load))
+        reader.start()
+        loading.wait(5)
+        self.cache.on_event(*event)
+        release.set()
+        reader.join(5)
+
+    def test_read_invalidated_while_loading_is_not_cached(self):
+        self.read_during(('associated', 'user_line', {'user_id': 1, 'line_id': 10}))
+
+        assert_that(len(self.cache), equal_to(0))
+        assert_that(self.get(), equal_to({'items': [{'user_id': 1, 'line_id': 10}]}))
+
+    def test_unrelated_invalidation_while_loading_does_not_prevent_caching(self):
+        self.read_during(('associated', 'user_line', {'user_id': 2, 'line_id': 20}))
+
+        assert_that(len(self.cache), equal_to(1))
+
+    def test_clear_while_loading(self):
+        def load():
+            self.cache.clear()
+            return {'items': []}
+
+        self.cache.get('user_line', '/users/1/lines', {'user_id': 1}, load)
+
+        assert_that(len(self.cache), equal_to(0))
+
+
+class TestCachedRelations(TestCommand):
+
+    Command = UserLineRelation
+
+    def setUp(self):
+        super(TestCachedRelations, self).setUp()
+        self.client.relation_cache = RelationCache()
+        self.client.publish.side_effect = self.client.relation_cache.on_event
+        self.set_response('get', 200, {'items': [{'user_id': 1, 'line_id': 10}]})
+
+    def test_reads_are_cached(self):
+        self.command.list_by_user(1)
+        self.command.list_by_user(1)
+
+        self.session.get.assert_called_once_with('/users/1/lines')
+
+    def test_association_invalidates_reads_on_both_sides(self):
+        self.command.list_by_user(1)
+        self.command.list_by_line(10)
+
+        self.command.associate(1, 11)
+        self.command.list_by_user(1)
+        self.command.list_by_line(10)
+
+        assert_that(self.session.get.call_count, equal_to(4))
+
+    def test_other_relations_invalidate_their_own_reads(self):
+        line_extension = LineExtensionRelation(self.client)
+        user_voicemail = UserVoicemailRelation(self.client)
+        line_extension.list_by_line(10)
+        user_voicemail.get_by_user(1)
+
+        line_extension.dissociate(10, 100)
+        user_voicemail.get_by_user(1)
+        line_extension.list_by_line(10)
+
+        assert_that(self.session.get.call_count, equal_to(3))
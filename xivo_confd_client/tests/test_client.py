@@ -0,0 +1,102 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, equal_to, instance_of, is_not, has_key, same_instance
+from mock import Mock, patch
+from requests import Session
+
+from xivo_confd_client.cache import RelationCache
+from xivo_confd_client.client import ConfdClient
+
+
+@patch('xivo_lib_rest_client.client.BaseClient.session', lambda self: Session())
+class TestConfdClient(unittest.TestCase):
+
+    def test_sessions_share_the_same_adapter(self):
+        client = ConfdClient('localhost')
+
+        first = client.session().session
+        second = client.session().session
+
+        assert_that(first.get_adapter('http://localhost'), same_instance(client.adapter))
+        assert_that(second.get_adapter('https://localhost'), same_instance(client.adapter))
+
+    def test_given_keep_alive_disabled_then_adapter_is_not_shared(self):
+        client = ConfdClient('localhost', keep_alive=False)
+
+        session = client.session().session
+
+        assert_that(session.get_adapter('http://localhost'), is_not(same_instance(client.adapter)))
+
+    def test_given_keep_alive_then_connection_header_is_not_overridden(self):
+        client = ConfdClient('localhost')
+
+        session = client.session().session
+
+        assert_that(session.headers, is_not(has_key('Connection')))
+
+    def test_pool_stats(self):
+        client = ConfdClient('localhost')
+
+        assert_that(client.pool_stats(), equal_to({'opened': 0, 'reused': 0, 'waited': 0}))
+
+    def test_sessions_share_the_same_digest_auth(self):
+        client = ConfdClient('localhost', username='alice', password='s3cre7')
+
+        first = client.session().session
+        second = client.session().session
+
+        assert_that(first.auth, same_instance(client.auth))
+        assert_that(second.auth, same_instance(client.auth))
+
+    def test_auth_stats(self):
+        client = ConfdClient('localhost', username='alice', password='s3cre7')
+
+        assert_that(client.auth_stats(), equal_to({'preemptive': 0, 'challenged': 0}))
+
+    def test_update_stats(self):
+        client = ConfdClient('localhost')
+
+        assert_that(client.update_stats(), equal_to({'sent': 0, 'skipped': 0}))
+
+    def test_publish_notifies_subscribers(self):
+        client = ConfdClient('localhost')
+        listener = Mock()
+        client.subscribe(listener)
+
+        client.publish('created', 'users', {'id': 1})
+        client.unsubscribe(listener)
+        client.publish('deleted', 'users', {'id': 1})
+
+        listener.assert_called_once_with('created', 'users', {'id': 1})
+
+    def test_cache_stats_without_cache(self):
+        client = ConfdClient('localhost')
+
+        assert_that(client.cache_stats(), equal_to({'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}))
+
+    def test_relation_cache_is_invalidated_by_client_events(self):
+        client = ConfdClient('localhost', relation_cache=True)
+        client.relation_cache.get('user_line', '/users/1/lines', {'user_id': 1}, lambda: {'items': []})
+
+        client.publish('associated', 'user_line', {'user_id': 1, 'line_id': 2})
+
+        assert_that(client.relation_cache, instance_of(RelationCache))
+        assert_that(len(client.relation_cache), equal_to(0))
@@ -16,23 +16,49 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 
+import time
+
 from ..crud import CRUDCommand
+from ..records import Record
 
 from hamcrest import assert_that
+from hamcrest import calling
+from hamcrest import contains
+from hamcrest import contains_inanyorder
 from hamcrest import equal_to
+from hamcrest import instance_of
+from hamcrest import raises
+from mock import Mock
+from requests import HTTPError
 
 from xivo_confd_client.tests import TestCommand
 
 
+class FakeRecord(Record):
+
+    __slots__ = ()
+
+    fields = ('id', 'firstname')
+
+
 class TestCRUDCommand(CRUDCommand):
 
     resource = 'test'
+    record_type = FakeRecord
 
 
 class TestCRUD(TestCommand):
 
     Command = TestCRUDCommand
 
+    def set_pages(self, *pages):
+        responses = []
+        for page in pages:
+            response = Mock()
+            response.json.return_value = page
+            responses.append(response)
+        self.session.get.side_effect = responses
+
     def test_list(self):
         expected_response = self.set_response('get', 200, {
             "total": 2,
@@ -106,3 +132,265 @@ class TestCRUD(TestCommand):
         self.command.delete(resource_id)
 
         self.session.delete.assert_called_once_with(expected_url)
+
+    def test_iter_list_walks_pages(self):
+        self.set_pages({'total': 3, 'items': [{'id': 1}, {'id': 2}]},
+                       {'total': 3, 'items': [{'id': 3}]})
+
+        result = list(self.command.iter_list(page_size=2, search='term'))
+
+        assert_that(result, contains({'id': 1}, {'id': 2}, {'id': 3}))
+        self.session.get.assert_any_call('/test', params={'limit': 2, 'offset': 0, 'search': 'term'})
+        self.session.get.assert_any_call('/test', params={'limit': 2, 'offset': 2, 'search': 'term'})
+        assert_that(self.session.get.call_count, equal_to(2))
+
+    def test_iter_list_starts_at_offset(self):
+        self.set_pages({'total': 5, 'items': [{'id': 5}]})
+
+        result = list(self.command.iter_list(page_size=2, offset=4))
+
+        assert_that(result, contains({'id': 5}))
+        self.session.get.assert_called_once_with('/test', params={'limit': 2, 'offset': 4})
+
+    def test_iter_list_rejects_limit(self):
+        assert_that(calling(list).with_args(self.command.iter_list(limit=5)), raises(TypeError, 'page_size'))
+
+    def test_iter_list_stops_on_empty_page(self):
+        self.set_pages({'total': 10, 'items': [{'id': 1}]},
+                       {'total': 10, 'items': []})
+
+        result = list(self.command.iter_list(page_size=1))
+
+        assert_that(result, contains({'id': 1}))
+        assert_that(self.session.get.call_count, equal_to(2))
+
+    def test_iter_list_is_lazy(self):
+        self.set_pages({'total': 4, 'items': [{'id': 1}, {'id': 2}]},
+                       {'total': 4, 'items': [{'id': 3}, {'id': 4}]})
+
+        items = self.command.iter_list(page_size=2)
+
+        assert_that(self.session.get.call_count, equal_to(0))
+        assert_that(next(items), equal_to({'id': 1}))
+
+    def test_iter_list_close_waits_for_prefetched_page(self):
+        fetched = []
+
+        def get(url, params):
+            if params['offset']:
+                time.sleep(0.01)
+                fetched.append(params['offset'])
+                raise HTTPError()
+            return Mock(json=Mock(return_value={'total': 4, 'items': [{'id': 1}, {'id': 2}]}))
+        self.session.get.side_effect = get
+
+        items = self.command.iter_list(page_size=2)
+        next(items)
+        items.close()
+
+        assert_that(fetched, contains(2))
+
+    def test_list_all_fetches_remaining_pages_from_total(self):
+        pages = {0: [{'id': 1}, {'id': 2}],
+                 2: [{'id': 3}, {'id': 4}],
+                 4: [{'id': 5}]}
+
+        def get(url, params):
+            response = Mock()
+            response.json.return_value = {'total': 5, 'items': pages[params['offset']]}
+            return response
+        self.session.get.side_effect = get
+
+        result = self.command.list_all(concurrency=2, page_size=2, search='term')
+
+        assert_that(result, equal_to({'total': 5,
+                                      'items': [{'id': 1}, {'id': 2}, {'id': 3}, {'id': 4}, {'id': 5}]}))
+        self.session.get.assert_any_call('/test', params={'limit': 2, 'offset': 4, 'search': 'term'})
+        assert_that(self.session.get.call_count, equal_to(3))
+
+    def test_list_all_follows_server_page_size(self):
+        pages = {0: [{'id': 1}], 1: [{'id': 2}], 2: [{'id': 3}]}
+
+        def get(url, params):
+            response = Mock()
+            response.json.return_value = {'total': 3, 'items': pages[params['offset']]}
+            return response
+        self.session.get.side_effect = get
+
+        result = list(self.command.iter_all(page_size=100, ordered=False))
+
+        assert_that(result, contains_inanyorder({'id': 1}, {'id': 2}, {'id': 3}))
+        self.session.get.assert_any_call('/test', params={'limit': 1, 'offset': 2})
+
+    def test_iter_all_starts_at_offset(self):
+        pages = {4: [{'id': 5}, {'id': 6}], 6: [{'id': 7}]}
+
+        def get(url, params):
+            response = Mock()
+            response.json.return_value = {'total': 7, 'items': pages[params['offset']]}
+            return response
+        self.session.get.side_effect = get
+
+        result = list(self.command.iter_all(page_size=2, offset=4))
+
+        assert_that(result, contains({'id': 5}, {'id': 6}, {'id': 7}))
+
+    def test_list_all_rejects_limit(self):
+        assert_that(calling(self.command.list_all).with_args(limit=5), raises(TypeError, 'page_size'))
+
+    def test_list_all_empty_collection(self):
+        self.set_pages({'total': 0, 'items': []})
+
+        result = self.command.list_all()
+
+        assert_that(result, equal_to({'total': 0, 'items': []}))
+
+    def test_bulk_get(self):
+        def get(url):
+            response = Mock()
+            if url == '/test/2':
+                error = HTTPError('404', response=Mock(status_code=404, reason='Resource Not Found'))
+                response.raise_for_status.side_effect = error
+                raise error
+            response.json.return_value = {'id': int(url.rsplit('/', 1)[1])}
+            return response
+        self.session.get.side_effect = get
+
+        report = self.command.bulk_get([1, {'id': 2}, 3], concurrency=2)
+
+        assert_that(report.results, equal_to({1: {'id': 1}, 3: {'id': 3}}))
+        assert_that(report.errors[2].status_code, equal_to(404))
+        assert_that(report.errors[2].message, equal_to('Resource Not Found'))
+
+    def test_iter_bulk_get_yields_outcomes(self):
+        self.set_response('get', 200, {'id': 1})
+
+        outcomes = list(self.command.iter_bulk_get([1]))
+
+        assert_that(outcomes[0].key, equal_to(1))
+        assert_that(outcomes[0].result, equal_to({'id': 1}))
+
+    def test_bulk_create_reports_created_resources_by_position(self):
+        def post(url, body):
+            if body['firstname'] == 'Bad':
+                raise HTTPError('400', response=Mock(status_code=400, reason='Input Error - firstname'))
+            return Mock(json=Mock(return_value=dict(body, id=len(body['firstname']))))
+        self.session.post.side_effect = post
+
+        bodies = ({'firstname': name} for name in ['John', 'Bad', 'Mary'])
+        report = self.command.bulk_create(bodies, concurrency=2)
+
+        assert_that(report.results, equal_to({0: {'id': 4, 'firstname': 'John'},
+                                              2: {'id': 4, 'firstname': 'Mary'}}))
+        assert_that(report.errors[1].status_code, equal_to(400))
+        assert_that(report.errors[1].message, equal_to('Input Error - firstname'))
+
+    def test_bulk_update_strips_links_and_keys_by_id(self):
+        report = self.command.bulk_update([{'id': 1, 'firstname': 'John', 'links': []}])
+
+        self.session.put.assert_called_once_with('/test/1', {'id': 1, 'firstname': 'John'})
+        assert_that(report.succeeded, equal_to(1))
+        assert_that(report.results, equal_to({}))
+
+    def test_bulk_update_reports_body_without_id(self):
+        self.session.put.side_effect = lambda url, body: 1 / (body['id'] - 1)
+
+        report = self.command.bulk_update([{'id': 1}, {'firstname': 'x'}, {'id': 3}])
+
+        assert_that(report.succeeded, equal_to(1))
+        assert_that(report.failed, equal_to(2))
+        assert_that(report.errors[1].error, instance_of(ZeroDivisionError))
+        assert_that(report.errors[('position', 1)].error, instance_of(KeyError))
+
+    def test_bulk_delete_accepts_ids_and_resources(self):
+        report = self.command.bulk_delete([1, {'id': 2}])
+
+        self.session.delete.assert_any_call('/test/1')
+        self.session.delete.assert_any_call('/test/2')
+        assert_that(report.succeeded, equal_to(2))
+
+    def test_bulk_delete_stop_on_error(self):
+        self.session.delete.side_effect = [HTTPError('404', response=Mock(status_code=404, reason='')), None, None]
+
+        report = self.command.bulk_delete([1, 2, 3], concurrency=1, stop_on_error=True)
+
+        assert_that(report.stopped, equal_to(True))
+        assert_that(report.failed, equal_to(1))
+        assert_that(report.succeeded, equal_to(0))
+
+    def test_bulk_delete_progress(self):
+        progress = Mock()
+
+        self.command.bulk_delete([1, 2], progress=progress)
+
+        assert_that(progress.call_count, equal_to(2))
+
+    def test_update_if_changed_given_same_values_then_not_sent(self):
+        self.set_response('get', 200, {'id': 1, 'firstname': 'John', 'lastname': 'Doe', 'links': []})
+
+        sent = self.command.update_if_changed({'id': 1, 'firstname': 'John', 'links': ['other']})
+
+        assert_that(sent, equal_to(False))
+        assert_that(self.session.put.call_count, equal_to(0))
+        self.client.update_counters.incr.assert_called_once_with('skipped')
+
+    def test_update_if_changed_given_different_values_then_sent(self):
+        self.set_response('get', 200, {'id': 1, 'firstname': 'John'})
+
+        sent = self.command.update_if_changed({'id': 1, 'firstname': 'Johnny'})
+
+        assert_that(sent, equal_to(True))
+        self.session.put.assert_called_once_with('/test/1', {'id': 1, 'firstname': 'Johnny'})
+        self.client.update_counters.incr.assert_called_once_with('sent')
+
+    def test_update_if_changed_uses_supplied_snapshot(self):
+        current = {'id': 1, 'firstname': 'John'}
+
+        sent = self.command.update_if_changed({'id': 1, 'firstname': 'John'}, current)
+
+        assert_that(sent, equal_to(False))
+        assert_that(self.session.get.call_count, equal_to(0))
+
+    def test_given_client_skips_unchanged_updates_then_update_compares_first(self):
+        self.client.skip_unchanged_updates = True
+        self.set_response('get', 200, {'id': 1, 'firstname': 'John'})
+
+        self.command.update({'id': 1, 'firstname': 'John'})
+
+        self.session.get.assert_called_once_with('/test/1')
+        assert_that(self.session.put.call_count, equal_to(0))
+
+    def test_list_records(self):
+        self.set_response('get', 200, {'total': 1, 'items': [{'id': 1, 'firstname': 'John', 'links': []}]})
+
+        result = self.command.list_records(search='term')
+
+        assert_that(result['total'], equal_to(1))
+        assert_that(result['items'][0], instance_of(FakeRecord))
+        assert_that(result['items'][0].to_dict(), equal_to({'id': 1, 'firstname': 'John'}))
+        self.session.get.assert_called_once_with('/test', params={'search': 'term'})
+
+    def test_iter_records_with_projection(self):
+        self.set_pages({'total': 1, 'items': [{'id': 1, 'firstname': 'John'}]})
+
+        result = list(self.command.iter_records(fields=['firstname']))
+
+        assert_that(result[0].to_dict(), equal_to({'firstname': 'John'}))
+
+    def test_get_record_with_extra(self):
+        self.set_response('get', 200, {'id': 1, 'firstname': 'John', 'lastname': 'Doe'})
+
+        result = self.command.get_record(1, keep_extra=True)
+
+        assert_that(result['lastname'], equal_to('Doe'))
+
+    def test_writes_are_published_to_the_client(self):
+        self.set_response('post', 201, {'id': 1, 'firstname': 'John'})
+
+        self.command.create({'firstname': 'John'})
+        self.command.update({'id': 1, 'firstname': 'Johnny'})
+        self.command.delete(1)
+
+        self.client.publish.assert_any_call('created', 'test', {'id': 1, 'firstname': 'John'})
+        self.client.publish.assert_any_call('updated', 'test', {'id': 1, 'firstname': 'Johnny'})
+        self.client.publish.assert_any_call('deleted', 'test', {'id': 1})
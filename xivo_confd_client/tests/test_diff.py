@@ -0,0 +1,103 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, contains, contains_inanyorder, empty, equal_to
+
+from xivo_confd_client.diff import (ADDED, MODIFIED, REMOVED, Change, diff,
+                                    diff_items, relation_key)
+
+
+class TestDiffItems(unittest.TestCase):
+
+    def test_identical_collections_have_no_changes(self):
+        items = [{'id': 1, 'firstname': 'John'}]
+
+        assert_that(list(diff_items('users', items, [dict(items[0])])), empty())
+
+    def test_added_removed_and_modified(self):
+        old = [{'id': 1, 'firstname': 'John'},
+               {'id': 2, 'firstname': 'Mary'}]
+        new = [{'id': 2, 'firstname': 'Maria'},
+               {'id': 3, 'firstname': 'Paul'}]
+
+        changes = list(diff_items('users', old, new))
+
+        assert_that(changes, contains(
+            Change(MODIFIED, 'users', 2, old=old[1], new=new[0]),
+            Change(ADDED, 'users', 3, new=new[1]),
+            Change(REMOVED, 'users', 1, old=old[0])))
+
+    def test_links_are_ignored(self):
+        old = [{'id': 1, 'firstname': 'John', 'links': [{'rel': 'users', 'href': 'a'}]}]
+        new = [{'id': 1, 'firstname': 'John', 'links': [{'rel': 'users', 'href': 'b'}]}]
+
+        assert_that(list(diff_items('users', old, new)), empty())
+
+    def test_modified_change_lists_fields(self):
+        old = [{'id': 1, 'firstname': 'John', 'mobile_phone_number': '555'}]
+        new = [{'id': 1, 'firstname': 'Johnny', 'lastname': 'Doe'}]
+
+        change, = diff_items('users', old, new)
+
+        assert_that(change.fields, contains('firstname', 'lastname', 'mobile_phone_number'))
+
+    def test_new_side_can_be_a_generator(self):
+        old = [{'id': 1}]
+        new = ({'id': i} for i in xrange(1, 3))
+
+        changes = list(diff_items('users', old, new))
+
+        assert_that(changes, contains(Change(ADDED, 'users', 2, new={'id': 2})))
+
+
+class TestRelationKey(unittest.TestCase):
+
+    def test_uses_id_fields(self):
+        item = {'user_id': 1, 'line_id': 2, 'main_user': True}
+
+        assert_that(relation_key(item), equal_to((('line_id', 2), ('user_id', 1))))
+
+
+class TestDiff(unittest.TestCase):
+
+    def test_resources_and_relations(self):
+        old = {'users': {'total': 1, 'items': [{'id': 1, 'firstname': 'John'}]},
+               'user_line': {'total': 1, 'items': [{'user_id': 1, 'line_id': 10, 'main_user': True}]}}
+        new = {'users': {'total': 1, 'items': [{'id': 1, 'firstname': 'John'}]},
+               'user_line': [{'user_id': 1, 'line_id': 10, 'main_user': False},
+                             {'user_id': 1, 'line_id': 11, 'main_user': False}],
+               'lines': [{'id': 11}]}
+
+        changes = [(change.action, change.resource, change.key) for change in diff(old, new)]
+
+        assert_that(changes, contains_inanyorder(
+            (ADDED, 'lines', 11),
+            (MODIFIED, 'user_line', (('line_id', 10), ('user_id', 1))),
+            (ADDED, 'user_line', (('line_id', 11), ('user_id', 1)))))
+
+    def test_custom_key(self):
+        old = {'extensions': [{'id': 1, 'exten': '1000', 'context': 'default'}]}
+        new = {'extensions': [{'id': 2, 'exten': '1000', 'context': 'default'}]}
+        keys = {'extensions': lambda item: (item['exten'], item['context'])}
+
+        changes = list(diff(old, new, keys))
+
+        assert_that(changes[0].action, equal_to(MODIFIED))
+        assert_that(changes[0].fields, contains('id'))
@@ -0,0 +1,171 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import unittest
+
+from hamcrest import assert_that, calling, contains, contains_inanyorder, equal_to, instance_of, raises
+from mock import Mock, call
+from requests.exceptions import ConnectionError
+
+from xivo_confd_client.bulk import RetryPolicy
+from xivo_confd_client.fleet import DeviceFleet, FleetReport, RateLimiter
+from xivo_confd_client.tests import threadsafe_mock
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_calls_are_spaced(self):
+        clock = Clock()
+        sleep = Mock(side_effect=clock.sleep)
+        limiter = RateLimiter(10, clock, sleep)
+
+        for _ in range(3):
+            limiter.wait()
+
+        assert_that(sleep.call_args_list, contains(call(0.1), call(0.1)))
+
+    def test_no_wait_when_calls_are_slow_enough(self):
+        clock = Clock()
+        sleep = Mock()
+        limiter = RateLimiter(10, clock, sleep)
+
+        limiter.wait()
+        clock.now = 1
+        limiter.wait()
+
+        assert_that(sleep.called, equal_to(False))
+
+
+class TestFleetReport(unittest.TestCase):
+
+    def test_eta(self):
+        clock = Clock()
+        report = FleetReport(4, clock)
+        assert_that(report.eta, equal_to(None))
+
+        clock.now = 10
+        report.succeeded = 1
+
+        assert_that(report.remaining, equal_to(3))
+        assert_that(report.eta, equal_to(30))
+
+
+class TestDeviceFleet(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.sleep = Mock(side_effect=self.clock.sleep)
+        self.client = Mock()
+        self.devices = threadsafe_mock(self.client.devices, 'synchronize', 'autoprov')
+
+    def fleet(self, **kwargs):
+        return DeviceFleet(self.client, clock=self.clock, sleep=self.sleep, **kwargs)
+
+    def test_synchronize_passes_timeout(self):
+        report = self.fleet(concurrency=2, timeout=5).synchronize(['a', {'id': 'b'}])
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that(self.devices.synchronize.call_args_list,
+                    contains_inanyorder(call('a', timeout=5), call('b', timeout=5)))
+
+    def test_devices_are_handled_in_waves(self):
+        report = self.fleet(concurrency=1, wave_size=2, wave_delay=30).autoprov(['a', 'b', 'c', 'd', 'e'])
+
+        assert_that(report.waves, equal_to(3))
+        assert_that(report.succeeded, equal_to(5))
+        assert_that(self.sleep.call_args_list, contains(call(30), call(30)))
+
+    def test_rate_limit(self):
+        self.fleet(concurrency=1, rate=2).synchronize(['a', 'b', 'c'])
+
+        assert_that(self.sleep.call_args_list, contains(call(0.5), call(0.5)))
+
+    def test_retries_are_rate_limited(self):
+        self.devices.synchronize.side_effect = [ConnectionError(), None]
+        retry = RetryPolicy(retries=1, delay=0, sleep=Mock())
+
+        self.fleet(concurrency=1, rate=2, retry=retry).synchronize(['a'])
+
+        assert_that(self.sleep.call_args_list, contains(call(0.5)))
+
+    def test_failed_devices_are_listed(self):
+        self.devices.synchronize.side_effect = lambda device_id, timeout: 1 / (device_id != 'b')
+
+        report = self.fleet().synchronize(['c', 'b', 'a'])
+
+        assert_that(report.failed_devices, contains('b'))
+        assert_that(report.succeeded, equal_to(2))
+
+    def test_device_without_id_is_reported(self):
+        report = self.fleet().synchronize(['a', {'model': '6757i'}])
+
+        assert_that(report.succeeded, equal_to(1))
+        assert_that(report.errors[('position', 1)].error, instance_of(KeyError))
+        assert_that(report.failed_devices, equal_to([]))
+        self.devices.synchronize.assert_called_once_with('a', timeout=None)
+
+    def test_transient_errors_are_retried(self):
+        self.devices.synchronize.side_effect = [ConnectionError(), None]
+        retry = RetryPolicy(retries=1, delay=1, sleep=self.sleep)
+
+        report = self.fleet(retry=retry).synchronize(['a'])
+
+        assert_that(report.succeeded, equal_to(1))
+        assert_that(self.devices.synchronize.call_count, equal_to(2))
+
+    def test_stop_on_error_skips_remaining_waves(self):
+        self.devices.autoprov.side_effect = Exception('boom')
+
+        report = self.fleet(wave_size=1).autoprov(['a', 'b', 'c'], stop_on_error=True)
+
+        assert_that(report.stopped, equal_to(True))
+        assert_that(report.waves, equal_to(1))
+        assert_that(report.remaining, equal_to(2))
+
+    def test_progress(self):
+        progress = Mock()
+
+        self.fleet(wave_size=1).synchronize(['a', 'b'], progress=progress)
+
+        assert_that(progress.call_count, equal_to(2))
+        report = progress.call_args[0][0]
+        assert_that(report.remaining, equal_to(0))
+
+    def test_predicate_selects_devices(self):
+        self.devices.list_all.return_value = {'items': [{'id': 'a', 'model': '6731i'},
+                                                        {'id': 'b', 'model': '6757i'}]}
+
+        self.fleet().synchronize(lambda device: device['model'] == '6757i')
+
+        self.devices.synchronize.assert_called_once_with('b', timeout=None)
+
+    def test_unknown_action(self):
+        assert_that(calling(self.fleet().run).with_args('reboot', ['a']), raises(ValueError))
@@ -0,0 +1,130 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import unittest
+
+from hamcrest import assert_that, contains_inanyorder, equal_to, instance_of
+from mock import Mock
+
+from xivo_confd_client.forwards import ForwardsEditor
+from xivo_confd_client.tests import threadsafe_mock
+
+
+def forwards(**overrides):
+    result = {'busy': {'enabled': False, 'destination': None},
+              'noanswer': {'enabled': False, 'destination': None},
+              'unconditional': {'enabled': False, 'destination': None},
+              'links': [{'rel': 'users', 'href': 'http://localhost/1.1/users/1'}]}
+    result.update(overrides)
+    return result
+
+
+def services(**overrides):
+    result = {'dnd': {'enabled': False},
+              'incallfilter': {'enabled': False}}
+    result.update(overrides)
+    return result
+
+
+FORWARD_PATCH = {'unconditional': {'enabled': True, 'destination': '1234'}}
+
+
+class TestForwardsEditor(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Mock()
+        self.editor = ForwardsEditor(self.client)
+        self.user_forward = self.editor.user_forward = threadsafe_mock(Mock(), 'update_forwards')
+        self.user_service = self.editor.user_service = threadsafe_mock(Mock(), 'update_service')
+        self.user_forward.list_forwards.return_value = forwards()
+        self.user_service.list_services.return_value = services()
+
+    def test_merged_forwards_are_sent_in_one_call(self):
+        result = self.editor.edit_user({'id': 1}, forwards=FORWARD_PATCH)
+
+        assert_that(result, equal_to({'forwards': ['unconditional'], 'services': [], 'changed': 1}))
+        self.user_forward.update_forwards.assert_called_once_with(1, {
+            'busy': {'enabled': False, 'destination': None},
+            'noanswer': {'enabled': False, 'destination': None},
+            'unconditional': {'enabled': True, 'destination': '1234'}})
+        assert_that(self.user_service.list_services.called, equal_to(False))
+
+    def test_patch_keeps_other_fields_of_a_forward(self):
+        self.user_forward.list_forwards.return_value = forwards(busy={'enabled': False, 'destination': '555'})
+
+        self.editor.edit_user(1, forwards={'busy': {'enabled': True}})
+
+        body = self.user_forward.update_forwards.call_args[0][1]
+        assert_that(body['busy'], equal_to({'enabled': True, 'destination': '555'}))
+
+    def test_only_changed_services_are_updated(self):
+        self.user_service.list_services.return_value = services(incallfilter={'enabled': True})
+
+        result = self.editor.edit_user(1, services={'dnd': {'enabled': True}, 'incallfilter': {'enabled': True}})
+
+        assert_that(result['services'], equal_to(['dnd']))
+        self.user_service.update_service.assert_called_once_with(1, 'dnd', {'enabled': True})
+        assert_that(self.user_forward.list_forwards.called, equal_to(False))
+
+    def test_dry_run_writes_nothing(self):
+        result = self.editor.edit_user(1, forwards=FORWARD_PATCH, services={'dnd': {'enabled': True}}, dry_run=True)
+
+        assert_that(result['changed'], equal_to(2))
+        assert_that(self.user_forward.update_forwards.called, equal_to(False))
+        assert_that(self.user_service.update_service.called, equal_to(False))
+
+    def test_users_in_target_state_are_unchanged(self):
+        self.user_forward.list_forwards.side_effect = lambda user_id: (
+            forwards(unconditional={'enabled': True, 'destination': '1234'}) if user_id == 1 else forwards())
+
+        report = self.editor.edit([1, {'id': 2}], forwards=FORWARD_PATCH, concurrency=2)
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that(report.unchanged, equal_to([1]))
+        assert_that(report.results, equal_to({2: {'forwards': ['unconditional'], 'services': [], 'changed': 1}}))
+        assert_that(self.user_forward.update_forwards.call_count, equal_to(1))
+
+    def test_failures_are_reported_per_user(self):
+        self.user_service.update_service.side_effect = lambda user_id, name, body: 1 / (user_id - 2)
+
+        report = self.editor.edit([1, 2, 3], services={'dnd': {'enabled': True}})
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that(report.errors.keys(), equal_to([2]))
+
+    def test_user_without_id_is_reported_apart_from_user_ids(self):
+        self.user_service.update_service.side_effect = lambda user_id, name, body: 1 / (user_id - 1)
+
+        report = self.editor.edit([1, {'firstname': 'John'}, 2], services={'dnd': {'enabled': True}})
+
+        assert_that(report.succeeded, equal_to(1))
+        assert_that(report.errors[1].error, instance_of(ZeroDivisionError))
+        assert_that(report.errors[('position', 1)].error, instance_of(KeyError))
+
+    def test_predicate_selects_users_from_list(self):
+        self.client.users.list_all.return_value = {'items': [{'id': 1, 'firstname': 'John'},
+                                                             {'id': 2, 'firstname': 'Mary'},
+                                                             {'id': 3, 'firstname': 'Jane'}]}
+
+        report = self.editor.edit(lambda user: user['firstname'].startswith('J'),
+                                  services={'dnd': {'enabled': True}})
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that([args[0][0] for args in self.user_service.update_service.call_args_list],
+                    contains_inanyorder(1, 3))
@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, calling, contains, contains_inanyorder, equal_to, has_key, raises
+from mock import Mock
+
+from xivo_confd_client.funckey_rollout import FuncKeyRollout
+from xivo_confd_client.tests import threadsafe_mock
+
+LAYOUT = {1: {'blf': True, 'label': 'Reception', 'destination': {'type': 'user', 'user_id': 5}},
+          2: {'blf': False, 'label': 'Park', 'destination': {'type': 'park_position', 'position': 701}}}
+
+
+def current_keys(**overrides):
+    keys = {'1': {'id': 11, 'inherited': False, 'blf': True, 'label': 'Reception',
+                  'destination': {'type': 'user', 'user_id': 5, 'href': 'http://localhost/1.1/users/5'}},
+            '2': {'id': 12, 'inherited': False, 'blf': False, 'label': 'Park',
+                  'destination': {'type': 'park_position', 'position': 701, 'href': None}}}
+    keys.update(overrides)
+    return {'name': None, 'keys': dict((key, value) for key, value in keys.iteritems() if value is not None)}
+
+
+class TestFuncKeyRollout(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Mock()
+        self.client.relation_cache = None
+        self.rollout = FuncKeyRollout(self.client)
+        self.user_funckey = self.rollout.user_funckey = threadsafe_mock(Mock(), 'update_funckey', 'remove_funckey',
+                                                                        'associate_funckey_template')
+        self.user_funckey.list_funckeys.return_value = current_keys()
+
+    def test_identical_layout_changes_nothing(self):
+        result = self.rollout.rollout_user(1, LAYOUT)
+
+        assert_that(result, equal_to({'updated': [], 'removed': [], 'changed': 0}))
+        assert_that(self.user_funckey.update_funckey.called, equal_to(False))
+
+    def test_only_different_positions_are_updated(self):
+        self.user_funckey.list_funckeys.return_value = current_keys(
+            **{'2': {'id': 12, 'blf': False, 'label': 'Old', 'destination': {'type': 'park_position', 'position': 701}},
+               '3': {'id': 13, 'blf': False, 'label': 'Extra', 'destination': {'type': 'custom', 'exten': '*10'}}})
+
+        result = self.rollout.rollout_user({'id': 1}, LAYOUT)
+
+        assert_that(result, equal_to({'updated': [2], 'removed': [3], 'changed': 2}))
+        self.user_funckey.update_funckey.assert_called_once_with(1, 2, LAYOUT[2])
+        self.user_funckey.remove_funckey.assert_called_once_with(1, 3)
+
+    def test_missing_position_is_added(self):
+        self.user_funckey.list_funckeys.return_value = current_keys(**{'1': None})
+
+        result = self.rollout.rollout_user(1, LAYOUT, exact=False)
+
+        assert_that(result['updated'], contains(1))
+
+    def test_extra_positions_are_kept_unless_exact(self):
+        self.user_funckey.list_funckeys.return_value = current_keys(
+            **{'3': {'blf': False, 'label': 'Extra', 'destination': {'type': 'custom', 'exten': '*10'}}})
+
+        result = self.rollout.rollout_user(1, LAYOUT, exact=False)
+
+        assert_that(result['changed'], equal_to(0))
+
+    def test_dry_run_sends_nothing(self):
+        result = self.rollout.rollout_user(1, {1: {'blf': False}}, dry_run=True)
+
+        assert_that(result, equal_to({'updated': [1], 'removed': [2], 'changed': 2}))
+        assert_that(self.user_funckey.update_funckey.called, equal_to(False))
+        assert_that(self.user_funckey.remove_funckey.called, equal_to(False))
+
+    def test_rollout_from_template(self):
+        self.client.funckeys.get.return_value = {'id': 7, 'keys': {
+            '1': {'id': 70, 'inherited': True, 'blf': True, 'label': 'Reception',
+                  'destination': {'type': 'user', 'user_id': 5, 'href': 'x'}, 'links': []}}}
+
+        report = self.rollout.rollout([1, 2], template_id=7, concurrency=2)
+
+        self.client.funckeys.get.assert_called_once_with(7)
+        assert_that(report.results, equal_to({1: {'updated': [], 'removed': [2], 'changed': 1},
+                                              2: {'updated': [], 'removed': [2], 'changed': 1}}))
+
+    def test_rollout_without_layout_is_refused(self):
+        assert_that(calling(self.rollout.rollout).with_args([1, 2]), raises(ValueError))
+        assert_that(self.user_funckey.list_funckeys.called, equal_to(False))
+
+    def test_rollout_reports_failures_per_user(self):
+        self.user_funckey.list_funckeys.side_effect = [current_keys(), Exception('boom')]
+
+        report = self.rollout.rollout([1, 2], LAYOUT, concurrency=1)
+
+        assert_that(report.succeeded, equal_to(1))
+        assert_that(report.errors, has_key(2))
+
+    def test_associate_template(self):
+        report = self.rollout.associate_template([1, {'id': 2}], 7)
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that(self.user_funckey.associate_funckey_template.call_args_list,
+                    contains_inanyorder(((1, 7),), ((2, 7),)))
@@ -0,0 +1,94 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, contains, contains_inanyorder, equal_to
+from mock import Mock
+from requests import HTTPError
+
+from xivo_confd_client.graph import GraphLoader
+from xivo_confd_client.tests import mock_client
+
+RESPONSES = {
+    '/users/1/lines': {'items': [{'user_id': 1, 'line_id': 10}, {'user_id': 1, 'line_id': 11}]},
+    '/users/2/lines': {'items': [{'user_id': 2, 'line_id': 11}]},
+    '/lines/10/extensions': {'items': [{'line_id': 10, 'extension_id': 100}]},
+    '/lines/11/extensions': {'items': [{'line_id': 11, 'extension_id': 101}]},
+    '/lines/10/endpoints/sip': {'line_id': 10, 'endpoint_id': 1000, 'endpoint': 'sip'},
+    '/lines/11/endpoints/sccp': {'line_id': 11, 'endpoint_id': 2000, 'endpoint': 'sccp'},
+    '/lines/10/devices': {'line_id': 10, 'device_id': 'abc'},
+    '/lines/11/devices': {'line_id': 11, 'device_id': 'abc'},
+}
+
+
+class TestGraphLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.requested = []
+        self.client, self.session = mock_client()
+        self.session.get.side_effect = self.get
+        self.loader = GraphLoader(self.client, concurrency=3)
+
+    def get(self, url):
+        self.requested.append(url)
+        if url not in RESPONSES:
+            raise HTTPError(response=Mock(status_code=404))
+        return Mock(json=Mock(return_value=RESPONSES[url]))
+
+    def test_load_walks_users_to_devices(self):
+        graph = self.loader.load([1, {'id': 2, 'firstname': 'Mary'}])
+
+        user = graph.get('user', 1)
+        assert_that([line.id for line in user.related('line')], contains(10, 11))
+        assert_that([node.id for node in user.walk('line', 'extension')], contains(100, 101))
+        assert_that([node.id for node in user.walk('line', 'endpoint_sip')], contains(1000))
+        assert_that([node.id for node in user.walk('line', 'endpoint_sccp')], contains(2000))
+        assert_that(graph.get('user', 2).data, equal_to({'id': 2, 'firstname': 'Mary'}))
+
+    def test_graph_can_be_walked_backwards(self):
+        graph = self.loader.load([1, 2])
+
+        device = graph.get('device', 'abc')
+        assert_that([line.id for line in device.related('line')], contains(10, 11))
+        assert_that([user.id for user in device.walk('line', 'user')], contains_inanyorder(1, 2))
+        assert_that([user.id for user in graph.get('extension', 101).walk('line', 'user')],
+                    contains_inanyorder(1, 2))
+
+    def test_shared_nodes_are_loaded_once(self):
+        graph = self.loader.load([1, 2])
+
+        assert_that(self.requested.count('/lines/11/extensions'), equal_to(1))
+        assert_that(len(graph.nodes('device')), equal_to(1))
+        assert_that(len(self.requested), equal_to(2 + 2 * 5))
+
+    def test_bodies_are_fetched_once_per_node(self):
+        for command in ('users', 'lines', 'extensions', 'endpoints_sip', 'endpoints_sccp'):
+            getattr(self.client, command).get.return_value = {}
+        self.client.devices.get.side_effect = lambda device_id: {'id': device_id}
+
+        graph = self.loader.load([1, 2], bodies=True)
+
+        assert_that(graph.get('device', 'abc').data, equal_to({'id': 'abc'}))
+        self.client.devices.get.assert_called_once_with('abc')
+        assert_that(self.client.lines.get.call_count, equal_to(2))
+
+    def test_other_errors_are_raised(self):
+        self.session.get.side_effect = HTTPError(response=Mock(status_code=500))
+
+        self.assertRaises(HTTPError, self.loader.load, [1])
@@ -0,0 +1,136 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, contains, equal_to, empty
+from mock import Mock
+
+from xivo_confd_client.cache import RelationCache
+from xivo_confd_client.mirror import ConfdMirror
+from xivo_confd_client.tests import mock_client
+
+USERS = [{'id': 1, 'uuid': 'uuid-1', 'firstname': 'John'},
+         {'id': 2, 'uuid': 'uuid-2', 'firstname': 'Mary'}]
+LINES = [{'id': 10, 'name': 'abcdef', 'device_id': 'dev1'},
+         {'id': 11, 'name': 'ghijkl', 'device_id': None}]
+EXTENSIONS = [{'id': 100, 'exten': '1000', 'context': 'default'},
+              {'id': 101, 'exten': '1001', 'context': 'default'}]
+USER_LINES = {10: [{'user_id': 2, 'line_id': 10, 'main_user': False},
+                   {'user_id': 1, 'line_id': 10, 'main_user': True}],
+              11: [{'user_id': 2, 'line_id': 11, 'main_user': True}]}
+LINE_EXTENSIONS = {10: [{'line_id': 10, 'extension_id': 100}],
+                   11: [{'line_id': 11, 'extension_id': 101}]}
+
+
+class TestConfdMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.user_lines = dict(USER_LINES)
+        self.client, self.session = mock_client()
+        self.session.get.side_effect = self.get
+        self.client.users.list_all.return_value = {'total': 2, 'items': [dict(user) for user in USERS]}
+        self.client.lines.list_all.return_value = {'total': 2, 'items': [dict(line) for line in LINES]}
+        self.client.extensions.list_all.return_value = {'total': 2, 'items': [dict(ext) for ext in EXTENSIONS]}
+
+        self.mirror = ConfdMirror(self.client, concurrency=2)
+        self.mirror.refresh()
+
+    def get(self, url):
+        line_id, relation = url.split('/')[2:]
+        items = self.user_lines if relation == 'users' else LINE_EXTENSIONS
+        return Mock(json=Mock(return_value={'items': items[int(line_id)]}))
+
+    def test_subscribes_to_client_events(self):
+        self.client.subscribe.assert_called_once_with(self.mirror.on_event)
+
+    def test_user_lookups(self):
+        assert_that(self.mirror.user(1)['firstname'], equal_to('John'))
+        assert_that(self.mirror.user('uuid-2')['firstname'], equal_to('Mary'))
+        assert_that(self.mirror.user({'id': 2})['firstname'], equal_to('Mary'))
+        assert_that(self.mirror.user(3), equal_to(None))
+
+    def test_line_and_extension_lookups(self):
+        assert_that(self.mirror.line_by_name('abcdef')['id'], equal_to(10))
+        assert_that(self.mirror.extension_by_exten('1001')['id'], equal_to(101))
+        assert_that(self.mirror.extension_by_exten('1001', 'other'), equal_to(None))
+        assert_that(self.mirror.lines_for_device('dev1'), contains(LINES[0]))
+
+    def test_user_for_extension_returns_main_user(self):
+        assert_that(self.mirror.user_for_extension('1000')['id'], equal_to(1))
+        assert_that([user['id'] for user in self.mirror.users_for_extension('1000')], contains(1, 2))
+
+    def test_lines_for_user(self):
+        assert_that([line['id'] for line in self.mirror.lines_for_user('uuid-2')], contains(10, 11))
+        assert_that([ext['id'] for ext in self.mirror.extensions_for_line(11)], contains(101))
+
+    def test_created_resource_is_indexed(self):
+        self.mirror.on_event('created', 'extensions', {'id': 102, 'exten': '1002', 'context': 'default'})
+        self.mirror.on_event('associated', 'line_extension', {'line_id': 11, 'extension_id': 102})
+
+        assert_that(self.mirror.user_for_extension('1002')['id'], equal_to(2))
+
+    def test_updated_resource_is_reindexed_and_keeps_relations(self):
+        self.mirror.on_event('updated', 'extensions', {'id': 100, 'exten': '2000', 'context': 'default'})
+
+        assert_that(self.mirror.extension_by_exten('1000'), equal_to(None))
+        assert_that(self.mirror.user_for_extension('2000')['id'], equal_to(1))
+
+    def test_deleted_resource_is_removed_with_its_relations(self):
+        self.mirror.on_event('deleted', 'lines', {'id': 10})
+
+        assert_that(self.mirror.line_by_name('abcdef'), equal_to(None))
+        assert_that(self.mirror.users_for_extension('1000'), empty())
+        assert_that([line['id'] for line in self.mirror.lines_for_user(2)], contains(11))
+
+    def test_dissociated_user_line(self):
+        self.mirror.on_event('dissociated', 'user_line', {'user_id': 1, 'line_id': 10})
+
+        assert_that(self.mirror.lines_for_user(1), empty())
+        assert_that(self.mirror.user_for_extension('1000')['id'], equal_to(2))
+
+    def test_line_device_association_moves_line(self):
+        self.mirror.on_event('associated', 'line_device', {'line_id': 10, 'device_id': 'dev2'})
+
+        assert_that(self.mirror.lines_for_device('dev1'), empty())
+        assert_that([line['id'] for line in self.mirror.lines_for_device('dev2')], contains(10))
+
+    def test_events_during_refresh_are_kept(self):
+        def list_extensions(concurrency):
+            self.mirror.on_event('created', 'extensions', {'id': 102, 'exten': '1002', 'context': 'default'})
+            self.mirror.on_event('associated', 'line_extension', {'line_id': 11, 'extension_id': 102})
+            return {'total': 2, 'items': [dict(ext) for ext in EXTENSIONS]}
+        self.client.extensions.list_all.side_effect = list_extensions
+
+        self.mirror.refresh()
+
+        assert_that(self.mirror.user_for_extension('1002')['id'], equal_to(2))
+        assert_that(self.mirror.user_for_extension('1000')['id'], equal_to(1))
+
+    def test_refresh_does_not_read_relations_from_cache(self):
+        self.client.relation_cache = RelationCache()
+        self.mirror.refresh()
+        self.user_lines[11] = []
+
+        self.mirror.refresh()
+
+        assert_that([line['id'] for line in self.mirror.lines_for_user(2)], contains(10))
+
+    def test_unrelated_events_are_ignored(self):
+        self.mirror.on_event('created', 'voicemails', {'id': 1})
+        self.mirror.on_event('updated', 'user_forward', {'user_id': 1})
@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, equal_to, has_entries
+from requests.packages.urllib3.exceptions import EmptyPoolError
+
+from xivo_confd_client.pool import ConfdHTTPAdapter
+
+
+class TestConfdHTTPAdapter(unittest.TestCase):
+
+    def pool(self, **kwargs):
+        adapter = ConfdHTTPAdapter(**kwargs)
+        pool = adapter.poolmanager.connection_from_url('http://localhost:9486')
+        return adapter, pool
+
+    def test_given_no_requests_then_stats_are_empty(self):
+        adapter = ConfdHTTPAdapter()
+
+        assert_that(adapter.stats(), equal_to({'opened': 0, 'reused': 0, 'waited': 0}))
+
+    def test_given_new_connection_then_opened_is_counted(self):
+        adapter, pool = self.pool()
+
+        pool._get_conn()
+
+        assert_that(adapter.stats(), has_entries(opened=1, reused=0))
+
+    def test_given_connection_returned_to_pool_then_reuse_is_counted(self):
+        adapter, pool = self.pool()
+
+        pool._put_conn(pool._get_conn())
+        pool._get_conn()
+
+        assert_that(adapter.stats(), has_entries(opened=1, reused=1))
+
+    def test_given_blocking_pool_exhausted_then_wait_is_counted(self):
+        adapter, pool = self.pool(pool_maxsize=1, pool_block=True)
+
+        pool._get_conn()
+        self.assertRaises(EmptyPoolError, pool._get_conn, timeout=0.01)
+
+        assert_that(adapter.stats(), has_entries(opened=1, waited=1))
+
+    def test_pool_settings_are_passed_to_connection_pools(self):
+        adapter, pool = self.pool(pool_maxsize=3, pool_block=True)
+
+        assert_that(pool.pool.maxsize, equal_to(3))
+        assert_that(pool.block, equal_to(True))
@@ -0,0 +1,118 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import (assert_that, calling, contains, equal_to, has_key,
+                      has_entries, raises)
+from mock import Mock
+
+from xivo_confd_client.provisioning import ProvisioningError, UserProvisioner
+from xivo_confd_client.tests import mock_client
+
+SPEC = {'user': {'firstname': 'John'},
+        'line': {'context': 'default'},
+        'endpoint_sip': {},
+        'extension': {'exten': '1000', 'context': 'default'}}
+
+
+class TestUserProvisioner(unittest.TestCase):
+
+    def setUp(self):
+        self.client, self.session = mock_client()
+        self.client.users.create.return_value = {'id': 1}
+        self.client.lines.create.return_value = {'id': 2}
+        self.client.endpoints_sip.create.return_value = {'id': 3}
+        self.client.extensions.create.return_value = {'id': 4}
+        self.provisioner = UserProvisioner(self.client)
+
+    def test_creates_and_associates(self):
+        result = self.provisioner.provision_user(SPEC)
+
+        assert_that(result['user'], equal_to({'id': 1}))
+        self.client.extensions.create.assert_called_once_with(SPEC['extension'])
+        assert_that([call[0][0] for call in self.session.put.call_args_list],
+                    contains('/lines/2/endpoints/sip/3'))
+        assert_that([call[0] for call in self.session.post.call_args_list],
+                    contains(('/users/1/lines', {'line_id': 2}),
+                             ('/lines/2/extensions', {'extension_id': 4})))
+
+    def test_timings_per_step(self):
+        result = self.provisioner.provision_user(SPEC)
+
+        assert_that(result.timings.keys(), contains('create_user', 'create_line', 'create_endpoint_sip',
+                                                    'create_extension', 'associate_line_endpoint_sip',
+                                                    'associate_user_line', 'associate_line_extension',
+                                                    'total'))
+
+    def test_optional_parts_are_skipped(self):
+        self.client.endpoints_sccp.create.return_value = {'id': 3}
+
+        result = self.provisioner.provision_user({'user': {}, 'line': {}, 'endpoint_sccp': {}})
+
+        assert_that(result.created.keys(), contains('user', 'line', 'endpoint_sccp'))
+        assert_that(self.client.extensions.create.called, equal_to(False))
+
+    def test_failed_creation_deletes_created_resources(self):
+        error = Exception('boom')
+        self.client.extensions.create.side_effect = error
+
+        assert_that(calling(self.provisioner.provision_user).with_args(SPEC),
+                    raises(ProvisioningError, 'create_extension failed'))
+
+        self.client.users.delete.assert_called_once_with(1)
+        self.client.lines.delete.assert_called_once_with(2)
+        self.client.endpoints_sip.delete.assert_called_once_with(3)
+        assert_that(self.session.put.called, equal_to(False))
+
+    def test_failed_association_undoes_previous_associations(self):
+        self.session.post.side_effect = [Mock(), Exception('boom')]
+
+        try:
+            self.provisioner.provision_user(SPEC)
+        except ProvisioningError as e:
+            result = e.result
+            assert_that(e.step, equal_to('associate_line_extension'))
+        else:
+            self.fail('ProvisioningError not raised')
+
+        assert_that([call[0][0] for call in self.session.delete.call_args_list],
+                    contains('/users/1/lines/2', '/lines/2/endpoints/sip/3'))
+        assert_that(result.rolled_back, contains('dissociate_user_line', 'dissociate_line_endpoint_sip',
+                                                 'delete_extension', 'delete_endpoint_sip',
+                                                 'delete_line', 'delete_user'))
+
+    def test_rollback_errors_are_kept(self):
+        self.client.extensions.create.side_effect = Exception('boom')
+        self.client.users.delete.side_effect = Exception('in use')
+
+        try:
+            self.provisioner.provision_user(SPEC)
+        except ProvisioningError as e:
+            assert_that(e.result.rollback_errors, has_key('delete_user'))
+        else:
+            self.fail('ProvisioningError not raised')
+
+    def test_provision_users(self):
+        self.client.users.create.side_effect = [{'id': 1}, Exception('boom'), {'id': 5}]
+
+        report = self.provisioner.provision_users([SPEC, SPEC, SPEC], concurrency=1)
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that(report.errors, has_key(1))
+        assert_that(report.results, has_entries({0: report.results[0], 2: report.results[2]}))
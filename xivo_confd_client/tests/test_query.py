@@ -0,0 +1,123 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+from hamcrest import assert_that, contains, equal_to
+from mock import Mock
+
+from ..crud import CRUDCommand
+
+from xivo_confd_client.tests import TestCommand
+
+USERS = [{'id': 1, 'firstname': 'John', 'lastname': 'Smith', 'type': 'a'},
+         {'id': 2, 'firstname': 'Mary', 'lastname': 'Smith', 'type': 'b'},
+         {'id': 3, 'firstname': 'Paul', 'lastname': 'Smith', 'type': 'a'},
+         {'id': 4, 'firstname': 'Anna', 'lastname': 'Smith', 'type': 'a'}]
+
+
+class QueryCommand(CRUDCommand):
+
+    resource = 'test'
+    server_filters = ('type',)
+
+
+class TestQuery(TestCommand):
+
+    Command = QueryCommand
+
+    def set_pages(self, *pages):
+        self.session.get.side_effect = [Mock(json=Mock(return_value=page)) for page in pages]
+
+    def test_pushes_everything_down(self):
+        self.set_pages({'total': 10, 'items': USERS[:2]})
+
+        query = (self.command.query()
+                 .search('smith')
+                 .order('lastname', 'desc')
+                 .filter(type='a')
+                 .limit(2)
+                 .offset(4))
+        result = query.all()
+
+        assert_that(result, equal_to({'total': 10, 'items': USERS[:2]}))
+        assert_that(query.server_side, equal_to(True))
+        assert_that(query.explain(), equal_to({
+            'server': {'search': 'smith', 'order': 'lastname', 'direction': 'desc',
+                       'type': 'a', 'limit': 2, 'offset': 4},
+            'client': []}))
+        self.session.get.assert_called_once_with('/test', params={
+            'search': 'smith', 'order': 'lastname', 'direction': 'desc',
+            'type': 'a', 'limit': 2, 'offset': 4})
+
+    def test_without_limit_streams_pages(self):
+        self.set_pages({'total': 4, 'items': USERS[:2]},
+                       {'total': 4, 'items': USERS[2:]})
+        self.command.page_size = 2
+
+        result = list(self.command.query().search('smith'))
+
+        assert_that(result, equal_to(USERS))
+
+    def test_unsupported_field_is_filtered_on_client(self):
+        self.set_pages({'total': 4, 'items': USERS})
+
+        query = self.command.query().search('smith').filter(firstname='Paul')
+        result = query.all()
+
+        assert_that(result, equal_to({'total': 1, 'items': [USERS[2]]}))
+        assert_that(query.server_side, equal_to(False))
+        assert_that(query.explain(), equal_to({'server': {'search': 'smith'},
+                                               'client': ["firstname='Paul'"]}))
+
+    def test_client_side_filter_applies_limit_and_offset_on_client(self):
+        self.set_pages({'total': 4, 'items': USERS})
+
+        def not_mary(user):
+            return user['firstname'] != 'Mary'
+
+        query = self.command.query().filter(not_mary).offset(1).limit(1)
+        result = list(query)
+
+        assert_that(result, contains(USERS[2]))
+        assert_that(query.explain()['client'], equal_to(['not_mary', 'limit=1', 'offset=1']))
+        self.session.get.assert_called_once_with('/test', params={'limit': 500, 'offset': 0})
+
+    def test_first(self):
+        self.set_pages({'total': 4, 'items': USERS[:1]})
+
+        assert_that(self.command.query().first(), equal_to(USERS[0]))
+
+    def test_first_does_not_change_the_query(self):
+        self.set_pages({'total': 4, 'items': USERS[:1]})
+        query = self.command.query().search('o')
+
+        query.first()
+
+        assert_that(query.explain(), equal_to({'server': {'search': 'o'}, 'client': []}))
+
+    def test_copy_is_independent(self):
+        query = self.command.query().search('o').filter(firstname='John')
+
+        copy = query.copy().limit(2).filter(lastname='Doe')
+
+        assert_that(query.explain(), equal_to({'server': {'search': 'o'}, 'client': ["firstname='John'"]}))
+        assert_that(copy.explain()['client'], equal_to(["firstname='John'", "lastname='Doe'", 'limit=2']))
+
+    def test_first_when_nothing_matches(self):
+        self.set_pages({'total': 4, 'items': USERS})
+
+        assert_that(self.command.query().filter(firstname='Nobody').first(), equal_to(None))
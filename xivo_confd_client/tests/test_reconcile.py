@@ -0,0 +1,191 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from StringIO import StringIO
+
+from hamcrest import (assert_that, contains, contains_inanyorder, contains_string,
+                      empty, equal_to, has_entries)
+from mock import Mock
+from requests import HTTPError
+
+from xivo_confd_client.reconcile import (ASSOCIATE, CREATE, DELETE, DISSOCIATE,
+                                         UPDATE, Reconciler, SkippedOperation)
+from xivo_confd_client.tests import mock_client
+
+
+class TestReconciler(unittest.TestCase):
+
+    def setUp(self):
+        self.relations = {}
+        self.client, self.session = mock_client()
+        self.session.get.side_effect = self.get
+        self.client.users.list_all.return_value = {'items': [
+            {'id': 1, 'firstname': 'John', 'lastname': 'Doe', 'caller_id': '"John Doe"'},
+            {'id': 2, 'firstname': 'Mary', 'lastname': 'Sue', 'caller_id': '"Mary Sue"'}]}
+        self.client.lines.list_all.return_value = {'items': [
+            {'id': 10, 'provisioning_code': '111111', 'context': 'default'}]}
+        self.client.extensions.list_all.return_value = {'items': [
+            {'id': 100, 'exten': '1000', 'context': 'default'}]}
+        self.client.voicemails.list_all.return_value = {'items': []}
+        self.client.call_permissions.list_all.return_value = {'items': []}
+        self.client.users.create.side_effect = lambda body: dict(body, id=3)
+        self.client.lines.create.side_effect = lambda body: dict(body, id=11)
+        self.reconciler = Reconciler(self.client, concurrency=2)
+
+    def get(self, url, *args, **kwargs):
+        if url.endswith('/voicemail') and url not in self.relations:
+            raise HTTPError(response=Mock(status_code=404))
+        return Mock(json=Mock(return_value={'items': self.relations.get(url, [])}))
+
+    def actions(self, plan):
+        return [(operation.action, operation.resource, operation.key) for operation in plan.operations]
+
+    def test_nothing_to_do(self):
+        desired = {'users': [{'firstname': 'John', 'lastname': 'Doe'},
+                             {'firstname': 'Mary', 'lastname': 'Sue'}]}
+
+        plan = self.reconciler.plan(desired)
+
+        assert_that(plan.operations, empty())
+
+    def test_create_and_update(self):
+        desired = {'users': [{'firstname': 'John', 'lastname': 'Doe', 'caller_id': '"Johnny"'},
+                             {'firstname': 'Paul', 'lastname': 'Smith'}]}
+
+        plan = self.reconciler.plan(desired)
+
+        assert_that(self.actions(plan), contains_inanyorder(
+            (CREATE, 'users', ('Paul', 'Smith')),
+            (UPDATE, 'users', ('John', 'Doe'))))
+
+    def test_delete_only_when_pruning(self):
+        desired = {'users': [{'firstname': 'John', 'lastname': 'Doe'}]}
+
+        assert_that(self.reconciler.plan(desired).operations, empty())
+
+        plan = Reconciler(self.client, prune=True).plan(desired)
+
+        assert_that(self.actions(plan), contains((DELETE, 'users', ('Mary', 'Sue'))))
+
+    def test_association_waits_for_creation(self):
+        desired = {'users': [{'firstname': 'Paul', 'lastname': 'Smith'}],
+                   'lines': [{'provisioning_code': '222222', 'context': 'default'}],
+                   'user_line': [[['Paul', 'Smith'], '222222']]}
+
+        plan = self.reconciler.plan(desired)
+        waves = [[(op.action, op.resource) for op in wave] for wave in plan.waves()]
+
+        assert_that(waves, contains(
+            contains_inanyorder((CREATE, 'users'), (CREATE, 'lines')),
+            contains((ASSOCIATE, 'user_line'))))
+
+    def test_relations_are_dissociated_and_associated(self):
+        self.relations['/users/1/lines'] = [{'user_id': 1, 'line_id': 10}]
+        desired = {'users': [{'firstname': 'John', 'lastname': 'Doe'}],
+                   'line_extension': [['111111', ['1000', 'default']]],
+                   'user_line': []}
+
+        plan = self.reconciler.plan(desired)
+
+        assert_that(self.actions(plan), contains_inanyorder(
+            (DISSOCIATE, 'user_line', (('John', 'Doe'), ('111111',))),
+            (ASSOCIATE, 'line_extension', (('111111',), ('1000', 'default')))))
+        assert_that(plan.reads, equal_to(5))
+
+    def test_delete_waits_only_for_its_own_dissociations(self):
+        self.relations['/users/1/lines'] = [{'user_id': 1, 'line_id': 10}]
+        desired = {'users': [{'firstname': 'John', 'lastname': 'Doe'}],
+                   'lines': [],
+                   'user_line': []}
+
+        plan = Reconciler(self.client, prune=True).plan(desired)
+        operations = dict(((op.action, op.resource), op) for op in plan.operations)
+
+        assert_that(operations[(DELETE, 'users')].requires, empty())
+        assert_that(operations[(DELETE, 'lines')].requires, contains(operations[(DISSOCIATE, 'user_line')]))
+        assert_that([len(wave) for wave in plan.waves()], contains(2, 1))
+
+    def test_pruned_line_is_dissociated_from_its_users(self):
+        self.relations['/lines/10/users'] = [{'user_id': 2, 'line_id': 10}]
+        desired = {'lines': []}
+
+        plan = Reconciler(self.client, prune=True).plan(desired)
+        operations = dict(((op.action, op.resource), op) for op in plan.operations)
+
+        assert_that(self.actions(plan), contains(
+            (DISSOCIATE, 'user_line', (('Mary', 'Sue'), ('111111',))),
+            (DELETE, 'lines', ('111111',))))
+        assert_that(operations[(DELETE, 'lines')].requires, contains(operations[(DISSOCIATE, 'user_line')]))
+
+    def test_pruned_user_is_dissociated_from_its_lines(self):
+        self.relations['/users/2/lines'] = [{'user_id': 2, 'line_id': 10}]
+        desired = {'users': [{'firstname': 'John', 'lastname': 'Doe'}]}
+
+        plan = Reconciler(self.client, prune=True).plan(desired)
+
+        assert_that(self.actions(plan), contains(
+            (DISSOCIATE, 'user_line', (('Mary', 'Sue'), ('111111',))),
+            (DELETE, 'users', ('Mary', 'Sue'))))
+
+    def test_apply_uses_created_ids(self):
+        desired = {'users': [{'firstname': 'Paul', 'lastname': 'Smith'}],
+                   'lines': [{'provisioning_code': '222222', 'context': 'default'}],
+                   'user_line': [[['Paul', 'Smith'], '222222']]}
+
+        report = self.reconciler.reconcile(desired)
+
+        assert_that(report.failed, equal_to(0))
+        assert_that(report.succeeded, equal_to(3))
+        self.session.post.assert_called_once_with('/users/3/lines', {'line_id': 11})
+
+    def test_apply_skips_operations_depending_on_failures(self):
+        self.client.users.create.side_effect = Exception('boom')
+        desired = {'users': [{'firstname': 'Paul', 'lastname': 'Smith'}],
+                   'user_line': [[['Paul', 'Smith'], '111111']]}
+
+        report = self.reconciler.reconcile(desired)
+
+        assert_that(report.failed, equal_to(2))
+        skipped, = [outcome for outcome in report.errors.values()
+                    if isinstance(outcome.error, SkippedOperation)]
+        assert_that(skipped.key.action, equal_to(ASSOCIATE))
+        assert_that(self.session.post.called, equal_to(False))
+
+    def test_dry_run_prints_plan(self):
+        desired = {'users': [{'firstname': 'Paul', 'lastname': 'Smith'}],
+                   'user_line': [[['Paul', 'Smith'], '111111']]}
+        out = StringIO()
+
+        plan = self.reconciler.reconcile(desired, dry_run=True, out=out)
+
+        assert_that(out.getvalue(), contains_string('create users Paul/Smith'))
+        assert_that(out.getvalue(), contains_string('associate user_line Paul/Smith -> 111111'))
+        assert_that(out.getvalue(), contains_string('estimated requests: 2 read, 2 write'))
+        assert_that(plan.summary(), has_entries(waves=2, requests={'read': 2, 'write': 2}))
+        assert_that(self.client.users.create.called, equal_to(False))
+
+    def test_custom_keys(self):
+        self.reconciler = Reconciler(self.client, keys={'users': ('caller_id',)})
+        desired = {'users': [{'caller_id': '"John Doe"', 'firstname': 'Johnny'}]}
+
+        plan = self.reconciler.plan(desired)
+
+        assert_that(self.actions(plan), contains((UPDATE, 'users', ('"John Doe"',))))
+        assert_that(plan.operations[0].body, has_entries(id=1, firstname='Johnny'))
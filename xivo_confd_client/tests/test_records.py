@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+
+from hamcrest import assert_that, equal_to, instance_of, is_not, same_instance
+
+from xivo_confd_client.records import Record, User
+from xivo_confd_client.util import resource_id
+
+USER = {'id': 1,
+        'uuid': '2e752722-0864-4665-887d-a78a024cf7c7',
+        'firstname': 'John',
+        'lastname': 'Doe',
+        'links': [{'rel': 'users', 'href': 'http://localhost/1.1/users/1'}]}
+
+
+class TestRecord(unittest.TestCase):
+
+    def test_default_projection_keeps_declared_fields(self):
+        user = User.build(USER)
+
+        assert_that(user, instance_of(User))
+        assert_that(user.firstname, equal_to('John'))
+        assert_that(user.email, equal_to(None))
+        assert_that('links' in user, equal_to(False))
+
+    def test_projection_keeps_only_requested_fields(self):
+        user = User.build(USER, fields=['id', 'lastname'])
+
+        assert_that(user.to_dict(), equal_to({'id': 1, 'lastname': 'Doe'}))
+        self.assertRaises(AttributeError, getattr, user, 'firstname')
+
+    def test_records_have_no_instance_dict(self):
+        user = User.build(USER)
+
+        self.assertRaises(AttributeError, getattr, user, '__dict__')
+
+    def test_projections_are_cached(self):
+        first = User.projection(['id', 'uuid'])
+        second = User.projection(('id', 'uuid'))
+
+        assert_that(first, same_instance(second))
+        assert_that(User.projection(), is_not(same_instance(first)))
+
+    def test_projection_of_projection_does_not_stack_fields(self):
+        projected = User.projection(['id'])
+
+        assert_that(projected.projection(['uuid']).fields, equal_to(('uuid',)))
+        assert_that(projected.projection(['uuid']).__mro__[1], same_instance(User))
+
+    def test_keep_extra(self):
+        user = User.build(USER, fields=['id'], keep_extra=True)
+
+        assert_that(user['firstname'], equal_to('John'))
+        assert_that(user.get('links'), equal_to(USER['links']))
+        assert_that(user.to_dict(), equal_to(USER))
+
+    def test_without_extra_then_unknown_fields_are_dropped(self):
+        user = User.build(USER, fields=['id'])
+
+        assert_that(user.get('firstname'), equal_to(None))
+        self.assertRaises(KeyError, lambda: user['firstname'])
+
+    def test_records_can_be_used_as_resource(self):
+        assert_that(resource_id(Record.build(USER)), equal_to(1))
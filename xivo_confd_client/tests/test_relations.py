@@ -17,7 +17,14 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 
-from hamcrest import assert_that
+import unittest
+
+from hamcrest import assert_that, contains, equal_to, instance_of, is_not, same_instance
+from mock import Mock
+from requests import HTTPError
+
+from xivo_confd_client.bulk import RetryPolicy
+from xivo_confd_client.commands.users import UserRelation
 
 from xivo_confd_client.tests import TestCommand
 from xivo_confd_client.relations import (LineDeviceRelation,
@@ -59,6 +66,7 @@ class TestUserLineRelation(TestCommand):
         response = self.command.associate(user_id, line_id)
 
         self.session.post.assert_called_once_with("/users/1/lines", {'line_id': line_id})
+        self.client.publish.assert_called_once_with('associated', 'user_line', {'user_id': user_id, 'line_id': line_id})
         assert_that(response, expected_result)
 
     def test_user_line_dissociation(self):
@@ -67,6 +75,7 @@ class TestUserLineRelation(TestCommand):
 
         self.command.dissociate(user_id, line_id)
         self.session.delete.assert_called_once_with("/users/1/lines/2")
+        self.client.publish.assert_called_once_with('dissociated', 'user_line', {'user_id': user_id, 'line_id': line_id})
 
     def test_user_line_list_by_user(self):
         user_id = 1234
@@ -816,3 +825,61 @@ class TestEntityRelation(TestCommand):
 
         self.session.get.assert_called_once_with(expected_url)
         assert_that(result, expected_result)
+
+
+class TestAssociateMany(TestCommand):
+
+    Command = UserLineRelation
+
+    def test_pairs_of_the_same_user_keep_their_order(self):
+        self.set_response('post', 201, {})
+
+        report = self.command.associate_many([(1, 10), ({'id': 2}, {'id': 20}), (1, 11)], concurrency=2)
+
+        user_1_calls = [call for call in self.session.post.call_args_list if call[0][0] == '/users/1/lines']
+        assert_that([call[0][1] for call in user_1_calls], contains({'line_id': 10}, {'line_id': 11}))
+        assert_that(report.succeeded, equal_to(3))
+        assert_that(sorted(report.results), equal_to([(1, 10), (1, 11), (2, 20)]))
+
+    def test_already_associated_pairs_are_unchanged(self):
+        response = Mock(status_code=400, reason='Resource Error - User is already associated to this line')
+        self.session.post.side_effect = [Mock(), HTTPError(response=response)]
+
+        report = self.command.associate_many([(1, 10), (1, 11)], retry=RetryPolicy(retries=0))
+
+        assert_that(report.unchanged, equal_to([(1, 11)]))
+        assert_that(report.failed, equal_to(0))
+
+    def test_dissociate_many(self):
+        self.session.delete.side_effect = [None, HTTPError(response=Mock(status_code=404, reason='Not found'))]
+
+        report = self.command.dissociate_many([(1, 10), (2, 20)], concurrency=1)
+
+        assert_that(report.succeeded, equal_to(1))
+        assert_that(report.errors.keys(), equal_to([(2, 20)]))
+
+
+class TestSharedRelation(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Mock()
+
+    def test_relation_commands_are_shared_per_client(self):
+        first = UserRelation(self.client, 1)
+        second = UserRelation(self.client, 2)
+
+        assert_that(first.user_line, instance_of(UserLineRelation))
+        assert_that(first.user_line, same_instance(second.user_line))
+        assert_that(UserRelation(Mock(), 1).user_line, is_not(same_instance(first.user_line)))
+
+    def test_relation_commands_are_built_on_first_use(self):
+        UserRelation(self.client, 1).user_line
+
+        assert_that(self.client._relation_commands.keys(), equal_to([UserLineRelation]))
+
+    def test_relation_command_can_be_replaced_on_a_facade(self):
+        relation = UserRelation(self.client, 1)
+        replacement = relation.user_line = Mock()
+
+        assert_that(relation.user_line, same_instance(replacement))
+        assert_that(UserRelation(self.client, 2).user_line, is_not(same_instance(replacement)))
@@ -20,11 +20,15 @@ import unittest
 import json
 
 from mock import Mock
-from hamcrest import assert_that, equal_to
+from hamcrest import assert_that, calling, contains, equal_to, raises
 
-from requests import Session
+from requests import HTTPError, Response, Session
+from requests.adapters import BaseAdapter
+from xivo_confd_client.auth import ConfdDigestAuth
 from xivo_confd_client.session import ConfdSession
 
+CHALLENGE = 'Digest realm="confd", nonce="{}", qop="auth"'
+
 
 class TestConfdSession(unittest.TestCase):
 
@@ -130,3 +134,68 @@ class TestConfdSession(unittest.TestCase):
         url = self.confd_session.clean_url(part)
 
         assert_that(url, equal_to('http://localhost/users/1'))
+
+
+class DigestServer(BaseAdapter):
+
+    def __init__(self):
+        super(DigestServer, self).__init__()
+        self.nonce = 'abc'
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        body = request.body
+        if body is not None and not isinstance(body, basestring):
+            body = ''.join(body)
+        authorization = request.headers.get('Authorization', '')
+        self.requests.append((request.method, request.url, bool(authorization), body))
+
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.raw = Mock(_original_response=None)
+        response.connection = self
+        if 'nonce="{}"'.format(self.nonce) in authorization:
+            response.status_code = 200
+            response._content = '{}'
+        else:
+            response.status_code = 401
+            response.headers['www-authenticate'] = CHALLENGE.format(self.nonce)
+            response._content = '["Unauthorized"]'
+        return response
+
+    def close(self):
+        pass
+
+
+class TestStreamedBodyWithDigestAuth(unittest.TestCase):
+
+    def setUp(self):
+        self.server = DigestServer()
+        session = Session()
+        session.mount('http://', self.server)
+        session.auth = ConfdDigestAuth('alice', 's3cre7')
+        self.confd_session = ConfdSession(session, "http://localhost/1.1")
+
+    def test_challenge_is_fetched_before_streaming(self):
+        response = self.confd_session.post('/users/import', raw=iter(['a\n', 'b\n']), check_response=False)
+
+        assert_that(response.status_code, equal_to(200))
+        assert_that(self.server.requests, contains(
+            ('GET', 'http://localhost/1.1/infos', False, None),
+            ('GET', 'http://localhost/1.1/infos', True, None),
+            ('POST', 'http://localhost/1.1/users/import', True, 'a\nb\n')))
+
+    def test_streamed_body_rejected_after_challenge_raises(self):
+        self.confd_session.get('/infos')
+        self.server.nonce = 'def'
+
+        put = calling(self.confd_session.put).with_args('/users/import', raw=iter(['a\n']), check_response=False)
+
+        assert_that(put, raises(HTTPError, 'streamed body'))
+
+    def test_string_body_is_replayed(self):
+        response = self.confd_session.post('/users/import', raw='a\n', check_response=False)
+
+        assert_that(response.status_code, equal_to(200))
+        assert_that([method for method, _, _, _ in self.server.requests], contains('POST', 'POST'))
@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from hamcrest import assert_that, contains, equal_to, none
+from mock import Mock, patch
+
+from xivo_confd_client.snapshot import ReadOnlySnapshotError, SnapshotStore
+
+USERS = [{'id': 1, 'firstname': 'John'},
+         {'id': 2, 'firstname': 'Mary'}]
+USER_LINES = [{'user_id': 1, 'line_id': 10, 'main_user': True},
+              {'user_id': 2, 'line_id': 10, 'main_user': False},
+              {'user_id': 2, 'line_id': 11, 'main_user': True}]
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'snapshot.db')
+        self.store = SnapshotStore(self.path)
+        self.command = Mock(resource='users')
+        self.command.list_all.return_value = {'total': 2, 'items': USERS}
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_list_fetches_missing_collection(self):
+        result = self.store.list(self.command, concurrency=2)
+
+        self.command.list_all.assert_called_once_with(2)
+        assert_that(result, equal_to({'total': 2, 'items': USERS}))
+
+    def test_list_uses_saved_collection(self):
+        self.store.list(self.command)
+
+        result = self.store.list(self.command)
+
+        assert_that(self.command.list_all.call_count, equal_to(1))
+        assert_that(result, equal_to({'total': 2, 'items': USERS}))
+
+    def test_list_survives_reopening(self):
+        self.store.list(self.command)
+        self.store.close()
+
+        self.store = SnapshotStore(self.path)
+        result = self.store.list(self.command)
+
+        assert_that(self.command.list_all.call_count, equal_to(1))
+        assert_that(result['items'], equal_to(USERS))
+
+    @patch('xivo_confd_client.snapshot.time.time')
+    def test_list_refreshes_stale_collection(self, time):
+        store = SnapshotStore(self.path, max_age=60)
+        time.return_value = 1000
+        store.list(self.command)
+
+        time.return_value = 1030
+        store.list(self.command)
+        assert_that(self.command.list_all.call_count, equal_to(1))
+
+        time.return_value = 1061
+        store.list(self.command)
+        assert_that(self.command.list_all.call_count, equal_to(2))
+
+    def test_get_finds_item_by_id(self):
+        self.store.save('users', USERS)
+
+        assert_that(self.store.get('users', 2), equal_to(USERS[1]))
+        assert_that(self.store.get('users', 3), none())
+
+    def test_read_only_store_does_not_write(self):
+        self.store.save('users', USERS)
+        store = SnapshotStore(self.path, read_only=True)
+
+        assert_that(store.list(Mock(resource='users'))['items'], equal_to(USERS))
+        self.assertRaises(ReadOnlySnapshotError, store.save, 'users', [])
+
+    def test_read_only_store_fetches_without_saving(self):
+        missing = os.path.join(self.directory, 'missing.db')
+        store = SnapshotStore(missing, read_only=True)
+
+        assert_that(store.list(self.command)['items'], equal_to(USERS))
+        assert_that(store.list(self.command)['items'], equal_to(USERS))
+        assert_that(self.command.list_all.call_count, equal_to(2))
+
+    def test_relation_lookup_by_either_side(self):
+        fetch = Mock(return_value=USER_LINES)
+        self.store.list_relation('user_line', fetch, 'user_id', 'line_id')
+        self.store.list_relation('user_line', fetch, 'user_id', 'line_id')
+
+        assert_that(fetch.call_count, equal_to(1))
+        assert_that(self.store.load_relation('user_line', left_id=2)['items'],
+                    contains(USER_LINES[1], USER_LINES[2]))
+        assert_that(self.store.load_relation('user_line', right_id=10)['items'],
+                    contains(USER_LINES[0], USER_LINES[1]))
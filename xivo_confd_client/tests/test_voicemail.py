@@ -18,8 +18,11 @@
 
 import unittest
 
+from hamcrest import assert_that, equal_to
+
 from xivo_confd_client.relations import UserVoicemailRelation
 from xivo_confd_client.commands.voicemails import VoicemailRelation
+from xivo_confd_client.tests import threadsafe_mock
 
 from mock import Mock
 
@@ -29,7 +32,8 @@ class TestVoicemailRelation(unittest.TestCase):
     def setUp(self):
         self.voicemail_id = 1
         self.relation = VoicemailRelation(Mock(), self.voicemail_id)
-        self.association = self.relation.user_voicemail_relation = Mock(UserVoicemailRelation)
+        self.association = self.relation.user_voicemail_relation = threadsafe_mock(Mock(UserVoicemailRelation),
+                                                                                   'dissociate')
 
     def test_remove_users(self):
         user_id1 = 11
@@ -61,3 +65,16 @@ class TestVoicemailRelation(unittest.TestCase):
 
         self.association.dissociate.assert_any_call(user_id1)
         self.association.dissociate.assert_any_call(user_id2)
+
+    def test_remove_users_reports_failures_per_user(self):
+        self.association.list_by_voicemail.return_value = {'total': 3,
+                                                           'items': [{'user_id': 11},
+                                                                     {'user_id': 12},
+                                                                     {'user_id': 13}]}
+        self.association.dissociate.side_effect = [None, Exception('boom'), None]
+
+        report = self.relation.remove_users(concurrency=1)
+
+        assert_that(report.succeeded, equal_to(2))
+        assert_that(report.errors.keys(), equal_to([12]))
+        assert_that(self.association.dissociate.call_count, equal_to(3))
@@ -0,0 +1,101 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import threading
+import time
+import unittest
+
+from hamcrest import assert_that, contains, contains_inanyorder, equal_to, less_than_or_equal_to
+
+from xivo_confd_client.workers import BackgroundCall, imap
+
+
+class TestBackgroundCall(unittest.TestCase):
+
+    def test_result(self):
+        call = BackgroundCall(lambda a, b: a + b, 1, b=2)
+
+        assert_that(call.result(), equal_to(3))
+
+    def test_given_error_then_result_raises(self):
+        call = BackgroundCall(int, 'abc')
+
+        self.assertRaises(ValueError, call.result)
+
+    def test_wait_does_not_raise(self):
+        call = BackgroundCall(int, 'abc')
+
+        call.wait()
+
+
+class TestImap(unittest.TestCase):
+
+    def test_results_are_yielded_in_order(self):
+        def slow_square(value):
+            time.sleep(0.01 * (5 - value))
+            return value * value
+
+        result = list(imap(slow_square, range(5), concurrency=5))
+
+        assert_that(result, contains(0, 1, 4, 9, 16))
+
+    def test_unordered_results(self):
+        result = list(imap(lambda value: value * 2, range(10), concurrency=3, ordered=False))
+
+        assert_that(result, contains_inanyorder(*[value * 2 for value in range(10)]))
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def track(value):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return value
+
+        list(imap(track, range(20), concurrency=3))
+
+        assert_that(peak[0], less_than_or_equal_to(3))
+
+    def test_input_is_consumed_lazily(self):
+        consumed = []
+
+        def source():
+            for value in range(100):
+                consumed.append(value)
+                yield value
+
+        results = imap(lambda value: value, source(), concurrency=2)
+        next(results)
+
+        assert_that(len(consumed), less_than_or_equal_to(3))
+        results.close()
+
+    def test_given_error_then_it_is_raised_at_its_position(self):
+        results = imap(int, ['1', 'abc', '3'], concurrency=2)
+
+        assert_that(next(results), equal_to(1))
+        self.assertRaises(ValueError, next, results)
+
+    def test_empty_input(self):
+        assert_that(list(imap(int, [])), equal_to([]))
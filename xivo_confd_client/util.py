@@ -18,19 +18,49 @@
 
 from __future__ import unicode_literals
 
+import threading
+
 from functools import wraps
 
+from xivo_confd_client.records import Record
+
 
 def url_join(*parts):
     return "/" + "/".join(unicode(p) for p in parts)
 
 
+def resource_id(resource_or_id):
+    if isinstance(resource_or_id, (dict, Record)):
+        return resource_or_id['id']
+    return resource_or_id
+
+
+def changed_fields(desired, current):
+    return [key for key, value in desired.iteritems()
+            if key != 'links' and current.get(key) != value]
+
+
 def extract_id(func):
     @wraps(func)
-    def wrapper(self, resource_or_id):
-        if isinstance(resource_or_id, dict):
-            resource_id = resource_or_id['id']
-        else:
-            resource_id = resource_or_id
-        return func(self, resource_id)
+    def wrapper(self, resource_or_id, *args, **kwargs):
+        return func(self, resource_id(resource_or_id), *args, **kwargs)
     return wrapper
+
+
+class Counters(object):
+
+    def __init__(self, *names):
+        self._lock = threading.Lock()
+        self._values = dict.fromkeys(names, 0)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def get(self, name):
+        with self._lock:
+            return self._values.get(name, 0)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._values)
@@ -0,0 +1,126 @@
+# -*- coding: UTF-8 -*-
+
+# Copyright (C) 2016 Avencall
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import Queue
+import sys
+import threading
+
+DEFAULT_CONCURRENCY = 4
+
+
+class BackgroundCall(object):
+
+    def __init__(self, func, *args, **kwargs):
+        self._result = None
+        self._exc_info = None
+        self._thread = threading.Thread(target=self._run, args=(func, args, kwargs))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, func, args, kwargs):
+        try:
+            self._result = func(*args, **kwargs)
+        except Exception:
+            self._exc_info = sys.exc_info()
+
+    def wait(self):
+        self._thread.join()
+
+    def result(self):
+        self.wait()
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+
+def imap(func, iterable, concurrency=DEFAULT_CONCURRENCY, ordered=True):
+    """Apply func to every item from a pool of threads and yield the results.
+
+    Items are pulled from iterable only when a worker is free, so at most
+    ``concurrency`` items are in flight or waiting to be yielded. When
+    ordered is False results are yielded as soon as they complete. An
+    exception raised by func is raised again when its result is reached.
+    """
+    concurrency = max(concurrency, 1)
+    iterator = iter(iterable)
+    tasks = Queue.Queue()
+    results = Queue.Queue()
+
+    workers = [threading.Thread(target=_work, args=(func, tasks, results)) for _ in xrange(concurrency)]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    submitted = received = 0
+    pending = {}
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and submitted - received < concurrency:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                tasks.put((submitted, item))
+                submitted += 1
+
+            if received == submitted:
+                return
+
+            if ordered:
+                while received not in pending:
+                    index, outcome = results.get()
+                    pending[index] = outcome
+                outcome = pending.pop(received)
+            else:
+                _, outcome = results.get()
+            received += 1
+
+            yield _unwrap(outcome)
+    finally:
+        _drain(tasks)
+        for _ in workers:
+            tasks.put(None)
+
+
+def _work(func, tasks, results):
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        index, item = task
+        try:
+            results.put((index, (func(item), None)))
+        except Exception:
+            results.put((index, (None, sys.exc_info())))
+
+
+def _unwrap(outcome):
+    result, exc_info = outcome
+    if exc_info:
+        raise exc_info[0], exc_info[1], exc_info[2]
+    return result
+
+
+def _drain(queue):
+    while True:
+        try:
+            queue.get_nowait()
+        except Queue.Empty:
+            return